@@ -2,241 +2,181 @@
 bioRxiv/medRxiv search module for NMN Study Downloader
 """
 
-import time
+import re
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from datetime import date, timedelta
 
-def search_biorxiv(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.paging import PagedResults
+
+DETAILS_API_URL = "https://api.biorxiv.org/details"
+
+# Preprint servers covered by the details API, as (server, display name)
+SERVERS = [('biorxiv', 'bioRxiv'), ('medrxiv', 'medRxiv')]
+
+# How far back preprints are scanned unless the caller asks for another range
+DEFAULT_DAYS = 90
+
+# Size of the date windows the range is split into, newest first
+WINDOW_DAYS = 30
+
+def search_biorxiv(query, additional_terms, headers, max_results=None, client=None, days=DEFAULT_DAYS, since=None,
+                   match_terms=False):
     """Search bioRxiv and medRxiv for preprints related to NMN.
     
+    The api.biorxiv.org details endpoint has no text search, but returns full
+    metadata (abstracts included) for 100 preprints per request. The date
+    range is walked in windows from newest to oldest, each window paged with
+    the API cursor, and the query is matched locally against title and abstract.
+    
+    Unlike the old bioRxiv site search, only preprints posted within the last
+    `days` days are found. As before, the additional terms are not used for
+    bioRxiv/medRxiv unless match_terms is set.
+    
     Args:
         query (str): Main search query
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        days (int): Number of days back from today to scan
+        since (date): Only scan preprints posted on or after this date (overrides days
+            if it is more recent)
+        match_terms (bool): Also require at least one additional term in the title or abstract
     
     Returns:
-        list: List of preprint metadata
+        PagedResults: Lazy stream of matching preprint metadata
     """
-    # For bioRxiv, we need to use simpler search terms
-    # Extract main keywords - NMN or Nicotinamide
-    main_terms = []
-    if "NMN" in query:
-        main_terms.append("NMN")
-    if "Nicotinamide" in query:
-        main_terms.append("Nicotinamide")
-    if "Mononucleotide" in query:
-        main_terms.append("Mononucleotide")
-    
-    # If no matches, use the first word
-    if not main_terms and " " in query:
-        main_terms.append(query.split()[0])
-    elif not main_terms:
-        main_terms.append(query)
-    
-    results = []
-    
-    # Try each main term
-    for term in main_terms:
-        print(f"Searching bioRxiv/medRxiv for: {term}")
-        
-        # Search bioRxiv using content server
-        results.extend(_search_biorxiv_site(term, headers))
-        
-        # Also search medRxiv
-        results.extend(_search_medrxiv_site(term, headers))
-        
-        # Delay between searches
-        time.sleep(1)
+    if since:
+        days = max(1, min(days, (date.today() - since).days + 1))
     
-    print(f"Found {len(results)} relevant preprints on bioRxiv/medRxiv")
-    return results[:max_results] if max_results else results
-
-def _search_biorxiv_site(term, headers):
-    """Search the bioRxiv website directly.
+    matches = _query_matcher(query, additional_terms if match_terms else None)
     
-    Args:
-        term (str): Search term
-        headers (dict): HTTP headers for requests
+    end = date.today()
+    windows = []
+    while len(windows) * WINDOW_DAYS < days:
+        start = max(end - timedelta(days=WINDOW_DAYS - 1), date.today() - timedelta(days=days - 1))
+        windows.append((start.isoformat(), end.isoformat()))
+        end = start - timedelta(days=1)
     
-    Returns:
-        list: bioRxiv results
-    """
-    results = []
-    try:
-        search_url = f"https://www.biorxiv.org/search/{term}"
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()
+    print(f"Searching bioRxiv/medRxiv preprints from the last {days} days for: {query}")
+    
+    client = get_client(client)
+    seen = set()
+    
+    def fetch_page(state):
+        window, server, cursor = state
+        name, display_name = SERVERS[server]
+        start, end = windows[window]
+        
+        try:
+            response = client.get(f"{DETAILS_API_URL}/{name}/{start}/{end}/{cursor}/json",
+                                  headers=headers, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching {display_name} preprints for {start} to {end}: {e}")
+            data = {}
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        collection = data.get('collection') or []
+        results = []
+        for item in collection:
+            doi = item.get('doi', '')
+            # Each version of a preprint is listed separately
+            if not doi or doi in seen:
+                continue
+            if matches(f"{item.get('title', '')} {item.get('abstract', '')}"):
+                seen.add(doi)
+                results.append(_parse_preprint(item, name, display_name))
         
-        # Extract articles
-        for article in soup.select('.highwire-article-citation'):
-            title_elem = article.select_one('.highwire-cite-title')
-            title = title_elem.text.strip() if title_elem else "Unknown Title"
-            
-            link_elem = title_elem.find('a') if title_elem else None
-            article_link = link_elem.get('href') if link_elem else ""
-            full_link = urljoin("https://www.biorxiv.org", article_link) if article_link else ""
-            
-            doi_elem = article.select_one('.highwire-cite-metadata-doi')
-            doi = doi_elem.text.strip().replace('DOI: ', '') if doi_elem else ""
-            
-            date_elem = article.select_one('.highwire-cite-metadata-date')
-            date = date_elem.text.strip() if date_elem else "Unknown Date"
-            
-            # Extract authors
-            authors = []
-            for author_elem in article.select('.highwire-citation-author'):
-                authors.append(author_elem.text.strip())
-            
-            # Get abstract if possible (need to visit the article page)
-            abstract = "Abstract not available via search"
-            if full_link:
-                try:
-                    article_response = requests.get(full_link, headers=headers, timeout=5)
-                    article_soup = BeautifulSoup(article_response.text, 'html.parser')
-                    abstract_elem = article_soup.select_one('.abstract')
-                    if abstract_elem:
-                        abstract = abstract_elem.text.strip()
-                except:
-                    # Skip if we can't get the abstract
-                    pass
-            
-            pdf_link = ""
-            if doi:
-                pdf_link = f"https://www.biorxiv.org/content/10.1101/{doi.split('/')[-1]}.full.pdf"
-            elif full_link:
-                pdf_link = full_link + ".full.pdf"
-            
-            study = {
-                'doi': doi,
-                'title': title,
-                'authors': authors,
-                'journal': 'bioRxiv',
-                'publication_date': date,
-                'abstract': abstract,
-                'source_url': full_link,
-                'pdf_link': pdf_link,
-                'database': 'bioRxiv'
-            }
-            
-            # Only add if related to NMN/NAD+
-            if (
-                "NMN" in title or 
-                "Nicotinamide" in title or 
-                "NAD+" in title or
-                "Nicotinamide" in abstract or
-                "NMN" in abstract or
-                "NAD+" in abstract
-            ):
-                results.append(study)
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error searching bioRxiv via web: {e}")
-    
-    return results
+        messages = data.get('messages') or [{}]
+        total = int(messages[0].get('total') or 0)
+        cursor += len(collection)
+        if collection and cursor < total:
+            return results, (window, server, cursor)
+        if server + 1 < len(SERVERS):
+            return results, (window, server + 1, 0)
+        if window + 1 < len(windows):
+            return results, (window + 1, 0, 0)
+        return results, None
+    
+    return PagedResults(fetch_page, (0, 0, 0), max_results, name="bioRxiv/medRxiv preprints")
 
-def _search_medrxiv_site(term, headers):
-    """Search the medRxiv website directly.
+def _query_matcher(query, additional_terms):
+    """Build a local stand-in for the search engine's query matching.
+    
+    The query matches if any of its OR alternatives has all of its words (or
+    quoted phrases) in the text; additional terms, if given, must contribute
+    at least one match as well, like the "AND (a OR b)" used for PubMed.
     
     Args:
-        term (str): Search term
-        headers (dict): HTTP headers for requests
+        query (str): Main search query
+        additional_terms (list): Additional search terms
     
     Returns:
-        list: medRxiv results
+        function: Takes a text and returns True if it matches
     """
-    results = []
-    try:
-        search_url = f"https://www.medrxiv.org/search/{term}"
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract articles (similar code as above)
-        for article in soup.select('.highwire-article-citation'):
-            title_elem = article.select_one('.highwire-cite-title')
-            title = title_elem.text.strip() if title_elem else "Unknown Title"
-            
-            link_elem = title_elem.find('a') if title_elem else None
-            article_link = link_elem.get('href') if link_elem else ""
-            full_link = urljoin("https://www.medrxiv.org", article_link) if article_link else ""
-            
-            doi_elem = article.select_one('.highwire-cite-metadata-doi')
-            doi = doi_elem.text.strip().replace('DOI: ', '') if doi_elem else ""
-            
-            date_elem = article.select_one('.highwire-cite-metadata-date')
-            date = date_elem.text.strip() if date_elem else "Unknown Date"
-            
-            # Extract authors
-            authors = []
-            for author_elem in article.select('.highwire-citation-author'):
-                authors.append(author_elem.text.strip())
-            
-            # Get abstract if possible
-            abstract = "Abstract not available via search"
-            
-            pdf_link = ""
-            if doi:
-                pdf_link = f"https://www.medrxiv.org/content/10.1101/{doi.split('/')[-1]}.full.pdf"
-            elif full_link:
-                pdf_link = full_link + ".full.pdf"
-            
-            study = {
-                'doi': doi,
-                'title': title,
-                'authors': authors,
-                'journal': 'medRxiv',
-                'publication_date': date,
-                'abstract': abstract,
-                'source_url': full_link,
-                'pdf_link': pdf_link,
-                'database': 'medRxiv'
-            }
-            
-            # Only add if related to NMN/NAD+
-            if (
-                "NMN" in title or 
-                "Nicotinamide" in title or 
-                "NAD+" in title
-            ):
-                results.append(study)
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error searching medRxiv via web: {e}")
-    
-    return results
+    def words(text):
+        text = text.replace('(', ' ').replace(')', ' ')
+        phrases = re.findall(r'"([^"]+)"', text)
+        rest = re.sub(r'"[^"]*"', ' ', text)
+        return [p.lower() for p in phrases] + [w.lower() for w in rest.split() if w.upper() != 'AND']
+    
+    alternatives = [words(part) for part in re.split(r'\s+OR\s+', query or '')]
+    alternatives = [alt for alt in alternatives if alt]
+    extra = [term.lower() for term in (additional_terms or []) if term]
+    
+    def contains(text, term):
+        return re.search(r'(?<!\w)' + re.escape(term) + r'(?!\w)', text) is not None
+    
+    def matches(text):
+        text = text.lower()
+        if alternatives and not any(all(contains(text, w) for w in alt) for alt in alternatives):
+            return False
+        return not extra or any(contains(text, term) for term in extra)
+    
+    return matches
 
-def process_biorxiv_results(results, download_func, output_dir, headers, delay):
+def _parse_preprint(item, server, display_name):
+    """Turn a details API record into study metadata."""
+    doi = item.get('doi', '')
+    source_url = f"https://www.{server}.org/content/{doi}v{item.get('version', '1')}"
+    authors = [author.strip() for author in (item.get('authors') or '').split(';') if author.strip()]
+    
+    return {
+        'doi': doi,
+        'title': item.get('title', 'Unknown Title').strip(),
+        'authors': authors,
+        'journal': display_name,
+        'publication_date': item.get('date', 'Unknown Date'),
+        'abstract': (item.get('abstract') or 'No abstract available').strip(),
+        'source_url': source_url,
+        # Without a version suffix the server redirects to the latest version's PDF
+        'pdf_link': f"https://www.{server}.org/content/{doi}.full.pdf",
+        'database': display_name
+    }
+
+def process_biorxiv_results(results, download_func, output_dir, headers, delay, client=None):
     """Process bioRxiv/medRxiv search results.
     
     Args:
-        results (list): List of bioRxiv study metadata
-        download_func (function): Function to download PDFs
+        results (iterable): bioRxiv/medRxiv study metadata
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
-    for study in results:
+    for i, study in enumerate(results):
         print(f"Processing bioRxiv/medRxiv preprint: {study.get('doi', 'Unknown DOI')}...")
         
         # Try to download PDF if available
         if study.get('pdf_link'):
-            identifier = study.get('doi', '').split('/')[-1] if study.get('doi') else f"biorxiv_{len(processed_studies)}"
-            pdf_path = download_func(study['pdf_link'], f"biorxiv_{identifier}", overwrite=True)
-            study['local_pdf_path'] = pdf_path
-        
-        processed_studies.append(study)
+            identifier = study.get('doi', '').split('/')[-1] if study.get('doi') else f"biorxiv_{i}"
+            download_func(study['pdf_link'], f"biorxiv_{identifier}", overwrite=True, study=study)
         
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+        yield study
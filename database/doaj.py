@@ -2,10 +2,12 @@
 DOAJ (Directory of Open Access Journals) search module for NMN Study Downloader
 """
 
-import time
 import requests
 
-def search_doaj(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.paging import PagedResults
+
+def search_doaj(query, additional_terms, headers, max_results=None, client=None):
     """Search Directory of Open Access Journals for NMN studies.
     
     Args:
@@ -13,115 +15,126 @@ def search_doaj(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
-        list: List of article metadata
+        PagedResults: Lazy stream of article metadata that follows DOAJ's page
+            numbers, or an empty list if the search failed
     """
     print(f"Searching DOAJ for: {query}")
     
     # Encode the query for URL
     search_query = query.replace(' ', '+')
     page_size = 100 if max_results is None or max_results > 100 else max_results
-    url = f"https://doaj.org/api/search/articles/{search_query}?pageSize={page_size}"
+    url = f"https://doaj.org/api/search/articles/{search_query}"
     
-    try:
-        response = requests.get(url, headers=headers)
+    client = get_client(client)
+    info = {}
+    
+    def fetch_page(page):
+        response = client.get(url, params={'page': page, 'pageSize': page_size}, headers=headers)
         response.raise_for_status()
-        
         data = response.json()
-        results = []
+        info.setdefault('total', data.get('total'))
         
-        if 'results' in data:
-            for item in data['results']:
-                bibjson = item.get('bibjson', {})
-                
-                # Extract authors
-                authors = []
-                for author in bibjson.get('author', []):
-                    name_parts = []
-                    if 'name' in author:
-                        name_parts.append(author['name'])
-                    else:
-                        if 'given' in author:
-                            name_parts.append(author['given'])
-                        if 'family' in author:
-                            name_parts.append(author['family'])
-                    authors.append(' '.join(name_parts))
-                
-                # Get journal
-                journal = bibjson.get('journal', {}).get('title', 'Unknown Journal')
-                
-                # Get URL and PDF link
-                source_url = None
-                pdf_link = None
-                for link in bibjson.get('link', []):
-                    if link.get('type') == 'fulltext':
-                        source_url = link.get('url')
-                    if link.get('content_type', '').lower() == 'application/pdf':
-                        pdf_link = link.get('url')
-                
-                # Extract DOI - handle identifier as either list or dict
-                doi = ""
-                identifiers = bibjson.get('identifier', [])
-                if isinstance(identifiers, list):
-                    # Handle identifier as list
-                    for identifier in identifiers:
-                        if identifier.get('type') == 'doi':
-                            doi = identifier.get('id', '')
-                            break
-                elif isinstance(identifiers, dict):
-                    # Handle identifier as dictionary (old method)
-                    doi = identifiers.get('doi', '')
-                
-                study = {
-                    'doi': doi,
-                    'title': bibjson.get('title', 'Unknown Title'),
-                    'authors': authors,
-                    'journal': journal,
-                    'publication_date': bibjson.get('year', 'Unknown Date'),
-                    'abstract': bibjson.get('abstract', 'Abstract not available'),
-                    'source_url': source_url or (f"https://doi.org/{doi}" if doi else "#"),
-                    'pdf_link': pdf_link,
-                    'database': 'DOAJ'
-                }
-                results.append(study)
-                
-                if max_results is not None and len(results) >= max_results:
-                    break
+        items = data.get('results', [])
+        results = [_parse_doaj_item(item) for item in items]
         
+        if not items or not data.get('next') or page * page_size >= (data.get('total') or 0):
+            return results, None
+        return results, page + 1
+    
+    try:
+        results = PagedResults(fetch_page, 1, max_results, name="DOAJ results")
+        results.total = info.get('total')
         return results
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error searching DOAJ: {e}")
         return []
 
-def process_doaj_results(results, download_func, output_dir, headers, delay):
+def _parse_doaj_item(item):
+    """Turn one DOAJ search result into a study dictionary.
+    
+    Args:
+        item (dict): Result from the DOAJ search API
+    
+    Returns:
+        dict: Study metadata
+    """
+    bibjson = item.get('bibjson', {})
+    
+    # Extract authors
+    authors = []
+    for author in bibjson.get('author', []):
+        name_parts = []
+        if 'name' in author:
+            name_parts.append(author['name'])
+        else:
+            if 'given' in author:
+                name_parts.append(author['given'])
+            if 'family' in author:
+                name_parts.append(author['family'])
+        authors.append(' '.join(name_parts))
+    
+    # Get journal
+    journal = bibjson.get('journal', {}).get('title', 'Unknown Journal')
+    
+    # Get URL and PDF link
+    source_url = None
+    pdf_link = None
+    for link in bibjson.get('link', []):
+        if link.get('type') == 'fulltext':
+            source_url = link.get('url')
+        if link.get('content_type', '').lower() == 'application/pdf':
+            pdf_link = link.get('url')
+    
+    # Extract DOI - handle identifier as either list or dict
+    doi = ""
+    identifiers = bibjson.get('identifier', [])
+    if isinstance(identifiers, list):
+        # Handle identifier as list
+        for identifier in identifiers:
+            if identifier.get('type') == 'doi':
+                doi = identifier.get('id', '')
+                break
+    elif isinstance(identifiers, dict):
+        # Handle identifier as dictionary (old method)
+        doi = identifiers.get('doi', '')
+    
+    return {
+        'doi': doi,
+        'title': bibjson.get('title', 'Unknown Title'),
+        'authors': authors,
+        'journal': journal,
+        'publication_date': bibjson.get('year', 'Unknown Date'),
+        'abstract': bibjson.get('abstract', 'Abstract not available'),
+        'source_url': source_url or (f"https://doi.org/{doi}" if doi else "#"),
+        'pdf_link': pdf_link,
+        'database': 'DOAJ'
+    }
+
+def process_doaj_results(results, download_func, output_dir, headers, delay, client=None):
     """Process DOAJ search results.
     
     Args:
-        results (list): List of DOAJ study metadata
-        download_func (function): Function to download PDFs
+        results (iterable): DOAJ study metadata (list or lazy result stream)
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
-    for study in results:
+    for i, study in enumerate(results):
         print(f"Processing DOAJ article: {study.get('doi', 'Unknown DOI')}...")
         
         # Try to download PDF if available
         if study.get('pdf_link'):
-            identifier = study.get('doi', '').replace('/', '_') if study.get('doi') else f"doaj_{len(processed_studies)}"
-            pdf_path = download_func(study['pdf_link'], f"doaj_{identifier}", overwrite=True)
-            study['local_pdf_path'] = pdf_path
+            identifier = study.get('doi', '').replace('/', '_') if study.get('doi') else f"doaj_{i}"
+            download_func(study['pdf_link'], f"doaj_{identifier}", overwrite=True, study=study)
         
-        processed_studies.append(study)
-        
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+        yield study
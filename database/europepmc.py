@@ -2,16 +2,19 @@
 Europe PMC search module for NMN Study Downloader
 """
 
-import time
 import requests
 import urllib.parse
 import re
-from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import random
 
-def search_europepmc(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+from utils.crosswalk import find_pmcid
+from utils.paging import PagedResults
+from utils.doi_cache import get_doi_cache, landing_url
+from utils.strategies import race_strategies, publisher_key
+
+def search_europepmc(query, additional_terms, headers, max_results=None, client=None, since=None):
     """Search Europe PMC for studies related to NMN.
     
     Args:
@@ -19,9 +22,12 @@ def search_europepmc(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        since (date): Only return records added to Europe PMC on or after this date
     
     Returns:
-        list: List of study metadata
+        PagedResults: Lazy stream of study metadata that follows Europe PMC's
+            cursorMark paging, or an empty list if the search failed
     """
     base_query = query
     
@@ -33,6 +39,10 @@ def search_europepmc(query, additional_terms, headers, max_results=None):
     
     print(f"Searching Europe PMC for: {base_query}")
     
+    if since:
+        # CREATION_DATE is when the record entered Europe PMC, so late-indexed papers are not missed
+        base_query = f"({base_query}) AND CREATION_DATE:[{since.isoformat()} TO 3000-12-31]"
+    
     # Create a safer query string
     search_query = urllib.parse.quote(base_query)
     
@@ -40,74 +50,88 @@ def search_europepmc(query, additional_terms, headers, max_results=None):
     page_size = 100 if max_results is None or max_results > 100 else max_results
     url = f"https://www.ebi.ac.uk/europepmc/webservices/rest/search?query={search_query}&format=json&resultType=core&pageSize={page_size}"
     
-    try:
-        # Create a session with retry capabilities
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        
-        response = session.get(url, headers=headers, timeout=30)
+    client = get_client(client)
+    info = {}
+    
+    def fetch_page(state):
+        cursor, offset = state
+        response = client.get(url, params={'cursorMark': cursor}, headers=headers, timeout=30)
         response.raise_for_status()
-        
         data = response.json()
-        results = []
+        info.setdefault('total', data.get('hitCount'))
         
-        if 'resultList' in data and 'result' in data['resultList']:
-            for item in data['resultList']['result']:
-                # Extract source and ID for URL construction
-                source = item.get('source', 'MED')
-                item_id = item.get('id', '')
-                
-                # Construct source URL
-                source_url = f"https://europepmc.org/article/{source.lower()}/{item_id}"
-                
-                # Generate a unique identifier that we'll use for filenames
-                unique_id = item.get('pmid', item.get('id', ''))
-                if not unique_id and item.get('doi'):
-                    # Use DOI if we don't have PMID or ID
-                    unique_id = item.get('doi').replace('/', '_')
-                
-                # Ensure unique_id is not empty
-                if not unique_id:
-                    unique_id = f"europmc_{len(results)}"
-                
-                study = {
-                    'pmid': item.get('pmid', ''),
-                    'pmcid': item.get('pmcid', ''),
-                    'doi': item.get('doi', ''),
-                    'unique_id': unique_id,  # Add a unique ID field for referencing
-                    'title': item.get('title', 'Unknown Title'),
-                    'authors': [author.get('fullName', '') for author in item.get('authorList', {}).get('author', [])],
-                    'journal': item.get('journalTitle', 'Unknown Journal'),
-                    'publication_date': item.get('firstPublicationDate', 'Unknown Date'),
-                    'abstract': item.get('abstractText', 'Abstract not available'),
-                    'source_url': source_url,
-                    'source_type': source.lower(),  # Store the source type (med, ppr, etc.)
-                    'database': 'Europe PMC'
-                }
-                
-                # We'll determine PDF links in the processing function
-                study['pdf_link'] = None
-                
-                results.append(study)
-                
-                if max_results is not None and len(results) >= max_results:
-                    break
+        items = data.get('resultList', {}).get('result', [])
+        results = [_parse_europepmc_item(item, offset + i) for i, item in enumerate(items)]
         
+        next_cursor = data.get('nextCursorMark')
+        if not items or not next_cursor or next_cursor == cursor:
+            return results, None
+        return results, (next_cursor, offset + len(results))
+    
+    try:
+        results = PagedResults(fetch_page, ('*', 0), max_results, name="Europe PMC results")
+        results.total = info.get('total')
         return results
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error searching Europe PMC: {e}")
         return []
 
-def find_pdf_link_on_europepmc(url, study, headers):
+def _parse_europepmc_item(item, index):
+    """Turn one Europe PMC search result into a study dictionary.
+    
+    Args:
+        item (dict): Result from the Europe PMC REST API
+        index (int): Position of the result in the whole result set
+    
+    Returns:
+        dict: Study metadata
+    """
+    # Extract source and ID for URL construction
+    source = item.get('source', 'MED')
+    item_id = item.get('id', '')
+    
+    # Construct source URL
+    source_url = f"https://europepmc.org/article/{source.lower()}/{item_id}"
+    
+    # Generate a unique identifier that we'll use for filenames
+    unique_id = item.get('pmid', item.get('id', ''))
+    if not unique_id and item.get('doi'):
+        # Use DOI if we don't have PMID or ID
+        unique_id = item.get('doi').replace('/', '_')
+    
+    # Ensure unique_id is not empty
+    if not unique_id:
+        unique_id = f"europmc_{index}"
+    
+    study = {
+        'pmid': item.get('pmid', ''),
+        'pmcid': item.get('pmcid', ''),
+        'doi': item.get('doi', ''),
+        'unique_id': unique_id,  # Add a unique ID field for referencing
+        'title': item.get('title', 'Unknown Title'),
+        'authors': [author.get('fullName', '') for author in item.get('authorList', {}).get('author', [])],
+        'journal': item.get('journalTitle', 'Unknown Journal'),
+        'publication_date': item.get('firstPublicationDate', 'Unknown Date'),
+        'abstract': item.get('abstractText', 'Abstract not available'),
+        'source_url': source_url,
+        'source_type': source.lower(),  # Store the source type (med, ppr, etc.)
+        'database': 'Europe PMC'
+    }
+    
+    # We'll determine PDF links in the processing function
+    study['pdf_link'] = None
+    
+    return study
+
+def find_pdf_link_on_europepmc(url, study, headers, client=None):
     """Find PDF download link from Europe PMC article page.
     
     Args:
         url (str): URL of the Europe PMC article
         study (dict): Study metadata dict
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         str: PDF download link or None if not found
@@ -115,11 +139,7 @@ def find_pdf_link_on_europepmc(url, study, headers):
     try:
         print(f"Checking Europe PMC article page for PDF links: {url}")
         
-        # Create a session with retry capabilities
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        client = get_client(client)
         
         # Use browser-like headers
         browser_headers = {
@@ -131,7 +151,7 @@ def find_pdf_link_on_europepmc(url, study, headers):
         }
         
         # Follow redirects
-        response = session.get(url, headers=browser_headers, timeout=30, allow_redirects=True)
+        response = client.get(url, headers=browser_headers, timeout=30, allow_redirects=True)
         final_url = response.url  # Get the final URL after any redirects
         
         if response.status_code != 200:
@@ -142,7 +162,7 @@ def find_pdf_link_on_europepmc(url, study, headers):
         if final_url != url:
             print(f"Redirected to: {final_url}")
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # 1. Check for PDF links in the full text links section (most common location)
         full_text_section = soup.select_one('#free-full-text-links-list, .full-text-links, .supplementary-materials, .ftl')
@@ -192,12 +212,17 @@ def find_pdf_link_on_europepmc(url, study, headers):
         print(f"Error examining Europe PMC page: {e}")
         return None
 
-def get_pdf_from_doi_site(doi, headers):
+def get_pdf_from_doi_site(doi, headers, client=None):
     """Get PDF link by following the DOI to the source website.
     
+    The outcome, including a landing page without any PDF link, is kept in
+    the client's DOI cache, so the DOI is not followed again until the entry
+    expires.
+    
     Args:
         doi (str): DOI of the article
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         str: PDF download link or None if not found
@@ -205,6 +230,31 @@ def get_pdf_from_doi_site(doi, headers):
     if not doi:
         return None
     
+    cache = get_doi_cache(client)
+    entry = cache.lookup(doi) if cache else None
+    if entry:
+        if entry['pdf_found'] is not None:
+            print(f"Using cached PDF lookup for DOI {doi}: {entry['pdf_url'] or 'no PDF link'}")
+            return entry['pdf_url']
+        if entry['landing_ok'] is False:
+            print(f"Skipping DOI {doi}, it recently failed to resolve ({entry['error']})")
+            return None
+    
+    pdf_link, parsed = _scrape_pdf_from_doi_site(doi, headers, client=client)
+    
+    # Only remember the result if this call actually read the landing page; a
+    # timeout or a cancelled request says nothing about whether it has a PDF
+    if cache and parsed:
+        cache.record_pdf(doi, pdf_link)
+    return pdf_link
+
+def _scrape_pdf_from_doi_site(doi, headers, client=None):
+    """Follow a DOI (or its cached landing page) and look for a PDF link on the page.
+    
+    Returns:
+        tuple: (PDF link or None, whether the landing page was fetched and parsed)
+    """
+    
     # Special handling for preprints.org DOIs
     if 'preprints' in doi:
         print(f"Special direct handling for preprints.org DOI: {doi}")
@@ -221,17 +271,16 @@ def get_pdf_from_doi_site(doi, headers):
             download_url = f"{manuscript_url}/download"
             
             print(f"Constructed direct preprints.org download URL: {download_url}")
-            return download_url
+            return download_url, False
     
-    doi_url = f"https://doi.org/{doi}"
+    cache = get_doi_cache(client)
+    doi_url = landing_url(doi, client)
     print(f"Following DOI link: {doi_url}")
     
     try:
-        # Create a session with retry capabilities and cookies support
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        # Use a session with its own cookies (publisher consent pages set them
+        # during the redirect chain) that still shares the pooled connections
+        session = get_client(client).new_session()
         
         # Use a browser-like user agent
         user_agents = [
@@ -264,6 +313,8 @@ def get_pdf_from_doi_site(doi, headers):
         
         if response.status_code != 200:
             print(f"Failed to follow DOI link: {response.status_code}")
+            if cache:
+                cache.record_landing(doi, error=f"HTTP {response.status_code}")
             # For preprints.org DOIs, still try our constructed URL
             if 'preprints' in doi:
                 match = re.search(r'preprints(\d+)\.(\d+)(?:\.v(\d+))?', doi)
@@ -273,15 +324,17 @@ def get_pdf_from_doi_site(doi, headers):
                     version = match.group(3) if match.group(3) else "1"
                     preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                     print(f"Using direct preprints.org URL despite DOI failure: {preprint_url}")
-                    return preprint_url
-            return None
+                    return preprint_url, False
+            return None, False
             
         # Now we're on the actual publication site
         final_url = response.url
         print(f"DOI redirected to final URL: {final_url}")
+        if cache:
+            cache.record_landing(doi, final_url)
         
         # Parse the page content
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Site-specific handlers for common publishers
         # Preprints.org
@@ -294,7 +347,7 @@ def get_pdf_from_doi_site(doi, headers):
                     if href:
                         full_link = urllib.parse.urljoin(final_url, href)
                         print(f"Found preprints.org download link: {full_link}")
-                        return full_link
+                        return full_link, True
             
             # Try to construct the download URL for preprints.org
             if '/manuscript/' in final_url:
@@ -305,7 +358,7 @@ def get_pdf_from_doi_site(doi, headers):
                     version = match.group(2)
                     preprint_url = f"https://www.preprints.org/manuscript/{id_part}/v{version}/download"
                     print(f"Constructed preprints.org download URL: {preprint_url}")
-                    return preprint_url
+                    return preprint_url, True
         
         # BioRxiv/MedRxiv
         elif 'biorxiv.org' in final_url or 'medrxiv.org' in final_url:
@@ -316,7 +369,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found bioRxiv/medRxiv download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # Nature
         elif 'nature.com' in final_url:
@@ -327,7 +380,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found Nature download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # Science
         elif 'science.org' in final_url or 'sciencemag.org' in final_url:
@@ -338,7 +391,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found Science download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # Cell/Elsevier
         elif 'cell.com' in final_url or 'sciencedirect.com' in final_url:
@@ -349,7 +402,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found Cell/Elsevier download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # MDPI
         elif 'mdpi.com' in final_url:
@@ -360,7 +413,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found MDPI download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # Frontiers
         elif 'frontiersin.org' in final_url:
@@ -371,7 +424,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found Frontiers download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # PLoS
         elif 'plos' in final_url:
@@ -382,7 +435,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found PLOS download link: {full_link}")
-                    return full_link
+                    return full_link, True
         
         print("Using generic PDF detection for publisher site")
         
@@ -397,7 +450,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found generic download button: {full_link}")
-                    return full_link
+                    return full_link, True
         
         # 2. Look for any link with "PDF" in href
         print("Looking for links with PDF in the URL...")
@@ -408,7 +461,7 @@ def get_pdf_from_doi_site(doi, headers):
             if href and ('download' in link_text or 'full text' in link_text or 'pdf' in link_text):
                 full_link = urllib.parse.urljoin(final_url, href)
                 print(f"Found link with PDF in href: {full_link}")
-                return full_link
+                return full_link, True
         
         # 3. Look for any link with "PDF" in the text
         print("Looking for links with PDF in the text...")
@@ -419,7 +472,7 @@ def get_pdf_from_doi_site(doi, headers):
                 if href:
                     full_link = urllib.parse.urljoin(final_url, href)
                     print(f"Found link with PDF text: {full_link}")
-                    return full_link
+                    return full_link, True
         
         print(f"No PDF download link found on {final_url}")
         
@@ -432,9 +485,9 @@ def get_pdf_from_doi_site(doi, headers):
                 version = match.group(3) if match.group(3) else "1"
                 preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                 print(f"Using preprints.org download URL as last resort: {preprint_url}")
-                return preprint_url
+                return preprint_url, True
                 
-        return None
+        return None, True
     
     except requests.exceptions.Timeout as e:
         print(f"Timeout following DOI link: {e}")
@@ -447,8 +500,8 @@ def get_pdf_from_doi_site(doi, headers):
                 version = match.group(3) if match.group(3) else "1"
                 preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                 print(f"Using preprints.org URL after timeout: {preprint_url}")
-                return preprint_url
-        return None
+                return preprint_url, False
+        return None, False
     except requests.exceptions.TooManyRedirects as e:
         print(f"Too many redirects following DOI link: {e}")
         # Return direct URL for preprints
@@ -460,8 +513,8 @@ def get_pdf_from_doi_site(doi, headers):
                 version = match.group(3) if match.group(3) else "1"
                 preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                 print(f"Using preprints.org URL after redirect problem: {preprint_url}")
-                return preprint_url
-        return None
+                return preprint_url, False
+        return None, False
     except requests.exceptions.RequestException as e:
         print(f"Request error following DOI link: {e}")
         # Return direct URL for preprints
@@ -473,8 +526,8 @@ def get_pdf_from_doi_site(doi, headers):
                 version = match.group(3) if match.group(3) else "1"
                 preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                 print(f"Using preprints.org URL after request error: {preprint_url}")
-                return preprint_url
-        return None
+                return preprint_url, False
+        return None, False
     except Exception as e:
         print(f"Unexpected error following DOI link: {e}")
         # Return direct URL for preprints
@@ -486,44 +539,32 @@ def get_pdf_from_doi_site(doi, headers):
                 version = match.group(3) if match.group(3) else "1"
                 preprint_url = f"https://www.preprints.org/manuscript/{year_month}.{number}/v{version}/download"
                 print(f"Using preprints.org URL after unexpected error: {preprint_url}")
-                return preprint_url
-        return None
+                return preprint_url, False
+        return None, False
 
-def find_pdf_from_original_source(study, headers):
-    """Try to find PDF from the original source using available IDs.
-    
-    Args:
-        study (dict): Study metadata
-        headers (dict): HTTP headers for requests
-    
-    Returns:
-        str: PDF download link or None if not found
-    """
-    # 1. Try DOI-based approach (most reliable for finding original source)
-    if study.get('doi'):
-        print(f"Looking for PDF on original source via DOI: {study.get('doi')}")
-        pdf_link = get_pdf_from_doi_site(study.get('doi'), headers)
-        if pdf_link:
-            return pdf_link
-    
-    # 2. Try PMC-based approach (for open access articles)
-    if study.get('pmcid'):
-        pmc_id = study.get('pmcid')
+def _pmcid_pdf_link(study, client=None):
+    """Build the Europe PMC PDF URL from the study's PMC ID (using the crosswalk if needed)."""
+    pmc_id = find_pmcid(study, client)
+    if pmc_id:
         pmc_match = re.search(r'(?:PMC)?(\d+)', pmc_id)
         if pmc_match:
             pmc_num = pmc_match.group(1)
             pmc_pdf = f"https://europepmc.org/articles/PMC{pmc_num}/pdf/main.pdf"
             print(f"Created PDF link from PMCID: {pmc_pdf}")
             return pmc_pdf
-    
-    # 3. Try PMID-based approach (fallback to PubMed Central)
+    return None
+
+def _pmid_pdf_link(study):
+    """Build the PubMed Central PDF URL from the study's PMID."""
     if study.get('pmid'):
         pmid = study.get('pmid')
         pmid_pdf = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{pmid}/pdf/"
         print(f"Created PDF link from PMID (PMC fallback): {pmid_pdf}")
         return pmid_pdf
-    
-    # 4. For preprints, try known repositories
+    return None
+
+def _preprint_pdf_link(study):
+    """Build the PDF URL of a preprint on preprints.org, bioRxiv or medRxiv."""
     if study.get('source_type') == 'ppr' and study.get('doi'):
         doi = study.get('doi')
         
@@ -549,21 +590,46 @@ def find_pdf_from_original_source(study, headers):
     
     return None
 
-def process_europepmc_results(results, download_func, output_dir, headers, delay):
-    """Process Europe PMC search results.
+def _original_source_strategies(study, headers, client=None):
+    """Return the ways of finding a PDF outside Europe PMC, most reliable first.
     
     Args:
-        results (list): List of Europe PMC study metadata
-        download_func (function): Function to download PDFs
-        output_dir (str): Output directory
+        study (dict): Study metadata
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
-        list: List of processed study data
+        list: (name, function) pairs for race_strategies()
     """
-    processed_studies = []
+    strategies = []
+    # 1. DOI-based approach (most reliable for finding original source)
+    if study.get('doi'):
+        strategies.append(('doi_site', lambda: get_pdf_from_doi_site(study.get('doi'), headers, client=client)))
+    # 2. PMC-based approach (for open access articles)
+    strategies.append(('pmcid', lambda: _pmcid_pdf_link(study, client)))
+    # 3. PMID-based approach (fallback to PubMed Central)
+    if study.get('pmid'):
+        strategies.append(('pmid_pmc', lambda: _pmid_pdf_link(study)))
+    # 4. For preprints, known repositories
+    if study.get('source_type') == 'ppr' and study.get('doi'):
+        strategies.append(('preprint_repository', lambda: _preprint_pdf_link(study)))
+    return strategies
+
+def process_europepmc_results(results, download_func, output_dir, headers, delay, client=None):
+    """Process Europe PMC search results.
     
+    Args:
+        results (iterable): Europe PMC study metadata (list or lazy result stream)
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
+        output_dir (str): Output directory
+        headers (dict): HTTP headers for requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+    
+    Yields:
+        dict: Processed study data, as soon as each study is done
+    """
     browser_headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -573,7 +639,7 @@ def process_europepmc_results(results, download_func, output_dir, headers, delay
     for i, study in enumerate(results):
         # Use the unique_id for display and file naming
         identifier = study.get('unique_id', f"europmc_{i}")
-        print(f"Processing Europe PMC study: {identifier}... ({i+1}/{len(results)})")
+        print(f"Processing Europe PMC study: {identifier}... ({i+1})")
         
         # Store original identifier for debugging
         pmid_text = f"europmc_{identifier}" if isinstance(identifier, str) else f"europmc_{i}"
@@ -586,63 +652,39 @@ def process_europepmc_results(results, download_func, output_dir, headers, delay
         if study.get('source_type') == 'ppr' and study.get('doi'):
             print(f"Special handling for preprint with DOI: {study.get('doi')}")
             # For preprints, go directly to original source via DOI
-            pdf_link = get_pdf_from_doi_site(study.get('doi'), browser_headers)
+            pdf_link = get_pdf_from_doi_site(study.get('doi'), browser_headers, client=client)
             if pdf_link:
                 print(f"Found preprint PDF link from DOI: {pdf_link}")
                 study['pdf_link'] = pdf_link
                 
-                # Sanitize identifier for filename
-                safe_identifier = re.sub(r'[^\w\-.]', '_', identifier)
-                
                 # Try to download with special handling (downloader.py will handle preprints.org differently)
-                print(f"Attempting to download preprint PDF")
-                pdf_path = download_func(pdf_link, pmid_text, overwrite=True)
+                print(f"Queueing preprint PDF download")
+                download_func(pdf_link, pmid_text, overwrite=True, study=study)
                 
-                if pdf_path:
-                    study['local_pdf_path'] = pdf_path
-                    print(f"Successfully downloaded preprint PDF to {pdf_path}")
-                else:
-                    print(f"Failed to download preprint PDF - will create one from article content")
-                
-                processed_studies.append(study)
-                time.sleep(delay)
+                yield study
                 continue
         
-        # Regular handling for non-preprints
-        # Strategy 1: Check Europe PMC page first
+        # Regular handling for non-preprints: the Europe PMC page and the original
+        # source strategies race, best first for this publisher
+        strategies = []
         if study.get('source_url'):
-            pdf_link = find_pdf_link_on_europepmc(study['source_url'], study, browser_headers)
-            if pdf_link:
-                print(f"Found PDF link on Europe PMC page: {pdf_link}")
+            # Bound now: a strategy still running after the race may outlive this iteration
+            strategies.append(('europepmc_page', lambda study=study: find_pdf_link_on_europepmc(
+                study['source_url'], study, browser_headers, client=client)))
+        strategies += _original_source_strategies(study, browser_headers, client=client)
         
-        # Strategy 2: If no PDF found on EuropePMC, try original source
-        if not pdf_link:
-            pdf_link = find_pdf_from_original_source(study, browser_headers)
-            if pdf_link:
-                print(f"Found PDF link from original source: {pdf_link}")
+        pdf_link = race_strategies(strategies, publisher_key(study), browser_headers, client=client)
+        if pdf_link:
+            print(f"Found PDF link: {pdf_link}")
         
         # Set the PDF link in the study data
         study['pdf_link'] = pdf_link
         
         # Try to download PDF if available
         if study.get('pdf_link'):
-            # Sanitize identifier for filename
-            safe_identifier = re.sub(r'[^\w\-.]', '_', identifier)
-            
-            print(f"Attempting to download PDF from: {study['pdf_link']}")
-            pdf_path = download_func(study['pdf_link'], pmid_text, overwrite=True)
-            
-            if pdf_path:
-                study['local_pdf_path'] = pdf_path
-                print(f"Successfully downloaded PDF to {pdf_path}")
-            else:
-                print(f"Failed to download PDF - will create one from article content")
+            print(f"Queueing PDF download from: {study['pdf_link']}")
+            download_func(study['pdf_link'], pmid_text, overwrite=True, study=study)
         else:
             print(f"No PDF link found - will create one from article content")
         
-        processed_studies.append(study)
-        
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+        yield study
@@ -7,12 +7,14 @@ import time
 import random
 import urllib.parse
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-def search_google_scholar(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+from utils.strategies import race_strategies, publisher_key
+from utils.negative_cache import get_negative_cache
+
+def search_google_scholar(query, additional_terms, headers, max_results=None, client=None):
     """Search Google Scholar for studies related to NMN.
     
     Args:
@@ -20,6 +22,7 @@ def search_google_scholar(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         list: List of study metadata
@@ -42,11 +45,8 @@ def search_google_scholar(query, additional_terms, headers, max_results=None):
     results_per_page = 10
     
     try:
-        # Create a session with retry logic for GET only
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        # Google Scholar tracks its consent cookies per session
+        session = get_client(client).new_session()
         
         # Enhanced browser-like headers to avoid being detected as a bot
         scholar_headers = {
@@ -87,7 +87,8 @@ def search_google_scholar(query, additional_terms, headers, max_results=None):
                 break
                 
             # Parse the HTML response
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Result blocks plus the next page link, which sits outside them
+            soup = parse_html(response.text, only={'class_': ['gs_r', 'gs_ico_nav_next']})
             
             # Extract article data from the search results
             articles = soup.select('.gs_r.gs_or.gs_scl')
@@ -205,22 +206,26 @@ def search_google_scholar(query, additional_terms, headers, max_results=None):
         print(f"Error searching Google Scholar: {e}")
         return results
 
-def check_pdf_availability(url, headers):
+def check_pdf_availability(url, headers, client=None):
     """Check if a URL is accessible and potentially a PDF.
     
     Args:
         url (str): URL to check
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         bool, str: Success flag and potentially modified URL
     """
     try:
-        # Create a fresh session
-        session = requests.Session()
-        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        client = get_client(client)
+        
+        # Links that recently failed are not requested again
+        negative_cache = get_negative_cache(client)
+        dead = negative_cache.check(url) if negative_cache else None
+        if dead:
+            print(f"Skipping {url}, it recently failed ({dead})")
+            return False, url
         
         # Use enhanced browser-like headers
         browser_headers = {
@@ -230,152 +235,154 @@ def check_pdf_availability(url, headers):
         }
         
         # Send request with short timeout
-        response = session.get(url, headers=browser_headers, timeout=15, stream=True, allow_redirects=True)
-        
-        # If redirected, update the URL
-        if response.url != url:
-            url = response.url
-            print(f"Redirected to: {url}")
+        response = client.get(url, headers=browser_headers, timeout=15, stream=True, allow_redirects=True)
         
-        # Check status code
-        if response.status_code != 200:
-            print(f"URL returned status code: {response.status_code}")
-            return False, url
+        try:
+            # If redirected, update the URL
+            if response.url != url:
+                url = response.url
+                print(f"Redirected to: {url}")
         
-        # Check content type for PDF
-        content_type = response.headers.get('Content-Type', '').lower()
-        if 'application/pdf' in content_type or 'pdf' in content_type:
-            print(f"URL confirmed as PDF (Content-Type: {content_type})")
-            return True, url
+            # Check status code
+            if response.status_code != 200:
+                print(f"URL returned status code: {response.status_code}")
+                return False, url
         
-        # Check for PDF magic bytes
-        try:
-            first_bytes = next(response.iter_content(256), b'')[:4]
-            if first_bytes == b'%PDF':
-                print("URL content starts with PDF signature")
+            # Check content type for PDF
+            content_type = response.headers.get('Content-Type', '').lower()
+            if 'application/pdf' in content_type or 'pdf' in content_type:
+                print(f"URL confirmed as PDF (Content-Type: {content_type})")
                 return True, url
-        except:
-            pass
         
-        # If it's an HTML page, check if it contains a PDF link
-        if 'text/html' in content_type:
+            # Check for PDF magic bytes
             try:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                first_bytes = next(response.iter_content(256), b'')[:4]
+                if first_bytes == b'%PDF':
+                    print("URL content starts with PDF signature")
+                    return True, url
+            except:
+                pass
+        
+            # If it's an HTML page, check if it contains a PDF link
+            if 'text/html' in content_type:
+                try:
+                    soup = parse_html(response.content, only=['meta', 'a'])
                 
-                # Look for meta refresh
-                meta_refresh = soup.select_one('meta[http-equiv="refresh"]')
-                if meta_refresh and meta_refresh.get('content'):
-                    content = meta_refresh.get('content')
-                    url_match = re.search(r'URL=([^"\'>\s]+)', content, re.IGNORECASE)
-                    if url_match:
-                        new_url = url_match.group(1)
-                        if 'pdf' in new_url.lower():
-                            full_url = urljoin(url, new_url)
-                            print(f"Found meta refresh PDF link: {full_url}")
-                            return check_pdf_availability(full_url, headers)
+                    # Look for meta refresh
+                    meta_refresh = soup.select_one('meta[http-equiv="refresh"]')
+                    if meta_refresh and meta_refresh.get('content'):
+                        content = meta_refresh.get('content')
+                        url_match = re.search(r'URL=([^"\'>\s]+)', content, re.IGNORECASE)
+                        if url_match:
+                            new_url = url_match.group(1)
+                            if 'pdf' in new_url.lower():
+                                full_url = urljoin(url, new_url)
+                                print(f"Found meta refresh PDF link: {full_url}")
+                                return check_pdf_availability(full_url, headers, client=client)
                 
-                # Look for PDF links
-                for link in soup.select('a[href*=".pdf"], a[href*="/pdf/"]'):
-                    href = link.get('href', '')
-                    if href and ('pdf' in href.lower() or link.text.lower().startswith('pdf')):
-                        full_url = urljoin(url, href)
-                        print(f"Found potential PDF link in HTML: {full_url}")
-                        return check_pdf_availability(full_url, headers)
-            except Exception as e:
-                print(f"Error parsing HTML for PDF links: {e}")
+                    # Look for PDF links
+                    for link in soup.select('a[href*=".pdf"], a[href*="/pdf/"]'):
+                        href = link.get('href', '')
+                        if href and ('pdf' in href.lower() or link.text.lower().startswith('pdf')):
+                            full_url = urljoin(url, href)
+                            print(f"Found potential PDF link in HTML: {full_url}")
+                            return check_pdf_availability(full_url, headers, client=client)
+                except Exception as e:
+                    print(f"Error parsing HTML for PDF links: {e}")
         
-        # No PDF found
-        return False, url
+            # No PDF found
+            return False, url
+        finally:
+            # Return the connection to the shared pool, whatever the outcome
+            response.close()
         
     except Exception as e:
         print(f"Error checking PDF availability: {e}")
         return False, url
 
-def process_google_scholar_results(results, download_func, output_dir, headers, delay):
+def _checked_pdf_link(url, headers, client=None):
+    """Return the (possibly redirected) URL if it serves a PDF, otherwise None."""
+    is_pdf, updated_url = check_pdf_availability(url, headers, client=client)
+    return updated_url if is_pdf else None
+
+def _publisher_pdf_link(source_url, headers, client=None):
+    """Try the PDF URL pattern of the source URL's publisher."""
+    pdf_url = None
+    if 'nature.com' in source_url:
+        pdf_url = f"{source_url}.pdf"
+        print(f"Trying Nature PDF URL: {pdf_url}")
+    elif 'ncbi.nlm.nih.gov/pmc/articles/PMC' in source_url:
+        pmc_match = re.search(r'PMC(\d+)', source_url)
+        if pmc_match:
+            pmc_id = pmc_match.group(1)
+            pdf_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_id}/pdf/main.pdf"
+            print(f"Trying PMC PDF URL: {pdf_url}")
+    elif any(domain in source_url for domain in ['sciencedirect.com', 'elsevier.com']):
+        pdf_url = f"{source_url}/pdfft"
+        print(f"Trying Elsevier PDF URL: {pdf_url}")
+    
+    if pdf_url and check_pdf_availability(pdf_url, headers, client=client)[0]:
+        return pdf_url
+    return None
+
+def _pdf_link_strategies(study, headers, client=None):
+    """Return the ways of finding a Google Scholar result's PDF, in the old fallback order.
+    
+    Args:
+        study (dict): Google Scholar study metadata
+        headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+    
+    Returns:
+        list: (name, function) pairs for race_strategies()
+    """
+    strategies = []
+    pdf_link = study.get('pdf_link')
+    source_url = study.get('source_url')
+    if pdf_link:
+        strategies.append(('scholar_pdf_link', lambda: _checked_pdf_link(pdf_link, headers, client)))
+    if source_url:
+        strategies.append(('source_url', lambda: _checked_pdf_link(source_url, headers, client)))
+        strategies.append(('publisher_pattern', lambda: _publisher_pdf_link(source_url, headers, client)))
+    return strategies
+
+def process_google_scholar_results(results, download_func, output_dir, headers, delay, client=None):
     """Process Google Scholar search results.
     
     Args:
         results (list): List of Google Scholar study metadata
-        download_func (function): Function to download PDFs
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
     for i, study in enumerate(results):
         print(f"Processing Google Scholar study {i+1}/{len(results)}: {study.get('title')[:50]}...")
         
         # Add processed ID for PDF generation fallback
         study['processed_id'] = f"googlescholar_{study.get('unique_id')}"
         
-        # First, try to use the PDF link if available
+        # The listed PDF link, the source URL and the publisher URL patterns are
+        # checked concurrently, best first for this publisher; each one verifies its own link
+        study['pdf_link'] = race_strategies(
+            _pdf_link_strategies(study, headers, client=client),
+            publisher_key(url=study.get('source_url')), headers, client=client, verify=False
+        )
         if study.get('pdf_link'):
-            print(f"Checking direct PDF link: {study.get('pdf_link')}")
-            is_pdf, updated_url = check_pdf_availability(study.get('pdf_link'), headers)
-            
-            if is_pdf:
-                study['pdf_link'] = updated_url
-                print(f"Confirmed PDF link: {updated_url}")
-            else:
-                print(f"Direct PDF link unavailable or not a PDF")
-                study['pdf_link'] = None
-        
-        # If no PDF link or it's invalid, try to find one from the source URL
-        if not study.get('pdf_link') and study.get('source_url'):
-            print(f"Looking for PDF at source URL: {study.get('source_url')}")
-            is_source_pdf, updated_source_url = check_pdf_availability(study.get('source_url'), headers)
-            
-            if is_source_pdf:
-                study['pdf_link'] = updated_source_url
-                print(f"Source URL is or contains a PDF: {updated_source_url}")
-            else:
-                # For specific repositories, try to construct PDF URLs
-                source_url = study.get('source_url')
-                if 'nature.com' in source_url:
-                    pdf_url = f"{source_url}.pdf"
-                    print(f"Trying Nature PDF URL: {pdf_url}")
-                    is_pdf, _ = check_pdf_availability(pdf_url, headers)
-                    if is_pdf:
-                        study['pdf_link'] = pdf_url
-                elif 'ncbi.nlm.nih.gov/pmc/articles/PMC' in source_url:
-                    pmc_match = re.search(r'PMC(\d+)', source_url)
-                    if pmc_match:
-                        pmc_id = pmc_match.group(1)
-                        pdf_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_id}/pdf/main.pdf"
-                        print(f"Trying PMC PDF URL: {pdf_url}")
-                        is_pdf, _ = check_pdf_availability(pdf_url, headers)
-                        if is_pdf:
-                            study['pdf_link'] = pdf_url
-                elif any(domain in source_url for domain in ['sciencedirect.com', 'elsevier.com']):
-                    pdf_url = f"{source_url}/pdfft"
-                    print(f"Trying Elsevier PDF URL: {pdf_url}")
-                    is_pdf, _ = check_pdf_availability(pdf_url, headers)
-                    if is_pdf:
-                        study['pdf_link'] = pdf_url
+            print(f"Confirmed PDF link: {study['pdf_link']}")
         
         # Try to download PDF if available
         if study.get('pdf_link'):
             # Create a valid filename
             identifier = study.get('unique_id')
             
-            pdf_path = download_func(study['pdf_link'], f"googlescholar_{identifier}", overwrite=True)
-            if pdf_path:
-                study['local_pdf_path'] = pdf_path
-                print(f"Successfully downloaded PDF to {pdf_path}")
-            else:
-                print(f"Failed to download PDF - will try to create one from article content")
+            download_func(study['pdf_link'], f"googlescholar_{identifier}", overwrite=True, study=study)
         else:
             print(f"No PDF link found - will try to create one from article content")
         
-        processed_studies.append(study)
-        
-        # Add a delay to avoid overwhelming the server
-        wait_time = delay * 2  # Double the normal delay for Google Scholar to avoid detection
-        print(f"Waiting {wait_time} seconds before next request...")
-        time.sleep(wait_time)
-    
-    return processed_studies
+        yield study
@@ -2,12 +2,13 @@
 PubMed Central (PMC) search module for NMN Study Downloader
 """
 
-import time
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
-def search_pmc(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+
+def search_pmc(query, additional_terms, headers, max_results=None, client=None, since=None):
     """Search PubMed Central for open access studies related to NMN.
     
     Args:
@@ -15,6 +16,8 @@ def search_pmc(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        since (date): Only return articles added to PMC on or after this date
     
     Returns:
         list: List of PMC IDs
@@ -25,16 +28,20 @@ def search_pmc(query, additional_terms, headers, max_results=None):
     
     print(f"Searching PubMed Central for: {base_query}")
     
+    if since:
+        base_query = f'({base_query}) AND ("{since.strftime("%Y/%m/%d")}"[EDAT] : "3000"[EDAT])'
+    
     # Encode the query for URL
     search_query = base_query.replace(' ', '+')
     url = f"https://www.ncbi.nlm.nih.gov/pmc/?term={search_query}&filter=simsearch1.fha"
+    client = get_client(client)
     
     try:
-        response = requests.get(url, headers=headers)
+        response = client.get(url, headers=headers)
         response.raise_for_status()
         
         # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, only={'class_': 'rslt'})
         
         # Extract PMC IDs
         pmc_ids = []
@@ -49,23 +56,25 @@ def search_pmc(query, additional_terms, headers, max_results=None):
         print(f"Error searching PMC: {e}")
         return []
 
-def get_pmc_details(pmc_id, headers):
+def get_pmc_details(pmc_id, headers, client=None):
     """Get details for a specific study by its PMC ID.
     
     Args:
         pmc_id (str): PMC ID of the study
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         dict: Study details
     """
     url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/"
+    client = get_client(client)
     
     try:
-        response = requests.get(url, headers=headers)
+        response = client.get(url, headers=headers)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Extract title
         title_elem = soup.select_one('.content-title')
@@ -125,34 +134,28 @@ def get_pmc_details(pmc_id, headers):
         print(f"Error getting details for PMC article {pmc_id}: {e}")
         return None
 
-def process_pmc_results(pmc_ids, download_func, output_dir, headers, delay):
+def process_pmc_results(pmc_ids, download_func, output_dir, headers, delay, client=None):
     """Process PMC search results.
     
     Args:
         pmc_ids (list): List of PMC IDs
-        download_func (function): Function to download PDFs
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
     for pmc_id in pmc_ids:
         print(f"Processing PMC study {pmc_id}...")
-        study_data = get_pmc_details(pmc_id, headers)
+        study_data = get_pmc_details(pmc_id, headers, client=client)
         
         if study_data:
             # Try to download PDF if available
             if study_data.get('pdf_link'):
-                pdf_path = download_func(study_data['pdf_link'], f"pmc_{pmc_id}", overwrite=True)
-                study_data['local_pdf_path'] = pdf_path
+                download_func(study_data['pdf_link'], f"pmc_{pmc_id}", overwrite=True, study=study_data)
             
-            processed_studies.append(study_data)
-        
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+            yield study_data
@@ -3,14 +3,26 @@ PubMed search module for NMN Study Downloader
 """
 
 import re
-import time
 import requests
-from bs4 import BeautifulSoup
+import xml.etree.ElementTree as ET
 from urllib.parse import urljoin
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-def search_pubmed(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+from utils.crosswalk import find_pmcid
+from utils.doi_cache import get_doi_cache, resolve_doi
+from utils.strategies import race_strategies, publisher_key
+
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+# Largest number of IDs sent in one EFetch request
+EFETCH_BATCH_SIZE = 200
+
+# Page size used when paging through ESearch hits
+ESEARCH_PAGE_SIZE = 10000
+
+def search_pubmed(query, additional_terms, headers, max_results=None, client=None, use_eutils=False, api_key=None,
+                  since=None):
     """Search PubMed for studies related to NMN.
     
     Args:
@@ -18,6 +30,11 @@ def search_pubmed(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        use_eutils (bool): Use the NCBI E-utilities API instead of the PubMed website,
+            which returns all hits instead of only the first page
+        api_key (str): Optional NCBI API key for the higher E-utilities rate limit
+        since (date): Only return studies added to PubMed on or after this date
     
     Returns:
         list: List of PubMed IDs
@@ -28,23 +45,26 @@ def search_pubmed(query, additional_terms, headers, max_results=None):
     
     print(f"Searching PubMed for: {base_query}")
     
+    if use_eutils:
+        return search_pubmed_eutils(base_query, max_results, api_key=api_key, client=client, mindate=since)
+    
+    if since:
+        # Entrez date: when the record was added to PubMed
+        base_query = f'({base_query}) AND ("{since.strftime("%Y/%m/%d")}"[EDAT] : "3000"[EDAT])'
+    
     # Encode the query for URL
     search_query = base_query.replace(' ', '+')
     url = f"https://pubmed.ncbi.nlm.nih.gov/?term={search_query}&size=100"
     
+    client = get_client(client)
+    
     try:
-        # Create a session with retry logic for GET only
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        
         # Use GET only, no HEAD requests
-        response = session.get(url, headers=headers, allow_redirects=True)
+        response = client.get(url, headers=headers, allow_redirects=True)
         response.raise_for_status()
         
         # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, only={'class_': 'docsum-content'})
         
         # Extract study IDs
         study_ids = []
@@ -59,25 +79,336 @@ def search_pubmed(query, additional_terms, headers, max_results=None):
         print(f"Error searching PubMed: {e}")
         return []
 
-def get_study_details(pmid, headers):
+def _eutils_params(api_key, **params):
+    """Build E-utilities query parameters, adding the tool name and API key."""
+    params['tool'] = 'ScienceStudyScraper'
+    if api_key:
+        params['api_key'] = api_key
+    return params
+
+def search_pubmed_eutils(term, max_results=None, api_key=None, client=None, mindate=None):
+    """Find all PubMed IDs for a query with ESearch.
+    
+    The first ESearch call stores the result set on the NCBI history server
+    (usehistory=y); further pages are read from it via WebEnv/query_key, so
+    every page comes from the same snapshot of the search.
+    
+    Args:
+        term (str): Full PubMed query
+        max_results (int): Maximum number of IDs to return (None for all)
+        api_key (str): Optional NCBI API key
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        mindate (date): Only return records added to PubMed on or after this date
+    
+    Returns:
+        list: List of PubMed IDs
+    """
+    client = get_client(client)
+    # Entrez date range (when records were added), applied to the stored result set
+    dates = {}
+    if mindate:
+        dates = {'datetype': 'edat', 'mindate': mindate.strftime('%Y/%m/%d'), 'maxdate': '3000'}
+    page_size = min(ESEARCH_PAGE_SIZE, max_results) if max_results else ESEARCH_PAGE_SIZE
+    
+    try:
+        response = client.get(
+            f"{EUTILS_URL}/esearch.fcgi",
+            params=_eutils_params(api_key, db='pubmed', term=term, usehistory='y',
+                                  retmode='json', retmax=page_size, **dates),
+            timeout=30
+        )
+        response.raise_for_status()
+        result = response.json().get('esearchresult', {})
+        
+        pmids = list(result.get('idlist', []))
+        count = int(result.get('count', 0))
+        total = min(count, max_results) if max_results else count
+        webenv = result.get('webenv')
+        query_key = result.get('querykey')
+        print(f"PubMed E-utilities search found {count} results")
+        
+        while len(pmids) < total and webenv and query_key:
+            response = client.get(
+                f"{EUTILS_URL}/esearch.fcgi",
+                params=_eutils_params(api_key, db='pubmed', term=f"#{query_key}", WebEnv=webenv,
+                                      usehistory='y', retmode='json', retstart=len(pmids),
+                                      retmax=min(page_size, total - len(pmids))),
+                timeout=30
+            )
+            response.raise_for_status()
+            page = response.json().get('esearchresult', {}).get('idlist', [])
+            if not page:
+                # NCBI stops serving history results past its retrieval limit
+                print(f"PubMed E-utilities returned no more results after {len(pmids)} IDs")
+                break
+            pmids.extend(page)
+        
+        return pmids[:max_results] if max_results else pmids
+    
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error searching PubMed E-utilities: {e}")
+        return []
+
+def _text(elem, path):
+    """Return the full text of the first element matching path, or None."""
+    found = elem.find(path)
+    if found is None:
+        return None
+    text = ''.join(found.itertext()).strip()
+    return text or None
+
+def _parse_pubmed_article(article):
+    """Turn a <PubmedArticle> element into a study dictionary."""
+    citation = article.find('MedlineCitation')
+    info = citation.find('Article')
+    pmid = _text(citation, 'PMID')
+    
+    authors = []
+    for author in info.findall('AuthorList/Author'):
+        name = _text(author, 'CollectiveName')
+        if not name:
+            name = ' '.join(part for part in (_text(author, 'ForeName'), _text(author, 'LastName')) if part)
+        if name:
+            authors.append(name)
+    
+    pub_date = info.find('Journal/JournalIssue/PubDate')
+    date = "Unknown Date"
+    if pub_date is not None:
+        date = _text(pub_date, 'MedlineDate') or ' '.join(
+            part for part in (_text(pub_date, 'Year'), _text(pub_date, 'Month'), _text(pub_date, 'Day')) if part
+        ) or date
+    
+    abstract_parts = []
+    for part in info.findall('Abstract/AbstractText'):
+        text = ''.join(part.itertext()).strip()
+        label = part.get('Label')
+        abstract_parts.append(f"{label}: {text}" if label else text)
+    
+    doi = None
+    pmc_id = None
+    for article_id in article.findall('PubmedData/ArticleIdList/ArticleId'):
+        id_type = article_id.get('IdType')
+        value = (article_id.text or '').strip()
+        if id_type == 'doi' and value:
+            doi = value
+        elif id_type == 'pmc' and value:
+            pmc_id = value if value.startswith('PMC') else f"PMC{value}"
+    
+    return {
+        'pmid': pmid,
+        'title': _text(info, 'ArticleTitle') or "Unknown Title",
+        'authors': authors,
+        'journal': _text(info, 'Journal/Title') or "Unknown Journal",
+        'publication_date': date,
+        'abstract': '\n'.join(abstract_parts) or "Abstract not available",
+        'pdf_link': None,
+        'doi': doi,
+        'pmc_id': pmc_id,
+        'source_url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+        'database': 'PubMed'
+    }
+
+def fetch_pubmed_records(pmids, api_key=None, client=None):
+    """Fetch metadata for many PubMed IDs with batched EFetch requests.
+    
+    Each batch of up to 200 IDs is one request. The XML is parsed
+    incrementally while it streams in and every article element is freed
+    once parsed, so memory does not grow with the batch size.
+    
+    Args:
+        pmids (list): PubMed IDs
+        api_key (str): Optional NCBI API key
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+    
+    Yields:
+        dict: Study details for each article found
+    """
+    client = get_client(client)
+    
+    for start in range(0, len(pmids), EFETCH_BATCH_SIZE):
+        batch = pmids[start:start + EFETCH_BATCH_SIZE]
+        print(f"Fetching PubMed records {start + 1}-{start + len(batch)} of {len(pmids)}")
+        
+        response = None
+        try:
+            response = client.get(
+                f"{EUTILS_URL}/efetch.fcgi",
+                params=_eutils_params(api_key, db='pubmed', id=','.join(batch), retmode='xml'),
+                stream=True,
+                timeout=60
+            )
+            response.raise_for_status()
+            response.raw.decode_content = True
+            
+            for _event, elem in ET.iterparse(response.raw, events=('end',)):
+                if elem.tag != 'PubmedArticle':
+                    continue
+                try:
+                    yield _parse_pubmed_article(elem)
+                except AttributeError as e:
+                    print(f"Skipping malformed PubMed record: {e}")
+                elem.clear()
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"Error fetching PubMed records {start + 1}-{start + len(batch)}: {e}")
+        finally:
+            # Also runs if parsing fails or the caller stops iterating part way through
+            if response is not None:
+                response.close()
+
+def _pmc_pdf_link(pmc_id):
+    """Build the PMC PDF URL for a PMC ID."""
+    pmc_num = pmc_id.replace('PMC', '')
+    return f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_num}/pdf/main.pdf"
+
+def _page_pdf_link(soup, final_url):
+    """Look for a direct PDF link on the PubMed page."""
+    for link in soup.select('a'):
+        href = link.get('href', '')
+        # Check for PDF links from various common sources
+        if (href.endswith('.pdf') or '/pdf/' in href or 'pdf.pdf' in href or 'fulltext/pdf' in href) and (
+            '.gov' in href or '.org' in href or '.edu' in href or 'doi.org' in href or 
+            'nih.gov' in href or 'europepmc.org' in href or 'ncbi.nlm.nih.gov' in href):
+            pdf_link = urljoin(final_url, href)  # Use final URL as base
+            print(f"Found direct PDF link: {pdf_link}")
+            return pdf_link
+    return None
+
+def _pmc_free_article_link(soup):
+    """Build a PMC PDF URL from the page's free PMC article link."""
+    pmc_link_elem = soup.select_one('a.pmc-free-article')
+    if pmc_link_elem:
+        pmc_href = pmc_link_elem.get('href', '')
+        # Extract PMC ID from the link
+        pmc_match = re.search(r'PMC(\d+)', pmc_href)
+        if pmc_match:
+            pdf_link = _pmc_pdf_link(pmc_match.group(0))
+            print(f"Found PMC free article link: {pdf_link}")
+            return pdf_link
+    return None
+
+def _journal_pdf_link(pmid, journal):
+    """Guess the PMC PDF URL for Nature, Science and Cell papers."""
+    if any(publisher in journal.lower() for publisher in ['nature', 'science', 'cell']):
+        pdf_link = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{pmid}/pdf/"
+        print(f"Created PDF link from journal publisher: {pdf_link}")
+        return pdf_link
+    return None
+
+def _europepmc_pdf_link(pmid, browser_headers, client):
+    """Look for a PDF link on the study's Europe PMC page."""
+    pdf_link = None
+    try:
+        # Check Europe PMC which often has PDFs for open access articles
+        europe_pmc_url = f"https://europepmc.org/article/med/{pmid}"
+        
+        print(f"Checking Europe PMC for PDF: {europe_pmc_url}")
+        europe_response = client.get(europe_pmc_url, headers=browser_headers, timeout=15, allow_redirects=True)
+        
+        if europe_response.status_code == 200:
+            europe_soup = parse_html(europe_response.text)
+            
+            # First check for PDF link button
+            pdf_button = europe_soup.select_one('a.pdfLink, a.pdf-link, a[title*="PDF"]')
+            if pdf_button:
+                href = pdf_button.get('href', '')
+                if href:
+                    pdf_link = urljoin(europe_response.url, href)  # Use final URL as base
+                    print(f"Found PDF link from Europe PMC: {pdf_link}")
+            
+            # Also check the full text links section
+            if not pdf_link:
+                full_text_section = europe_soup.select_one('#free-full-text-links-list, .full-text-links')
+                if full_text_section:
+                    for link in full_text_section.select('a'):
+                        href = link.get('href', '')
+                        link_text = link.text.strip().lower()
+                        if href and ('pdf' in href.lower() or 'pdf' in link_text):
+                            pdf_link = urljoin(europe_response.url, href)
+                            print(f"Found PDF link in Europe PMC full text section: {pdf_link}")
+                            break
+    except Exception as e:
+        print(f"Error checking Europe PMC for PDF: {e}")
+    
+    return pdf_link
+
+def _doi_pdf_link(doi, browser_headers, client):
+    """Build a PDF URL from the publisher page a DOI redirects to."""
+    pdf_link = None
+    print(f"Checking DOI for direct PDF access: {doi}")
+    try:
+        # A PDF link found for this DOI before (by any module) needs no requests at all
+        cache = get_doi_cache(client)
+        entry = cache.lookup(doi) if cache else None
+        if entry and entry['pdf_url']:
+            pdf_link = entry['pdf_url']
+            print(f"Using cached PDF link for DOI: {pdf_link}")
+        
+        # Get the final URL from the DOI (after redirection), or from the DOI cache
+        publisher_url = None if pdf_link else resolve_doi(doi, browser_headers, client=client, timeout=20)
+        if publisher_url:
+            print(f"DOI redirected to: {publisher_url}")
+            
+            # Try common publisher PDF patterns
+            if 'nature.com' in publisher_url:
+                pdf_link = f"{publisher_url}.pdf"
+            elif 'science.org' in publisher_url or 'sciencemag.org' in publisher_url:
+                pdf_link = f"{publisher_url}/pdf"
+            elif 'cell.com' in publisher_url or 'sciencedirect.com' in publisher_url:
+                pdf_link = f"{publisher_url}/pdfft"
+            elif any(x in publisher_url for x in ['wiley.com', 'springer.com', 'mdpi.com', 'frontiersin.org']):
+                pdf_link = f"{publisher_url}/pdf"
+                
+            if pdf_link:
+                print(f"Created PDF link from publisher URL: {pdf_link}")
+    except Exception as e:
+        print(f"Error checking DOI for PDF: {e}")
+
+    return pdf_link
+
+def _pdf_link_strategies(pmid, doi, journal, pmc_id, browser_headers, client, soup=None, final_url=None):
+    """Return the ways of finding a PubMed study's PDF, in the old fallback order.
+    
+    Args:
+        pmid (str): PubMed ID of the study
+        doi (str): DOI of the study, if known
+        journal (str): Journal name
+        pmc_id (str): PMC ID of the study, if known
+        browser_headers (dict): Headers used for the requests
+        client (HttpClient): Shared HTTP client
+        soup (BeautifulSoup): Parsed PubMed page, if it was fetched
+        final_url (str): URL of the PubMed page after redirects
+    
+    Returns:
+        list: (name, function) pairs for race_strategies()
+    """
+    strategies = []
+    if pmc_id:
+        strategies.append(('pmc_id', lambda: _pmc_pdf_link(pmc_id)))
+    if soup is not None:
+        strategies.append(('page_links', lambda: _page_pdf_link(soup, final_url)))
+        strategies.append(('pmc_free_article', lambda: _pmc_free_article_link(soup)))
+    if doi:
+        strategies.append(('journal_heuristic', lambda: _journal_pdf_link(pmid, journal)))
+    strategies.append(('europepmc_page', lambda: _europepmc_pdf_link(pmid, browser_headers, client)))
+    if doi:
+        strategies.append(('doi_redirect', lambda: _doi_pdf_link(doi, browser_headers, client)))
+    return strategies
+
+def get_study_details(pmid, headers, client=None):
     """Get details for a specific study by its PubMed ID.
     
     Args:
         pmid (str): PubMed ID of the study
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         dict: Study details
     """
     url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+    client = get_client(client)
     
     try:
-        # Create a session with retry logic for GET only
-        session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        
         # Use browser-like headers
         browser_headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -86,7 +417,7 @@ def get_study_details(pmid, headers):
         }
         
         # Use GET only, no HEAD requests
-        response = session.get(url, headers=browser_headers, allow_redirects=True)
+        response = client.get(url, headers=browser_headers, allow_redirects=True)
         response.raise_for_status()
         
         # Get the final URL after any redirects
@@ -94,7 +425,7 @@ def get_study_details(pmid, headers):
         if final_url != url:
             print(f"Redirected to: {final_url}")
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Extract basic information
         title = soup.select_one('.heading-title')
@@ -128,106 +459,16 @@ def get_study_details(pmid, headers):
         if doi_elem:
             doi = doi_elem.text.strip().replace('doi: ', '')
         
-        # Find PDF link using multiple approaches
-        pdf_link = None
-        
-        # 1. If PMC ID is available, use direct PDF link construction
-        if pmc_id:
-            pmc_num = pmc_id.replace('PMC', '')
-            pdf_link = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_num}/pdf/main.pdf"
-            print(f"Using PMC link for PDF: {pdf_link}")
-        
-        # 2. Look for direct PDF links on the page if we don't have a PMC link yet
-        if not pdf_link:
-            for link in soup.select('a'):
-                href = link.get('href', '')
-                # Check for PDF links from various common sources
-                if (href.endswith('.pdf') or '/pdf/' in href or 'pdf.pdf' in href or 'fulltext/pdf' in href) and (
-                    '.gov' in href or '.org' in href or '.edu' in href or 'doi.org' in href or 
-                    'nih.gov' in href or 'europepmc.org' in href or 'ncbi.nlm.nih.gov' in href):
-                    pdf_link = urljoin(final_url, href)  # Use final URL as base
-                    print(f"Found direct PDF link: {pdf_link}")
-                    break
-        
-        # 3. Try to construct a PDF link from DOI for common repositories
-        if not pdf_link and doi:
-            # Try to check if this is a Nature, Science, Cell or Elsevier paper
-            if any(publisher in journal.lower() for publisher in ['nature', 'science', 'cell']):
-                pdf_link = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{pmid}/pdf/"
-                print(f"Created PDF link from journal publisher: {pdf_link}")
+        # The page does not always list the PMC ID; the crosswalk may know it
+        if not pmc_id:
+            pmc_id = find_pmcid({'pmid': pmid, 'doi': doi}, client)
         
-        # 4. Last resort: Try to find a free PMC version if available
-        if not pdf_link:
-            pmc_link_elem = soup.select_one('a.pmc-free-article')
-            if pmc_link_elem:
-                pmc_href = pmc_link_elem.get('href', '')
-                if pmc_href:
-                    # Extract PMC ID from the link
-                    pmc_match = re.search(r'PMC(\d+)', pmc_href)
-                    if pmc_match:
-                        pmc_num = pmc_match.group(1)
-                        pdf_link = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_num}/pdf/main.pdf"
-                        print(f"Found PMC free article link: {pdf_link}")
-        
-        # 5. Check EuropePMC as a last resort
-        if not pdf_link:
-            try:
-                # Check Europe PMC which often has PDFs for open access articles
-                europe_pmc_url = f"https://europepmc.org/article/med/{pmid}"
-                
-                print(f"Checking Europe PMC for PDF: {europe_pmc_url}")
-                europe_response = session.get(europe_pmc_url, headers=browser_headers, timeout=15, allow_redirects=True)
-                
-                if europe_response.status_code == 200:
-                    europe_soup = BeautifulSoup(europe_response.text, 'html.parser')
-                    
-                    # First check for PDF link button
-                    pdf_button = europe_soup.select_one('a.pdfLink, a.pdf-link, a[title*="PDF"]')
-                    if pdf_button:
-                        href = pdf_button.get('href', '')
-                        if href:
-                            pdf_link = urljoin(europe_response.url, href)  # Use final URL as base
-                            print(f"Found PDF link from Europe PMC: {pdf_link}")
-                    
-                    # Also check the full text links section
-                    if not pdf_link:
-                        full_text_section = europe_soup.select_one('#free-full-text-links-list, .full-text-links')
-                        if full_text_section:
-                            for link in full_text_section.select('a'):
-                                href = link.get('href', '')
-                                link_text = link.text.strip().lower()
-                                if href and ('pdf' in href.lower() or 'pdf' in link_text):
-                                    pdf_link = urljoin(europe_response.url, href)
-                                    print(f"Found PDF link in Europe PMC full text section: {pdf_link}")
-                                    break
-            except Exception as e:
-                print(f"Error checking Europe PMC for PDF: {e}")
-        
-        # 6. Try DOI-based PDFs for well-known publishers
-        if not pdf_link and doi:
-            print(f"Checking DOI for direct PDF access: {doi}")
-            try:
-                doi_url = f"https://doi.org/{doi}"
-                # Get the final URL from the DOI (after redirection)
-                doi_response = session.get(doi_url, headers=browser_headers, allow_redirects=True, timeout=20)
-                if doi_response.status_code == 200:
-                    publisher_url = doi_response.url
-                    print(f"DOI redirected to: {publisher_url}")
-                    
-                    # Try common publisher PDF patterns
-                    if 'nature.com' in publisher_url:
-                        pdf_link = f"{publisher_url}.pdf"
-                    elif 'science.org' in publisher_url or 'sciencemag.org' in publisher_url:
-                        pdf_link = f"{publisher_url}/pdf"
-                    elif 'cell.com' in publisher_url or 'sciencedirect.com' in publisher_url:
-                        pdf_link = f"{publisher_url}/pdfft"
-                    elif any(x in publisher_url for x in ['wiley.com', 'springer.com', 'mdpi.com', 'frontiersin.org']):
-                        pdf_link = f"{publisher_url}/pdf"
-                        
-                    if pdf_link:
-                        print(f"Created PDF link from publisher URL: {pdf_link}")
-            except Exception as e:
-                print(f"Error checking DOI for PDF: {e}")
+        # Find the PDF link: the strategies that worked best for this publisher run
+        # concurrently and the first verified PDF wins
+        pdf_link = race_strategies(
+            _pdf_link_strategies(pmid, doi, journal, pmc_id, browser_headers, client, soup, final_url),
+            publisher_key(doi=doi, url=final_url), browser_headers, client=client
+        )
         
         return {
             'pmid': pmid,
@@ -247,42 +488,69 @@ def get_study_details(pmid, headers):
         print(f"Error getting details for study {pmid}: {e}")
         return None
 
-def process_pubmed_results(pmids, download_func, output_dir, headers, delay):
+def process_pubmed_results(pmids, download_func, output_dir, headers, delay, client=None,
+                           use_eutils=False, api_key=None):
     """Process PubMed search results.
     
     Args:
         pmids (list): List of PubMed IDs
-        download_func (function): Function to download PDFs
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        use_eutils (bool): Fetch metadata in batches with EFetch instead of one page per study
+        api_key (str): Optional NCBI API key for the higher E-utilities rate limit
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
+    if use_eutils:
+        yield from _process_pubmed_eutils(pmids, download_func, client=client, api_key=api_key)
+        return
     
     for i, pmid in enumerate(pmids):
         print(f"Processing PubMed study {pmid}... ({i+1}/{len(pmids)})")
-        study_data = get_study_details(pmid, headers)
+        study_data = get_study_details(pmid, headers, client=client)
         
         if study_data:
             # Try to download PDF if available
             if study_data.get('pdf_link'):
-                # Create a browser-like headers with referer
-                browser_headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Referer': study_data.get('source_url', 'https://pubmed.ncbi.nlm.nih.gov/'),
-                }
-                
-                pdf_path = download_func(study_data['pdf_link'], f"pubmed_{pmid}", overwrite=True)
-                study_data['local_pdf_path'] = pdf_path
+                download_func(study_data['pdf_link'], f"pubmed_{pmid}", overwrite=True, study=study_data)
             
-            processed_studies.append(study_data)
-        
-        # Delay to prevent overloading the server
-        time.sleep(delay)
+            yield study_data
+
+def _process_pubmed_eutils(pmids, download_func, client=None, api_key=None):
+    """Process PubMed IDs using batched EFetch metadata.
+    
+    Args:
+        pmids (list): List of PubMed IDs
+        download_func (function): Function queueing a PDF download
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        api_key (str): Optional NCBI API key
     
-    return processed_studies
+    Yields:
+        dict: Processed study data, as soon as each study is done
+    """
+    client = get_client(client)
+    browser_headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5'
+    }
+    for i, study_data in enumerate(fetch_pubmed_records(pmids, api_key=api_key, client=client)):
+        pmid = study_data['pmid']
+        print(f"Processing PubMed study {pmid}... ({i+1}/{len(pmids)})")
+        
+        study_data['pmc_id'] = find_pmcid(study_data, client)
+        study_data['pdf_link'] = race_strategies(
+            _pdf_link_strategies(pmid, study_data.get('doi'), study_data['journal'], study_data['pmc_id'],
+                                 browser_headers, client),
+            publisher_key(study_data), browser_headers, client=client
+        )
+        
+        if study_data.get('pdf_link'):
+            download_func(study_data['pdf_link'], f"pubmed_{pmid}", overwrite=True, study=study_data)
+        
+        yield study_data
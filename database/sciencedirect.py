@@ -2,12 +2,15 @@
 ScienceDirect search module for NMN Study Downloader
 """
 
-import time
+import re
+import hashlib
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
-def search_sciencedirect(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+
+def search_sciencedirect(query, additional_terms, headers, max_results=None, client=None):
     """Search ScienceDirect for open access studies related to NMN.
     
     Note: This is a simplified implementation. ScienceDirect might require
@@ -18,6 +21,7 @@ def search_sciencedirect(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         list: List of article URLs and metadata
@@ -28,12 +32,14 @@ def search_sciencedirect(query, additional_terms, headers, max_results=None):
     search_query = query.replace(' ', '+')
     url = f"https://www.sciencedirect.com/search?qs={search_query}&show=100&accessTypes=openaccess"
     
+    client = get_client(client)
+    
     try:
-        response = requests.get(url, headers=headers)
+        response = client.get(url, headers=headers)
         response.raise_for_status()
         
         # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, only={'class_': 'result-item-content'})
         
         # Extract article information
         results = []
@@ -65,6 +71,9 @@ def search_sciencedirect(query, additional_terms, headers, max_results=None):
             if date_elem:
                 date = date_elem.text.strip().replace(',', '')
             
+            # The PII is ScienceDirect's stable article identifier
+            pii_match = re.search(r'/pii/([0-9A-Za-z]+)', article_url)
+            
             study = {
                 'title': title,
                 'authors': authors,
@@ -72,6 +81,7 @@ def search_sciencedirect(query, additional_terms, headers, max_results=None):
                 'publication_date': date,
                 'abstract': "Abstract not available", # Would need to visit article page to get this
                 'source_url': article_url,
+                'pii': pii_match.group(1) if pii_match else None,
                 'pdf_link': article_url.replace('/science/article/pii/', '/science/article/pdf/') + "/pdf",
                 'database': 'ScienceDirect'
             }
@@ -87,32 +97,28 @@ def search_sciencedirect(query, additional_terms, headers, max_results=None):
         print(f"Error searching ScienceDirect: {e}")
         return []
 
-def process_sciencedirect_results(results, download_func, output_dir, headers, delay):
+def process_sciencedirect_results(results, download_func, output_dir, headers, delay, client=None):
     """Process ScienceDirect search results.
     
     Args:
         results (list): List of ScienceDirect study metadata
-        download_func (function): Function to download PDFs
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
     for i, study in enumerate(results):
         print(f"Processing ScienceDirect article {i+1}: {study.get('title')[:50]}...")
         
         # Try to download PDF if available
         if study.get('pdf_link'):
-            pdf_path = download_func(study['pdf_link'], f"sciencedirect_{i}", overwrite=True)
-            study['local_pdf_path'] = pdf_path
-        
-        processed_studies.append(study)
+            # Name the file by PII (or a hash of the article URL) so reruns map to the same paper
+            article_id = study.get('pii') or hashlib.sha1(study['source_url'].encode('utf-8')).hexdigest()[:16]
+            download_func(study['pdf_link'], f"sciencedirect_{article_id}", overwrite=True, study=study)
         
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+        yield study
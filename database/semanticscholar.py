@@ -2,10 +2,12 @@
 Semantic Scholar search module for NMN Study Downloader
 """
 
-import time
 import requests
 
-def search_semanticscholar(query, additional_terms, headers, max_results=None):
+from utils.http_client import get_client
+from utils.paging import PagedResults
+
+def search_semanticscholar(query, additional_terms, headers, max_results=None, client=None):
     """Search Semantic Scholar for NMN studies.
     
     Args:
@@ -13,9 +15,11 @@ def search_semanticscholar(query, additional_terms, headers, max_results=None):
         additional_terms (list): Additional search terms to refine results
         headers (dict): HTTP headers for requests
         max_results (int): Maximum number of results to retrieve
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
-        list: List of article metadata
+        PagedResults: Lazy stream of article metadata that follows the API's
+            offset paging, or an empty list if the search failed
     """
     base_query = query
     if additional_terms:
@@ -33,72 +37,87 @@ def search_semanticscholar(query, additional_terms, headers, max_results=None):
     params = {
         'query': base_query,
         'limit': page_size,
-        'fields': 'paperId,title,abstract,url,year,journal,authors,openAccessPdf'
+        'fields': 'paperId,externalIds,title,abstract,url,year,journal,authors,openAccessPdf'
     }
     
-    try:
-        response = requests.get(url, params=params, headers=headers)
+    client = get_client(client)
+    info = {}
+    
+    def fetch_page(offset):
+        response = client.get(url, params={**params, 'offset': offset}, headers=headers)
         response.raise_for_status()
-        
         data = response.json()
-        results = []
+        info.setdefault('total', data.get('total'))
         
-        if 'data' in data:
-            for item in data['data']:
-                # Get PDF link if available
-                pdf_link = None
-                if 'openAccessPdf' in item and item['openAccessPdf']:
-                    pdf_link = item['openAccessPdf'].get('url')
-                
-                study = {
-                    'paper_id': item.get('paperId', ''),
-                    'title': item.get('title', 'Unknown Title'),
-                    'authors': [author.get('name', '') for author in item.get('authors', [])],
-                    'journal': item.get('journal', {}).get('name', 'Unknown Journal'),
-                    'publication_date': str(item.get('year', 'Unknown Date')),
-                    'abstract': item.get('abstract', 'Abstract not available'),
-                    'source_url': item.get('url', ''),
-                    'pdf_link': pdf_link,
-                    'database': 'Semantic Scholar'
-                }
-                results.append(study)
-                
-                if max_results is not None and len(results) >= max_results:
-                    break
+        items = data.get('data', [])
+        results = [_parse_semanticscholar_item(item) for item in items]
         
+        # The response only carries 'next' while more results can be paged through
+        if not items or data.get('next') is None:
+            return results, None
+        return results, data['next']
+    
+    try:
+        results = PagedResults(fetch_page, 0, max_results, name="Semantic Scholar results")
+        results.total = info.get('total')
         return results
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error searching Semantic Scholar: {e}")
         return []
 
-def process_semanticscholar_results(results, download_func, output_dir, headers, delay):
+def _parse_semanticscholar_item(item):
+    """Turn one Semantic Scholar search result into a study dictionary.
+    
+    Args:
+        item (dict): Paper from the Semantic Scholar Graph API
+    
+    Returns:
+        dict: Study metadata
+    """
+    # Get PDF link if available
+    pdf_link = None
+    if 'openAccessPdf' in item and item['openAccessPdf']:
+        pdf_link = item['openAccessPdf'].get('url')
+    
+    external_ids = item.get('externalIds') or {}
+    
+    return {
+        'paper_id': item.get('paperId', ''),
+        'doi': external_ids.get('DOI', ''),
+        'pmid': external_ids.get('PubMed', ''),
+        'pmcid': external_ids.get('PubMedCentral', ''),
+        'title': item.get('title', 'Unknown Title'),
+        'authors': [author.get('name', '') for author in item.get('authors', [])],
+        'journal': (item.get('journal') or {}).get('name', 'Unknown Journal'),
+        'publication_date': str(item.get('year', 'Unknown Date')),
+        'abstract': item.get('abstract', 'Abstract not available'),
+        'source_url': item.get('url', ''),
+        'pdf_link': pdf_link,
+        'database': 'Semantic Scholar'
+    }
+
+def process_semanticscholar_results(results, download_func, output_dir, headers, delay, client=None):
     """Process Semantic Scholar search results.
     
     Args:
-        results (list): List of Semantic Scholar study metadata
-        download_func (function): Function to download PDFs
+        results (iterable): Semantic Scholar study metadata (list or lazy result stream)
+        download_func (function): Function queueing a PDF download; fills in the
+            study's local_pdf_path once the download completes
         output_dir (str): Output directory
         headers (dict): HTTP headers for requests
-        delay (int): Delay between requests
+        delay (float): Unused, requests are paced per host by the scraper's rate limiter
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
-    Returns:
-        list: List of processed study data
+    Yields:
+        dict: Processed study data, as soon as each study is done
     """
-    processed_studies = []
-    
-    for study in results:
+    for i, study in enumerate(results):
         print(f"Processing Semantic Scholar article: {study.get('paper_id', 'Unknown ID')}...")
         
         # Try to download PDF if available
         if study.get('pdf_link'):
-            identifier = study.get('paper_id', '').replace('/', '_') if study.get('paper_id') else f"semantic_{len(processed_studies)}"
-            pdf_path = download_func(study['pdf_link'], f"semantic_{identifier}", overwrite=True)
-            study['local_pdf_path'] = pdf_path
+            identifier = study.get('paper_id', '').replace('/', '_') if study.get('paper_id') else f"semantic_{i}"
+            download_func(study['pdf_link'], f"semantic_{identifier}", overwrite=True, study=study)
         
-        processed_studies.append(study)
-        
-        # Delay to prevent overloading the server
-        time.sleep(delay)
-    
-    return processed_studies
+        yield study
@@ -4,35 +4,108 @@ Core downloader class for Science Study Scraper.
 """
 
 import os
-import time
 import json
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import requests
 import importlib
+import itertools
+import inspect
 import random
 import urllib.parse
 import re
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from utils.pdf_generator import extract_article_content, generate_pdf_from_content
-from utils.html_report import generate_html_report
+from utils.export_log import StudyLog, export_log, ANNOTATED_IDS
+from utils.rate_limiter import HostRateLimiter
+from utils.http_client import HttpClient
+from utils.metrics import RequestMetrics, stage
+from utils.http_cache import HttpCache
+from utils.html_parser import parse_html, set_parser, get_parser
+from utils.download_pool import DownloadPool
+from utils.fallback_queue import FallbackQueue
+from utils.pdf_store import PdfStore
+from utils.manifest import DownloadManifest, check_pdf_structure
+from utils.identity import IdentityIndex, StudyRegistry, study_identifiers, SEARCH_ID_KINDS
+from utils.crosswalk import IdCrosswalk, find_pmcid
+from utils.doi_cache import DoiCache, landing_url
+from utils.strategies import StrategyStats
+from utils.negative_cache import NegativeCache, failure_class
+from utils.header_profiles import HeaderProfiles
+from utils.range_download import (PartFile, accepts_ranges, total_size, peek, stream_to_part,
+                                  download_segments, save_resume_validator, load_resume_validator,
+                                  discard_part, CHUNK_SIZE, SEGMENT_MIN_SIZE)
+
+# Bytes read from a response before deciding whether it is a PDF
+PEEK_SIZE = 1024
+
+# Largest HTML page read while looking for a PDF link
+MAX_HTML_SIZE = 5 * 1024 * 1024
+
+# Number of streamed search results whose IDs are resolved and deduplicated together
+STREAM_BATCH_SIZE = 100
 
 
 class ScienceStudyScraper:
-    def __init__(self, output_dir="studies", max_results=None, delay=1):
+    def __init__(self, output_dir="studies", max_results=None, delay=1, search_workers=None, searches_per_source=1,
+                 download_workers=8, downloads_per_host=2, use_cache=True, download_segments=1,
+                 db_options=None, fallback_workers=2, html_parser=None, skip_valid=False):
         """Initialize the Science Study Scraper.
         
         Args:
             output_dir (str): Directory to save downloaded studies
             max_results (int): Maximum number of results to retrieve (None for unlimited)
-            delay (int): Delay between requests to avoid rate limiting
+            delay (float): Initial delay between requests to the same host; the
+                per-host rate adapts to how each server responds
+            search_workers (int): Maximum number of database searches running at once
+                (None for one worker per database)
+            searches_per_source (int): Maximum number of concurrent searches against a single database
+            download_workers (int): Maximum number of PDF downloads in flight overall
+            downloads_per_host (int): Maximum number of PDF downloads in flight per host
+            use_cache (bool): Whether to keep a persistent HTTP response cache in the output directory
+            download_segments (int): Number of parallel byte ranges used for large PDFs on
+                servers that support them (1 disables segmented downloads)
+            db_options (dict): Optional {database name: {option: value}} keyword arguments
+                passed to a database module's search and process functions when they accept them
+                (e.g. {'pubmed': {'use_eutils': True, 'api_key': '...'}})
+            fallback_workers (int): Maximum number of failed downloads whose PDF is built
+                from the article page at the same time
+            html_parser (str): HTML tree builder ('lxml' or 'html.parser'; None for the
+                fastest one installed)
+            skip_valid (bool): Keep PDFs from earlier runs that the download manifest shows
+                are complete instead of downloading them again
         """
         self.output_dir = output_dir
         self.max_results = max_results  # None means unlimited
         self.delay = delay
-        self.studies_data = []
+        self.search_workers = search_workers
+        self.searches_per_source = searches_per_source
+        self.download_segments = download_segments
+        self.skip_valid = skip_valid
+        self.db_options = db_options or {}
+        
+        # JSONL log (and live CSV) of the current run's finished studies, and the
+        # pending download of each study, which is logged once it completes
+        self.study_log = None
+        self._download_handles = {}
+        
+        # HTML tree builder shared by all database modules and the content extractor
+        try:
+            set_parser(html_parser)
+        except ValueError as e:
+            print(f"{e}; using {get_parser()}")
+        
+        # Identifiers (DOI/PMID/PMCID) of every study seen in the current run
+        self.identity = IdentityIndex()
+        
+        # Studies by ID and queued file name, for the article-content fallback
+        self.studies = StudyRegistry()
+        
+        # Per-database search slots, created lazily in _search_with_slot
+        self._source_slots = {}
+        self._source_slots_lock = threading.Lock()
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_dir):
@@ -42,9 +115,20 @@ class ScienceStudyScraper:
         if not os.path.exists(pdf_dir):
             os.makedirs(pdf_dir)
         
+        # Each distinct PDF is stored once by SHA-256; per-study names are hardlinks
+        self.pdf_store = PdfStore(pdf_dir)
+        
+        # URL, size, SHA-256, validators and structural check of every downloaded PDF
+        self.manifest = DownloadManifest(os.path.join(pdf_dir, "manifest.json"))
+        self._started = time.time()
+        
         # Path for saved queries
         self.query_file = os.path.join(output_dir, "saved_query.json")
         
+        # Per-database state (processed IDs, last run time) of the query run last
+        self.query_state = None
+        self._known_ids = set()
+        
         # Headers to mimic a browser - use a randomized modern user agent
         user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36',
@@ -62,29 +146,63 @@ class ScienceStudyScraper:
             'Upgrade-Insecure-Requests': '1'
         }
         
-        # Create a session with retries for better download reliability
-        # IMPORTANT: ONLY ALLOW GET REQUESTS, NO HEAD REQUESTS
-        self.session = requests.Session()
-        retries = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504, 429],
-            allowed_methods=["GET"]  # ONLY GET, NO HEAD
+        # Shared per-host rate controller, starting at one request per `delay` seconds.
+        # Google Scholar keeps a fixed, slower pace to avoid bot detection.
+        # NCBI E-utilities allow 3 requests per second, or 10 with an API key.
+        initial_rate = 1.0 / delay if delay and delay > 0 else 10.0
+        eutils_rate = 10.0 if self.db_options.get('pubmed', {}).get('api_key') else 3.0
+        self.rate_limiter = HostRateLimiter(
+            initial_rate=initial_rate,
+            host_rates={
+                'scholar.google.com': (initial_rate / 2, initial_rate / 2),
+                'eutils.ncbi.nlm.nih.gov': (eutils_rate, eutils_rate)
+            }
+        )
+        
+        # Persistent response cache, so re-running a query mostly costs disk reads and 304s
+        self.http_cache = None
+        if use_cache:
+            self.http_cache = HttpCache(os.path.join(output_dir, ".cache", "http"))
+            self.http_cache.prune()
+        
+        # Host, stage, status, bytes, timings, retries and cache outcome of every request
+        self.metrics = RequestMetrics()
+        
+        # One pooled HTTP client (GET only, keep-alive, shared retry policy) used
+        # by this class and passed into every database module
+        self.client = HttpClient(rate_limiter=self.rate_limiter, cache=self.http_cache, metrics=self.metrics)
+        self.session = self.client.session
+        
+        # PMID/PMCID/DOI crosswalk, shared with the database modules through the client
+        self.crosswalk = IdCrosswalk(os.path.join(output_dir, ".cache", "crosswalk.sqlite"), client=self.client)
+        self.client.crosswalk = self.crosswalk
+        
+        # DOI -> landing page -> PDF URL, so a DOI's redirect chain is followed once
+        self.doi_cache = DoiCache(os.path.join(output_dir, ".cache", "doi_cache.sqlite"))
+        self.client.doi_cache = self.doi_cache
+        
+        # Hit rates and latencies of the PDF link strategies per publisher, used to
+        # decide which strategies the database modules race first
+        self.strategy_stats = StrategyStats(os.path.join(output_dir, ".cache", "strategy_stats.json"))
+        self.client.strategy_stats = self.strategy_stats
+        
+        # PDF URLs (and hosts) that recently failed, skipped until their entries expire
+        self.negative_cache = NegativeCache(os.path.join(output_dir, ".cache", "negative_cache.sqlite"))
+        self.client.negative_cache = self.negative_cache
+        
+        # Header profile that last got a PDF response from each host
+        self.header_profiles = HeaderProfiles(os.path.join(output_dir, ".cache", "header_profiles.json"))
+        
+        # Failed downloads are rebuilt from article pages on their own workers, so the
+        # download stage never waits for HTML scraping and PDF rendering
+        self.fallback_queue = FallbackQueue(self._try_create_pdf_from_article, max_workers=fallback_workers)
+        
+        # Background PDF download stage, so transfers overlap with metadata work
+        self.download_pool = DownloadPool(
+            self.download_pdf,
+            max_workers=download_workers,
+            per_host=downloads_per_host
         )
-        self.session.mount('http://', HTTPAdapter(max_retries=retries))
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
-    
-        # Monkey patch requests to only use GET and never HEAD
-        original_request = requests.Session.request
-        def patched_request(session_self, method, url, **kwargs):
-            if method.upper() == 'HEAD':
-                print(f"HEAD request to {url} intercepted and converted to GET")
-                method = 'GET'
-                if 'allow_redirects' not in kwargs:
-                    kwargs['allow_redirects'] = True
-            return original_request(session_self, method, url, **kwargs)
-        
-        requests.Session.request = patched_request
         
         # Track where each study came from
         self.sources = {
@@ -101,15 +219,27 @@ class ScienceStudyScraper:
     def save_query(self, query, terms=None):
         """Save the current query for future use.
         
+        The per-database state of the query's last run (IDs already processed
+        and the run time) is saved along with it, so later runs with
+        incremental=True only fetch new studies.
+        
         Args:
             query (str): The main search query
             terms (list): Additional search terms
         """
         query_data = {
             'query': query,
-            'terms': terms if terms else []
+            'terms': terms if terms else [],
+            'databases': {}
         }
         
+        if self._same_query(self.query_state, query, terms):
+            query_data['databases'] = self.query_state['databases']
+        else:
+            saved = self.load_saved_query()
+            if self._same_query(saved, query, terms):
+                query_data['databases'] = saved.get('databases', {})
+        
         with open(self.query_file, 'w', encoding='utf-8') as f:
             json.dump(query_data, f, ensure_ascii=False, indent=4)
     
@@ -124,136 +254,257 @@ class ScienceStudyScraper:
                 return json.load(f)
         return None
     
-    def download_pdf(self, url, pmid, overwrite=True):
+    @staticmethod
+    def _same_query(saved, query, terms):
+        """Return True if a saved query dict holds the given query and terms."""
+        return bool(saved) and saved.get('query') == query and (saved.get('terms') or []) == (terms or [])
+    
+    def _load_query_state(self, query, terms):
+        """Return the run state for a query, starting from the saved query if it matches.
+        
+        Args:
+            query (str): The main search query
+            terms (list): Additional search terms as given to run()
+        
+        Returns:
+            dict: {'query', 'terms', 'databases': {db_name: {'ids', 'last_run'}}}
+        """
+        if self._same_query(self.query_state, query, terms):
+            return self.query_state
+        
+        try:
+            saved = self.load_saved_query()
+        except (OSError, ValueError) as e:
+            print(f"Error loading saved query state: {e}")
+            saved = None
+        
+        databases = saved.get('databases', {}) if self._same_query(saved, query, terms) else {}
+        return {'query': query, 'terms': terms or [], 'databases': databases}
+    
+    def _state_keys(self, item, db_name=None):
+        """Return the keys under which a study is remembered between runs."""
+        keys = self._identifiers(item, db_name)
+        if not keys and isinstance(item, dict):
+            # Google Scholar, ScienceDirect etc. often have no DOI or PubMed ID
+            url = item.get('source_url') or item.get('pdf_link')
+            if url:
+                keys = [f"url:{url}"]
+        return keys
+    
+    def queue_download(self, url, pmid, overwrite=True, study=None):
+        """Queue a PDF download on the background download pool.
+        
+        Args:
+            url (str): URL of the PDF
+            pmid (str): PubMed ID to use for filename
+            overwrite (bool): Whether to overwrite existing files
+            study (dict): Study whose local_pdf_path is filled in when the download completes
+        
+        Returns:
+            DownloadHandle: Handle whose result is the path to the downloaded file or None
+        """
+        # Registered before the download starts, so a fallback for it can find the study
+        # while its database module is still processing the rest of the results
+        self.studies.register(study, name=pmid)
+        
+        if not url:
+            if study is not None:
+                study['local_pdf_path'] = None
+            return None
+        
+        handle = self.download_pool.submit(url, pmid, overwrite=overwrite, study=study)
+        if study is not None:
+            self._download_handles[id(study)] = handle
+        return handle
+    
+    def download_pdf(self, url, pmid, overwrite=True, origin=None):
         """Download PDF for a study if available.
         
         Args:
             url (str): URL of the PDF
             pmid (str): PubMed ID to use for filename
             overwrite (bool): Whether to overwrite existing files
+            origin (str): Study's original link when url was found through it
+                (set on the fallback calls this method makes to itself)
         
         Returns:
-            str: Path to downloaded file or None if failed
+            str: Path to downloaded file or None if failed, or a Future for the
+                path when the PDF is left to the article-content fallback queue
         """
         if not url:
             return None
         
         try:
             filename = os.path.join(self.output_dir, "pdfs", f"{pmid}.pdf")
+            part_filename = f"{filename}.part"
+            
+            # A complete PDF from an earlier run is kept without transferring it again
+            if self.skip_valid and origin is None:
+                kept = self._reuse_valid(pmid, url)
+                if kept:
+                    return kept
             
             # Check if file exists and we're not overwriting
             if os.path.exists(filename) and not overwrite:
                 print(f"File already exists for study {pmid} (skipping download)")
                 return filename
             
+            # A URL already fetched for another study (this run, or any earlier run when not
+            # overwriting) is linked from the PDF store instead of downloaded again
+            stored = self.pdf_store.lookup_url(url, since=self._started if overwrite else None)
+            if stored:
+                print(f"PDF from {url} is already stored, linking it for study {pmid}")
+                path = self.pdf_store.link(stored, pmid)
+                self.manifest.record(pmid, url, path, os.path.basename(stored)[:-len('.pdf')], origin=origin)
+                return path
+            
+            # Links that were dead, paywalled or not a PDF on recent attempts are not requested again
+            dead = self.negative_cache.check(url)
+            if dead:
+                print(f"Skipping {url}, it recently failed ({dead})")
+                return self.fallback_queue.submit(pmid)
+            
+            # Bytes left over from an interrupted earlier attempt are resumed with a Range request,
+            # guarded by If-Range so a file that changed on the server is sent whole instead
+            resume_offset = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+            if_range = load_resume_validator(part_filename, url) if resume_offset else None
+            if resume_offset and not if_range:
+                print(f"Discarding partial download of {url}, it cannot be checked against the server's copy")
+                discard_part(part_filename)
+                resume_offset = 0
+            
             print(f"Attempting to download PDF from: {url}")
             
             # Special handling for preprints.org and preprints DOIs
             if 'preprints.org' in url or 'preprints' in url:
                 print("Detected preprints.org URL - using special handler")
-                return self._download_from_preprints(url, pmid, filename)
+                return self._download_from_preprints(url, pmid, filename, origin)
             
             # Try different headers variations for better compatibility with various repositories
-            headers_variations = [
-                self.headers,
-                {**self.headers, 'Accept': 'application/pdf'},
-                {**self.headers, 'Accept': '*/*'},
+            headers_variations = {
+                'default': self.headers,
+                'accept_pdf': {**self.headers, 'Accept': 'application/pdf'},
+                'accept_any': {**self.headers, 'Accept': '*/*'},
                 # More browser-like headers for academic sites
-                {
+                'browser': {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                     'Accept': 'application/pdf,application/x-pdf,text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                     'Accept-Language': 'en-US,en;q=0.5',
                     'Referer': urllib.parse.urljoin(url, '/'),  # Set referer to the base domain
                     'Connection': 'keep-alive'
                 }
-            ]
+            }
             
             # Initialize response to None
             response = None
             
-            # DIRECT GET REQUESTS ONLY
-            for headers in headers_variations:
+            # DIRECT GET REQUESTS ONLY, starting with the profile that worked for this host before
+            for profile in self.header_profiles.order(url, list(headers_variations)):
+                headers = headers_variations[profile]
                 try:
+                    request_headers = headers
+                    if resume_offset:
+                        request_headers = {**headers, 'Range': f'bytes={resume_offset}-', 'If-Range': if_range}
+                    
                     # ONLY USE GET WITH REDIRECTS - NO HEAD REQUESTS
-                    response = requests.get(
+                    response = self.client.get(
                         url, 
-                        headers=headers, 
+                        headers=request_headers, 
                         stream=True, 
                         timeout=30,
                         allow_redirects=True
                     )
                     
-                    if response.status_code == 200:
+                    if response.status_code == 416 and resume_offset:
+                        # The partial file no longer matches the resource; start over
+                        print(f"Cannot resume partial download of {url}, starting over")
+                        response.close()
+                        discard_part(part_filename)
+                        resume_offset = 0
+                        response = self.client.get(
+                            url, 
+                            headers=headers, 
+                            stream=True, 
+                            timeout=30,
+                            allow_redirects=True
+                        )
+                    
+                    if response.status_code == 206 and resume_offset:
+                        print(f"Resuming partial download of {url} at byte {resume_offset}")
+                        break
+                    elif response.status_code == 200:
                         print(f"Successfully connected to PDF URL (status: 200)")
                         break
                     else:
                         print(f"GET request failed with status {response.status_code}, trying another header variation")
+                        response.close()  # Return the connection to the pool
                 except Exception as e:
                     print(f"Error with header variation: {e}")
                     continue
             
-            if not response or response.status_code != 200:
+            if not response or response.status_code not in (200, 206):
                 print(f"Failed to download PDF from {url} (status code: {response.status_code if response else 'None'})")
-                return self._try_create_pdf_from_article(pmid)
+                self.negative_cache.record_failure(
+                    url, failure_class(response.status_code if response is not None else None, 'connection'))
+                return self.fallback_queue.submit(pmid)
             
             # Check if it's actually a PDF
             content_type = response.headers.get('Content-Type', '').lower()
             
-            # We need to read a small chunk to check the content
-            try:
-                if response.raw.chunked:
-                    # For chunked responses, read the first chunk
-                    first_chunk = next(response.iter_content(chunk_size=256), b'')
-                    first_bytes = first_chunk[:10]
-                    # Reset the stream for later download
-                    response = requests.get(
-                        url, 
-                        headers=headers, 
-                        stream=True, 
-                        timeout=30,
-                        allow_redirects=True
-                    )
-                else:
-                    # For non-chunked, we can peek at the content
-                    first_bytes = response.content[:10] if hasattr(response, 'content') else b''
-            except Exception as e:
-                print(f"Error checking content: {e}")
-                first_bytes = b''
+            # Peek at the start of the body; the same stream is then written to disk
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            head = b''
+            if response.status_code == 206:
+                # Resumed download: the start of the file is already on disk
+                with open(part_filename, 'rb') as f:
+                    first_bytes = f.read(PEEK_SIZE)
+            else:
+                try:
+                    head = peek(chunks, PEEK_SIZE)
+                except Exception as e:
+                    print(f"Error checking content: {e}")
+                first_bytes = head
             
             is_pdf = False
+            looks_like_html = first_bytes.lstrip()[:15].lower().startswith((b'<!doctype html', b'<html'))
             
-            # Check content-type header
-            if 'application/pdf' in content_type or 'pdf' in content_type:
-                is_pdf = True
-                print(f"Content-Type indicates PDF: {content_type}")
-            # Check first bytes for PDF signature
-            elif first_bytes and first_bytes.startswith(b'%PDF'):
+            # Check first bytes for PDF signature (allowed anywhere in the first 1024 bytes)
+            if b'%PDF' in first_bytes:
                 is_pdf = True
                 print(f"Content starts with %PDF signature")
-            # If streaming and we can't check first bytes yet
-            elif response.raw.chunked or not first_bytes:
-                # Just accept it based on URL ending with .pdf
-                if url.lower().endswith('.pdf') or '/pdf/' in url.lower():
-                    is_pdf = True
-                    print(f"Assuming PDF based on URL pattern")
+            # Check content-type header, unless the body is obviously an HTML page
+            elif ('application/pdf' in content_type or 'pdf' in content_type) and not looks_like_html:
+                is_pdf = True
+                print(f"Content-Type indicates PDF: {content_type}")
             
             if not is_pdf:
                 print(f"Warning: Content at {url} does not appear to be a PDF (content-type: {content_type})")
+                self.negative_cache.record_failure(url, failure_class(failure='not_pdf'))
                 
                 # Try fallback to PMC if this is a PubMed ID
                 if 'pubmed' in pmid.lower() and not 'pmc' in url.lower():
+                    response.close()
                     # Extract the numeric PMID
                     numeric_pmid = ''.join(filter(str.isdigit, pmid))
                     if numeric_pmid:
-                        fallback_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{numeric_pmid}/pdf/"
+                        pmc_id = find_pmcid({'pmid': numeric_pmid}, self.client)
+                        if pmc_id:
+                            fallback_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/pdf/main.pdf"
+                        else:
+                            fallback_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/pmid/{numeric_pmid}/pdf/"
                         print(f"Trying PMC fallback URL: {fallback_url}")
-                        return self.download_pdf(fallback_url, pmid, overwrite)
+                        return self.download_pdf(fallback_url, pmid, overwrite, origin=origin or url)
                 
                 # If it's an HTML page, try to extract PDF link from it
-                if 'text/html' in content_type:
-                    from bs4 import BeautifulSoup
+                if 'text/html' in content_type or looks_like_html:
                     try:
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        # Read the rest of the page from the same stream, up to a sane limit
+                        html = head
+                        for chunk in chunks:
+                            html += chunk
+                            if len(html) >= MAX_HTML_SIZE:
+                                break
+                        soup = parse_html(html, only='a')
                         # Look for PDF links - common patterns
                         pdf_link = None
                         for a in soup.find_all('a'):
@@ -261,53 +512,169 @@ class ScienceStudyScraper:
                             if href.lower().endswith('.pdf') or '/pdf/' in href.lower():
                                 pdf_link = urllib.parse.urljoin(url, href)
                                 print(f"Found PDF link in HTML page: {pdf_link}")
-                                return self.download_pdf(pdf_link, pmid, overwrite)
+                                response.close()
+                                return self.download_pdf(pdf_link, pmid, overwrite, origin=origin or url)
                     except Exception as e:
                         print(f"Error parsing HTML for PDF links: {e}")
                 
-                return self._try_create_pdf_from_article(pmid)
-            
-            # Download the PDF
-            with open(filename, 'wb') as f:
-                chunk_size = 8192
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:  # Filter out keep-alive new chunks
-                        f.write(chunk)
-            
-            # Verify the file is a valid PDF
-            if os.path.exists(filename):
-                file_size = os.path.getsize(filename)
-                
-                if file_size < 1000:  # If the file is too small, it might not be a valid PDF
-                    with open(filename, 'rb') as f:
-                        first_bytes = f.read(10)
-                        if not first_bytes.startswith(b'%PDF'):
-                            print(f"Warning: Downloaded file does not appear to be a valid PDF (size: {file_size} bytes)")
-                            os.remove(filename)  # Delete the invalid file
-                            return self._try_create_pdf_from_article(pmid)
-                        else:
-                            print(f"Downloaded small but valid PDF ({file_size} bytes)")
-                
-                print(f"Successfully downloaded PDF for study {pmid}")
-                return filename
-            else:
-                print(f"Error: PDF file {filename} not created despite successful download")
-                return self._try_create_pdf_from_article(pmid)
+                response.close()
+                return self.fallback_queue.submit(pmid)
+            
+            # Only a profile that got an actual PDF (not a paywall or interstitial page) is remembered
+            self.header_profiles.record(url, profile)
+            
+            # Download the PDF into a .part file, hashing and counting bytes as they
+            # are written; the file is only renamed once complete
+            size = total_size(response)
+            part = PartFile(part_filename, resume=response.status_code == 206)
+            if response.status_code != 206:
+                # A full response replaces any earlier partial file, changed or not
+                if_range = save_resume_validator(part_filename, url, response)
+            if if_range:
+                headers = {**headers, 'If-Range': if_range}
+            extra = 0
+            try:
+                if (response.status_code != 206 and self.download_segments > 1 and size
+                        and size >= SEGMENT_MIN_SIZE and accepts_ranges(response)):
+                    # Each further segment takes one of this host's free download slots,
+                    # so segments never exceed the per-host connection limit
+                    extra = self.download_pool.reserve(url, self.download_segments - 1)
+                if response.status_code == 206:
+                    complete = stream_to_part(self.client, url, headers, response, part, chunks=chunks)
+                elif extra:
+                    complete = download_segments(self.client, url, headers, response, part, size,
+                                                 extra + 1, head=head, chunks=chunks)
+                else:
+                    complete = stream_to_part(self.client, url, headers, response, part, head=head, chunks=chunks)
+            finally:
+                part.close()
+                if extra:
+                    self.download_pool.release(url, extra)
+            
+            if complete and size and part.size != size:
+                print(f"Warning: Downloaded {part.size} of {size} bytes from {url}")
+                complete = False
+            
+            if not complete:
+                # Only keep the partial file if a later run can resume it safely
+                if not (accepts_ranges(response) and if_range):
+                    discard_part(part_filename)
+                return self.fallback_queue.submit(pmid)
+            
+            path = self._finish_download(part, url, pmid, response, origin)
+            return path if path else self.fallback_queue.submit(pmid)
         
         except requests.exceptions.RequestException as e:
             print(f"Request error downloading PDF for study {pmid}: {e}")
-            return self._try_create_pdf_from_article(pmid)
+            return self.fallback_queue.submit(pmid)
         except Exception as e:
             print(f"Unexpected error downloading PDF for study {pmid}: {e}")
-            return self._try_create_pdf_from_article(pmid)
+            return self.fallback_queue.submit(pmid)
 
-    def _download_from_preprints(self, url, pmid, filename):
+    def _finish_download(self, part, url, pmid, response, origin=None):
+        """Check a completed .part download and move it into the PDF store.
+        
+        The file must look like a PDF and end with a PDF trailer; a file that
+        passes is added to the PDF store and the download manifest, one that
+        does not is deleted and its URL recorded in the negative cache.
+        
+        Args:
+            part (PartFile): Closed .part file holding the whole body
+            url (str): URL the PDF was downloaded from
+            pmid (str): Identifier used for the filename
+            response (requests.Response): Response the body came from, for its validators
+            origin (str): Study's original link, if url was found through it
+        
+        Returns:
+            str: Path to use for the study's PDF, or None if the file was rejected
+        """
+        part_filename = part.path
+        if not os.path.exists(part_filename):
+            print(f"Error: PDF file for {pmid} not created despite successful download")
+            return None
+        
+        file_size = part.size
+        if file_size < 1000:  # If the file is too small, it might not be a valid PDF
+            with open(part_filename, 'rb') as f:
+                first_bytes = f.read(PEEK_SIZE)
+            if not first_bytes.startswith(b'%PDF'):
+                print(f"Warning: Downloaded file does not appear to be a valid PDF (size: {file_size} bytes)")
+                discard_part(part_filename)  # Delete the invalid file
+                self.negative_cache.record_failure(url, failure_class(failure='tiny_file'))
+                return None
+            else:
+                print(f"Downloaded small but valid PDF ({file_size} bytes)")
+        
+        # A file that ends without a PDF trailer was cut off, even if its size matched
+        if not check_pdf_structure(part_filename):
+            print(f"Warning: Downloaded PDF for {pmid} has no %%EOF/startxref trailer, it is probably truncated")
+            discard_part(part_filename)
+            self.negative_cache.record_failure(url, failure_class(failure='truncated'))
+            return None
+        
+        sha256 = part.sha256()
+        print(f"Successfully downloaded PDF for study {pmid} ({file_size} bytes, sha256 {sha256[:12]})")
+        self.negative_cache.record_success(url)
+        path = self.pdf_store.add(part_filename, sha256, pmid, url)
+        discard_part(part_filename)
+        self.manifest.record(pmid, url, path, sha256, response, origin=origin)
+        return path
+    
+    def _reuse_valid(self, pmid, url):
+        """Return the PDF kept from an earlier run for a study, if it is still valid.
+        
+        The file must match its manifest entry (size, hash, PDF trailer) and have
+        come from the study's current PDF link. Entries older than a week are
+        revalidated with a conditional request; a PDF that changed upstream is
+        downloaded again.
+        
+        Args:
+            pmid (str): PubMed ID or identifier used for the filename
+            url (str): PDF link the study has now
+        
+        Returns:
+            str: Path to the kept PDF, or None if it has to be downloaded
+        """
+        entry = self.manifest.valid(pmid)
+        if not entry:
+            return None
+        
+        if entry.get('origin', entry['url']) != url:
+            print(f"PDF link for study {pmid} changed since it was downloaded, downloading it again")
+            return None
+        
+        if self.manifest.needs_revalidation(entry):
+            try:
+                response = self.client.get(
+                    entry['url'],
+                    headers={**self.headers, **self.manifest.validators(entry)},
+                    stream=True,
+                    timeout=30,
+                    allow_redirects=True
+                )
+                response.close()
+            except requests.exceptions.RequestException as e:
+                print(f"Could not revalidate {entry['url']}, keeping the stored PDF: {e}")
+                return entry['path']
+            
+            unchanged = response.status_code == 304 or (
+                response.status_code == 200 and entry.get('etag') and response.headers.get('ETag') == entry['etag'])
+            if not unchanged:
+                print(f"PDF for study {pmid} may have changed upstream (status {response.status_code}), downloading it again")
+                return None
+            self.manifest.touch(pmid)
+        
+        print(f"Keeping valid PDF for study {pmid} from an earlier run ({entry['size']} bytes)")
+        return entry['path']
+    
+    def _download_from_preprints(self, url, pmid, filename, origin=None):
         """Special handling for downloading from preprints.org which has stricter bot detection.
         
         Args:
             url (str): URL of the PDF on preprints.org
             pmid (str): ID to use for the filename
             filename (str): Path to save the PDF
+            origin (str): Study's original link, if url was found through it
             
         Returns:
             str: Path to downloaded file or None if failed
@@ -339,8 +706,8 @@ class ScienceStudyScraper:
             manuscript_url = f"https://www.preprints.org/manuscript/{manuscript_id}/v{version}"
             print(f"Using manuscript URL: {manuscript_url}")
             
-            # Create a completely fresh session for this
-            session = requests.Session()
+            # Create a fresh session (own cookies, shared connection pools) for this
+            session = self.client.new_session()
             
             # Use full browser-like headers
             headers = {
@@ -365,8 +732,7 @@ class ScienceStudyScraper:
             print(f"Successfully visited manuscript page, looking for download button")
             
             # Parse the page to find the actual download button
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text, only='a')
             
             # Look for download button
             download_button = None
@@ -409,20 +775,17 @@ class ScienceStudyScraper:
                     print(f"Failed to download PDF with alternative URL: {pdf_response.status_code}")
                     return None
             
-            # Save the PDF
-            with open(filename, 'wb') as f:
-                for chunk in pdf_response.iter_content(chunk_size=8192):
+            # Save the PDF, then check and store it like any other download
+            part = PartFile(f"{filename}.part")
+            try:
+                for chunk in pdf_response.iter_content(chunk_size=CHUNK_SIZE):
                     if chunk:
-                        f.write(chunk)
+                        part.write(chunk)
+            finally:
+                part.close()
+                pdf_response.close()
             
-            if os.path.exists(filename) and os.path.getsize(filename) > 1000:
-                print(f"Successfully downloaded PDF from preprints.org")
-                return filename
-            else:
-                print(f"Downloaded file is too small or invalid")
-                if os.path.exists(filename):
-                    os.remove(filename)
-                return None
+            return self._finish_download(part, url, pmid, pdf_response, origin)
                     
         except Exception as e:
             print(f"Error downloading from preprints.org: {e}")
@@ -440,57 +803,19 @@ class ScienceStudyScraper:
         print(f"Attempting to create PDF from article content for {pmid}")
         
         try:
-            # First, find the study data - more robust matching
-            study_data = None
-            pmid_str = str(pmid)
-            
-            # Look for exact matches first
-            for study in self.studies_data:
-                if (str(study.get('pmid', '')) == pmid_str or 
-                    str(study.get('unique_id', '')) == pmid_str or
-                    str(study.get('processed_id', '')) == pmid_str):
-                    study_data = study
-                    print(f"Found study data using exact match for {pmid}")
-                    break
-            
-            # If no match found, try partial match - important for file path IDs
-            if not study_data:
-                for study in self.studies_data:
-                    if (pmid_str in str(study.get('processed_id', '')) or
-                        pmid_str in str(study.get('unique_id', '')) or 
-                        pmid_str in str(study.get('pmid', '')) or
-                        (study.get('source_type') == 'ppr' and pmid_str.endswith(study.get('unique_id', '')))):
-                        study_data = study
-                        print(f"Found study data using partial match for {pmid}")
-                        break
-            
-            # Try extracting unique identifier from filename
-            if not study_data and pmid_str.startswith("europmc_"):
-                base_id = pmid_str.replace("europmc_", "")
-                for study in self.studies_data:
-                    if str(study.get('unique_id', '')) == base_id or base_id in str(study.get('unique_id', '')):
-                        study_data = study
-                        print(f"Found study data by extracted base ID: {base_id}")
-                        break
-                    elif study.get('source_type') == 'ppr' and base_id in str(study.get('unique_id', '')):
-                        study_data = study
-                        print(f"Found preprint study data by ID: {base_id}")
-                        break
-            
+            # Find the study by its queued file name or any of its IDs
+            study_data = self.studies.lookup(pmid)
             if not study_data:
-                print(f"Could not find study data for {pmid}")
-                # Print available IDs for debugging
-                print("Available study IDs:")
-                for study in self.studies_data:
-                    print(f"  - PMID: {study.get('pmid', 'None')}, Unique ID: {study.get('unique_id', 'None')}, Processed ID: {study.get('processed_id', 'None')}")
+                print(f"Could not find study data for {pmid} among {len(self.studies)} registered studies")
                 return None
             
             # Determine the best URL to extract content from
             extraction_url = study_data.get('source_url')
             
-            # Check if we have a PMC ID - PMC is better for full text
-            if study_data.get('pmc_id'):
-                pmc_id = study_data['pmc_id'].replace('PMC', '')
+            # Check if we have a PMC ID (from the study or the crosswalk) - PMC is better for full text
+            pmc_id = find_pmcid(study_data, self.client)
+            if pmc_id:
+                pmc_id = pmc_id.replace('PMC', '')
                 extraction_url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{pmc_id}/"
             
             # Also try Europe PMC if we have a PMID
@@ -516,30 +841,29 @@ class ScienceStudyScraper:
                         print(f"Using direct preprints.org URL for content extraction: {extraction_url}")
             
             # Check if we have a DOI - some repositories have good content extraction with DOI
+            # (go straight to the landing page if the DOI was resolved before)
             doi_url = None
             if study_data.get('doi'):
                 doi = study_data['doi']
-                doi_url = f"https://doi.org/{doi}"
-            
-            # Extract content from the article
-            article_content = None
-            if extraction_url:
-                article_content = extract_article_content(extraction_url, study_data, self.headers)
+                doi_url = landing_url(doi, self.client)
             
-            # If that failed and we have an alternative URL, try that
-            if (not article_content or len(article_content.get('sections', [])) <= 1) and europe_pmc_url:
-                print(f"Trying alternative source: {europe_pmc_url}")
-                article_content = extract_article_content(europe_pmc_url, study_data, self.headers)
+            # Extract content from all sources at once; the article page (or PMC) is preferred,
+            # then Europe PMC, then the DOI link, whichever has more than one section first
+            def extract(source_url):
+                content = extract_article_content(source_url, study_data, self.headers, client=self.client)
+                return content if content and content.get('sections') else None
             
-            # If Europe PMC failed and we have a DOI, try the DOI link
-            if (not article_content or len(article_content.get('sections', [])) <= 1) and doi_url:
-                print(f"Trying DOI source: {doi_url}")
-                article_content = extract_article_content(doi_url, study_data, self.headers)
+            sources = list(dict.fromkeys(url for url in (extraction_url, europe_pmc_url, doi_url) if url))
+            article_content = self.fallback_queue.race(
+                sources, extract, lambda content: len(content['sections']) > 1
+            )
             
             # Generate PDF if we have content
-            if article_content and article_content.get('sections', []):
-                pdf_filename = os.path.join(self.output_dir, "pdfs", f"{pmid}.pdf")
-                return generate_pdf_from_content(article_content, pdf_filename)
+            if article_content:
+                # Generate next to the per-study name, which may be a hardlink into the store
+                pdf_filename = os.path.join(self.output_dir, "pdfs", f"{pmid}.pdf.part")
+                generated = generate_pdf_from_content(article_content, pdf_filename)
+                return self.pdf_store.add_file(generated, pmid) if generated else None
             else:
                 print(f"Could not extract sufficient content for {pmid}")
                 return None
@@ -548,7 +872,8 @@ class ScienceStudyScraper:
             print(f"Error creating PDF from article content: {e}")
             return None
     
-    def run(self, query, additional_terms=None, databases=None, test_mode=False):
+    def run(self, query, additional_terms=None, databases=None, test_mode=False, interactive=True, job_name=None,
+            incremental=False):
         """Execute the full workflow: search, get details, and download PDFs.
         
         Args:
@@ -556,10 +881,41 @@ class ScienceStudyScraper:
             additional_terms (list): Additional search terms to refine results
             databases (list): List of databases to search (default: all)
             test_mode (bool): If True, only download one study per database
+            interactive (bool): If True, ask before downloading each database's studies;
+                if False, download everything without prompting
+            job_name (str): Optional name included in the export filenames
+            incremental (bool): Only fetch studies that are new since the last run of
+                this query: sources that support it are searched from the last run's
+                date on, and studies processed in earlier runs are skipped
         
         Returns:
-            DataFrame: Results as a pandas DataFrame
+            int: Number of studies written to the run's export log. Earlier
+                versions returned a pandas DataFrame of all studies; the
+                studies are now only in the export log and the exports
         """
+        # Network metrics cover this run only
+        self.metrics.reset()
+        
+        # State of earlier runs of this query, updated at the end of this run
+        state = self._load_query_state(query, additional_terms)
+        run_started = datetime.now()
+        
+        since = {}
+        self._known_ids = set()
+        if incremental:
+            for db_name, db_state in state['databases'].items():
+                if db_state.get('last_run'):
+                    # One day of overlap covers records indexed late on the day of the last run
+                    since[db_name] = (datetime.fromisoformat(db_state['last_run']) - timedelta(days=1)).date()
+                self._known_ids.update(db_state.get('ids', []))
+            if state['databases']:
+                print(f"Incremental run: skipping {len(self._known_ids)} studies processed in earlier runs")
+            else:
+                print("Incremental run: no earlier run of this query recorded, searching everything")
+        
+        run_ids = {}
+        completed = set()
+        
         # Default additional terms if none provided
         if additional_terms is None:
             additional_terms = [
@@ -571,49 +927,97 @@ class ScienceStudyScraper:
         if databases is None:
             databases = ['pubmed', 'pmc', 'europepmc', 'biorxiv', 'sciencedirect', 'doaj', 'semanticscholar', 'googlescholar']
         
+        # Studies are written to the export log as they finish, so an interrupted
+        # run keeps everything processed so far
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if job_name:
+            stamp = f"{job_name}_{stamp}"
+        self.study_log = StudyLog(
+            os.path.join(self.output_dir, f"studies_{stamp}.jsonl"),
+            os.path.join(self.output_dir, f"studies_{stamp}.csv")
+        )
+        self._download_handles = {}
+        print(f"Writing studies to {self.study_log.path} as they are processed")
+        
         # Reset study data
-        self.studies_data = []
+        self.identity = IdentityIndex()
+        self.studies = StudyRegistry()
+        self._study_refs = itertools.count(1)
+        self.sources = {source: 0 for source in self.sources}
         
-        # Process each database
-        for db_name in databases:
+        # Run all searches concurrently and process each database as soon as its search finishes
+        for db_name, db_module, results in self._search_databases(query, additional_terms, databases, since):
             try:
-                # Dynamically import the database module
-                db_module = importlib.import_module(f"database.{db_name}")
-                # Get the search function
-                search_func = getattr(db_module, f"search_{db_name}")
-                # Call the search function
-                results = search_func(query, additional_terms, self.headers, self.max_results)
-                
-                if not results:
-                    continue
+                # Lazy result streams (paginated APIs) are consumed while later pages are fetched
+                streamed = not isinstance(results, list)
+                stream = results
+                found = None if streamed else len(results)
+                ids = run_ids.setdefault(db_name, set())
                 
-                print(f"\nFound {len(results)} relevant studies on {db_name.capitalize()}")
+                if streamed:
+                    total = getattr(results, 'total', None)
+                    if total == 0:
+                        continue
+                    if total is not None and self.max_results is not None:
+                        total = min(total, self.max_results)
+                    print(f"\nFound {total if total is not None else 'an unknown number of'} relevant studies on {db_name.capitalize()}")
+                    results = self._prepare_stream(db_name, results)
+                else:
+                    if not results:
+                        continue
+                    
+                    # Fill in the crosswalk for these results in a few batched requests, then
+                    # drop papers already found in another database before resolving and downloading them
+                    self._resolve_ids(db_name, results)
+                    results = self._merge_duplicates(db_name, results)
+                    if not results:
+                        print(f"\nAll {db_name.capitalize()} results were already found in other databases")
+                        continue
+                    
+                    print(f"\nFound {len(results)} relevant studies on {db_name.capitalize()}")
                 
-                download_choice = input(f"Download {db_name.capitalize()} studies? (yes/no): ").strip().lower()
+                if interactive:
+                    download_choice = input(f"Download {db_name.capitalize()} studies? (yes/no): ").strip().lower()
+                else:
+                    download_choice = 'yes'
                 if download_choice in ['yes', 'y']:
                     # Process studies (just one if in test mode)
-                    study_count = 1 if test_mode else len(results)
+                    if streamed:
+                        selected = itertools.islice(results, 1) if test_mode else results
+                        study_count = None
+                    else:
+                        study_count = 1 if test_mode else len(results)
+                        selected = results[:study_count]
                     
                     # Get the process function
                     if hasattr(db_module, f"process_{db_name}_results"):
                         process_func = getattr(db_module, f"process_{db_name}_results")
                         
-                        processed_results = process_func(
-                            results[:study_count], 
-                            self.download_pdf, 
-                            self.output_dir,
-                            self.headers,
-                            self.delay
-                        )
-                        
-                        # Add the studies to our collection
-                        for study in processed_results:
-                            self.studies_data.append(study)
-                            self.sources[db_name] += 1
+                        with stage(f"{db_name}.process"):
+                            processed_results = process_func(
+                                selected, 
+                                self.queue_download, 
+                                self.output_dir,
+                                self.headers,
+                                self.delay,
+                                client=self.client,
+                                **self._db_kwargs(db_name, process_func)
+                            )
+                            
+                            # Add each study to our collection as the module finishes it, so
+                            # an interrupted run keeps the studies processed so far
+                            for study in processed_results:
+                                self.crosswalk.record_study(study)
+                                ref = next(self._study_refs)
+                                self.identity.add(self._identifiers(study), ref)
+                                ids.update(self._state_keys(study))
+                                self.studies.register(study)
+                                self._log_study(study, ref)
+                                self.sources[db_name] += 1
                     else:
                         # Generic processing
-                        for i, study in enumerate(results[:study_count]):
-                            print(f"Processing {db_name} study {i+1}/{study_count}...")
+                        for i, study in enumerate(selected):
+                            print(f"Processing {db_name} study {i+1}/{study_count or '?'}...")
                             
                             # Add database name
                             study['database'] = db_name.capitalize()
@@ -623,26 +1027,61 @@ class ScienceStudyScraper:
                                 identifier = study.get('pmid', study.get('doi', study.get('unique_id', f"{db_name}_{i}")))
                                 if isinstance(identifier, str):
                                     identifier = identifier.replace('/', '_')
-                                pdf_path = self.download_pdf(study['pdf_link'], f"{db_name}_{identifier}", overwrite=True)
-                                study['local_pdf_path'] = pdf_path
+                                self.queue_download(study['pdf_link'], f"{db_name}_{identifier}", overwrite=True, study=study)
                             
-                            self.studies_data.append(study)
+                            self.crosswalk.record_study(study)
+                            ref = next(self._study_refs)
+                            self.identity.add(self._identifiers(study), ref)
+                            ids.update(self._state_keys(study))
+                            self.studies.register(study)
+                            self._log_study(study, ref)
                             self.sources[db_name] += 1
-                            
-                            # Delay to prevent overloading the server
-                            time.sleep(self.delay)
                     
-                    if test_mode and len(results) > 1:
+                    # A later incremental run may start from this run's date only if every
+                    # result was processed, not just the first one or the first max_results
+                    if streamed:
+                        found = getattr(stream, 'count', None)
+                    if not test_mode and found is not None and (self.max_results is None or found < self.max_results):
+                        completed.add(db_name)
+                    
+                    if test_mode and not streamed and len(results) > 1:
                         print(f"Test mode: Only downloaded 1 of {len(results)} studies from {db_name.capitalize()}")
             
             except Exception as e:
                 print(f"Error processing {db_name}: {e}")
+            finally:
+                # Results that were not processed (declined, test mode, no details) give up
+                # their claim, so the same paper can still come from a later database
+                self.identity.release()
         
-        # Export results to CSV and JSON
-        self.export_results()
+        # Let the download stage (and the article-content fallbacks it deferred)
+        # finish before exporting local PDF paths
+        pending = self.download_pool.pending()
+        if pending:
+            fallbacks = self.fallback_queue.pending()
+            print(f"\nWaiting for {pending} PDF downloads to finish"
+                  f"{f' ({fallbacks} being built from article pages)' if fallbacks else ''}...")
+        self.download_pool.wait()
+        self.fallback_queue.wait()
+        
+        # Keep the response cache within its size and age limits
+        if self.http_cache:
+            self.http_cache.prune()
         
-        # Create a DataFrame for easy viewing
-        df = pd.DataFrame(self.studies_data)
+        self._save_query_state(state, run_ids, completed, run_started)
+        
+        try:
+            self.strategy_stats.save()
+            self.header_profiles.save()
+            self.manifest.save()
+            self.pdf_store.save()
+        except OSError as e:
+            print(f"Error saving PDF strategy statistics, header profiles, download manifest and PDF store index: {e}")
+        
+        # Export results to CSV, JSON and HTML from the completed export log
+        self.study_log.close()
+        self.export_results()
+        self.export_metrics(job_name)
         
         # Print summary of sources
         print("\nStudies found by source:")
@@ -650,26 +1089,370 @@ class ScienceStudyScraper:
             if count > 0:
                 print(f"  {source.capitalize()}: {count}")
         
-        return df
+        return self.study_log.count
     
-    def export_results(self):
-        """Export the collected study data to CSV and JSON files."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _save_query_state(self, state, run_ids, completed, run_started):
+        """Record the studies processed in this run, and write them out if the query is saved.
+        
+        Args:
+            state (dict): Query state from _load_query_state()
+            run_ids (dict): State keys of the studies processed, per database
+            completed (set): Databases whose results were processed completely
+            run_started (datetime): Start time of this run
+        """
+        for db_name, ids in run_ids.items():
+            db_state = state['databases'].setdefault(db_name, {'ids': [], 'last_run': None})
+            db_state['ids'] = sorted(set(db_state.get('ids', [])) | ids)
+            if db_name in completed:
+                db_state['last_run'] = run_started.isoformat(timespec='seconds')
+        self.query_state = state
+        
+        try:
+            if self._same_query(self.load_saved_query(), state['query'], state['terms']):
+                self.save_query(state['query'], state['terms'])
+        except (OSError, ValueError) as e:
+            print(f"Error saving query state: {e}")
+    
+    def _resolve_ids(self, db_name, results):
+        """Look up the identifiers of a database's search results in the crosswalk.
+        
+        Unknown IDs are sent to the NCBI ID converter in batches of 200, so
+        later PMCID/PMID/DOI lookups for these studies are local.
+        
+        Args:
+            db_name (str): Database the results came from
+            results (list): Search results (study dicts, or bare PMIDs/PMC IDs)
+        """
+        ids = {'pmid': [], 'pmcid': [], 'doi': []}
+        for item in results:
+            if isinstance(item, str):
+                kind = SEARCH_ID_KINDS.get(db_name)
+                if kind:
+                    ids[kind].append(item)
+            elif isinstance(item, dict):
+                for kind, field in (('pmid', 'pmid'), ('pmcid', 'pmcid'), ('pmcid', 'pmc_id'), ('doi', 'doi')):
+                    if item.get(field):
+                        ids[kind].append(item[field])
+                # Results that already carry several IDs teach the crosswalk for free
+                self.crosswalk.record_study(item)
+        
+        for kind, values in ids.items():
+            if values:
+                self.crosswalk.resolve(kind, values)
+    
+    def _prepare_stream(self, db_name, results):
+        """Resolve IDs and drop duplicates for a lazy result stream, batch by batch.
+        
+        Args:
+            db_name (str): Database the results came from
+            results (iterator): Lazy stream of search results
+        
+        Yields:
+            Search results that are new in this run
+        """
+        batch = []
+        for item in results:
+            batch.append(item)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                self._resolve_ids(db_name, batch)
+                yield from self._merge_duplicates(db_name, batch)
+                batch = []
+        
+        if batch:
+            self._resolve_ids(db_name, batch)
+            yield from self._merge_duplicates(db_name, batch)
+    
+    def _identifiers(self, item, db_name=None):
+        """Return the identity keys of a result, completed from the crosswalk."""
+        keys = study_identifiers(item, db_name)
+        ids = dict(key.split(':', 1) for key in keys)
+        known = self.crosswalk.lookup(**ids) if ids else None
+        if known:
+            keys += [key for key in study_identifiers(known) if key not in keys]
+        return keys
+    
+    def _merge_duplicates(self, db_name, results):
+        """Remove search results for papers already found in this run or an earlier one.
+        
+        Results are matched on normalized DOI, PMID and PMCID. A duplicate is
+        not processed again; instead its database and identifiers are noted in
+        the export log, and the exports add the database to 'also_found_in' on
+        the study it duplicates, along with the identifiers that study lacks.
+        New results only claim their identifiers
+        provisionally; run() releases the claims of results it did not
+        process once the database is done. In incremental runs, results processed in an
+        earlier run of the query are dropped as well.
+        
+        Args:
+            db_name (str): Database the results came from
+            results (list): Search results (study dicts, or bare PMIDs/PMC IDs)
+        
+        Returns:
+            list: The results that are new in this run
+        """
+        unique = []
+        duplicates = 0
+        known = 0
+        
+        for item in results:
+            if self._known_ids and self._known_ids.intersection(self._state_keys(item, db_name)):
+                known += 1
+                continue
+            
+            keys = self._identifiers(item, db_name)
+            if self.identity.claim(keys):
+                unique.append(item)
+                continue
+            
+            duplicates += 1
+            owner = self.identity.lookup(keys)
+            if owner is not None:
+                ids = {field: item[field] for field in ANNOTATED_IDS if item.get(field)} if isinstance(item, dict) else {}
+                self.study_log.annotate(owner, db_name, ids)
+        
+        if known:
+            print(f"Skipping {known} {db_name.capitalize()} results processed in an earlier run")
+        if duplicates:
+            print(f"Skipping {duplicates} {db_name.capitalize()} results already found in this run")
+        
+        return unique
+    
+    def _search_databases(self, query, additional_terms, databases, since=None):
+        """Search all databases concurrently.
+        
+        Every search function is started at once on a thread pool and results
+        are yielded in completion order, so the total search time is roughly
+        that of the slowest database instead of the sum of all of them.
+        
+        Args:
+            query (str): Main search query
+            additional_terms (list): Additional search terms to refine results
+            databases (list): List of databases to search
+            since (dict): Date lower bound per database, passed to search functions
+                that accept a 'since' argument
         
-        # Export to CSV
-        csv_path = os.path.join(self.output_dir, f"studies_{timestamp}.csv")
-        pd.DataFrame(self.studies_data).to_csv(csv_path, index=False)
-        print(f"Exported study data to {csv_path}")
+        Yields:
+            tuple: (database name, database module, search results) for each
+                database whose search completed successfully
+        """
+        if not databases:
+            return
+        
+        max_workers = self.search_workers or len(databases)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search") as executor:
+            futures = {}
+            for db_name in databases:
+                try:
+                    # Dynamically import the database module
+                    db_module = importlib.import_module(f"database.{db_name}")
+                    # Get the search function
+                    search_func = getattr(db_module, f"search_{db_name}")
+                except Exception as e:
+                    print(f"Error processing {db_name}: {e}")
+                    continue
+                
+                future = executor.submit(
+                    self._search_with_slot, db_name, search_func, query, additional_terms,
+                    (since or {}).get(db_name)
+                )
+                futures[future] = (db_name, db_module)
+            
+            # Collect results as each source finishes
+            for future in as_completed(futures):
+                db_name, db_module = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"Error searching {db_name}: {e}")
+                    continue
+                yield db_name, db_module, results
+    
+    def _search_with_slot(self, db_name, search_func, query, additional_terms, since=None):
+        """Call a search function while holding one of the database's search slots.
+        
+        Args:
+            db_name (str): Name of the database
+            search_func (function): Search function of the database module
+            query (str): Main search query
+            additional_terms (list): Additional search terms to refine results
+            since (date): Only search for studies added on or after this date
+        
+        Returns:
+            list: Search results
+        """
+        with self._source_slots_lock:
+            slot = self._source_slots.get(db_name)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.searches_per_source)
+                self._source_slots[db_name] = slot
+        
+        kwargs = self._db_kwargs(db_name, search_func)
+        if since is not None:
+            if 'since' in inspect.signature(search_func).parameters:
+                print(f"Searching {db_name.capitalize()} for studies added since {since.isoformat()}")
+                kwargs['since'] = since
+        
+        with slot, stage(f"{db_name}.search"):
+            return search_func(query, additional_terms, self.headers, self.max_results, client=self.client,
+                               **kwargs)
+    
+    def _db_kwargs(self, db_name, func):
+        """Return the configured options for a database that a module function accepts.
+        
+        Args:
+            db_name (str): Name of the database
+            func (function): Search or process function of the database module
+        
+        Returns:
+            dict: Keyword arguments to pass to func
+        """
+        options = self.db_options.get(db_name)
+        if not options:
+            return {}
+        parameters = inspect.signature(func).parameters
+        return {name: value for name, value in options.items() if name in parameters}
+    
+    def run_batch(self, job_file):
+        """Run every job in a job file without prompting.
+        
+        The job file is JSON: either a list of jobs or an object with a "jobs"
+        list and optional "defaults" applied to every job. Each job has a
+        "query" and optionally "name", "terms", "databases" (list or "all"),
+        "max_results" and "test". All jobs share this scraper's connection
+        pools, response cache, rate limiter and PDF store.
+        
+        Args:
+            job_file (str): Path to the JSON job file
+        
+        Returns:
+            dict: Number of studies found per job name (None for failed jobs)
+        """
+        with open(job_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
         
-        # Export to JSON
-        json_path = os.path.join(self.output_dir, f"studies_{timestamp}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.studies_data, f, ensure_ascii=False, indent=4)
+        if isinstance(data, list):
+            data = {'jobs': data}
+        defaults = data.get('defaults', {})
+        jobs = data.get('jobs', [])
+        
+        summary = {}
+        default_max_results = self.max_results
+        
+        for i, job in enumerate(jobs):
+            job = {**defaults, **job}
+            name = re.sub(r'[^\w.-]+', '_', str(job.get('name') or f"job{i + 1}"))
+            
+            query = job.get('query')
+            if not query:
+                print(f"\nSkipping job {name}: no query given")
+                summary[name] = None
+                continue
+            
+            databases = job.get('databases', 'all')
+            if databases == 'all' or 'all' in databases:
+                databases = list(self.sources)
+            
+            print(f"\n=== Job {i + 1}/{len(jobs)}: {name} ('{query}') ===")
+            self.max_results = job.get('max_results', default_max_results)
+            try:
+                count = self.run(
+                    query=query,
+                    additional_terms=job.get('terms'),
+                    databases=databases,
+                    test_mode=job.get('test', False),
+                    interactive=False,
+                    job_name=name
+                )
+                summary[name] = count
+            except Exception as e:
+                print(f"Error running job {name}: {e}")
+                summary[name] = None
+            finally:
+                self.max_results = default_max_results
+        
+        print("\nBatch summary:")
+        for name, count in summary.items():
+            print(f"  {name}: {'failed' if count is None else f'{count} studies'}")
+        
+        return summary
+    
+    def _log_study(self, study, ref=None):
+        """Append a study to the export log once its PDF download (if any) has finished.
+        
+        The study is dropped from the registry as soon as it is logged, so the
+        run only keeps studies that are still being processed or downloaded.
+        
+        Args:
+            study (dict): Processed study
+            ref (int): Reference of the study in the identity index
+        """
+        handle = self._download_handles.pop(id(study), None)
+        if handle is None:
+            self._append_study(study, ref)
+        else:
+            # Runs right away if the download already finished
+            handle.add_done_callback(lambda _handle: self._append_study(study, ref))
+    
+    def _append_study(self, study, ref):
+        self.study_log.append(study, ref)
+        self.studies.release(study)
+    
+    def export_results(self, log_path=None):
+        """Export the collected study data to CSV, JSON and an HTML report.
+        
+        The files are written by streaming over a JSONL export log, so only one
+        study is held in memory at a time. A log left behind by an interrupted
+        run can be exported the same way.
+        
+        Args:
+            log_path (str): Export log to export (default: the log of the last run)
+        """
+        if log_path is None:
+            if self.study_log is None:
+                print("No studies to export: nothing has been run yet")
+                return
+            self.study_log.close()
+            log_path = self.study_log.path
+        
+        # studies_<timestamp>.jsonl -> studies_<timestamp>.csv/.json, studies_report_<timestamp>.html
+        base = log_path[:-len('.jsonl')] if log_path.endswith('.jsonl') else log_path
+        directory, stem = os.path.split(base)
+        timestamp = stem[len('studies_'):] if stem.startswith('studies_') else stem
+        csv_path = f"{base}.csv"
+        json_path = f"{base}.json"
+        html_path = os.path.join(directory, f"studies_report_{timestamp}.html")
+        
+        try:
+            count = export_log(log_path, csv_path, json_path, html_path)
+        except OSError as e:
+            print(f"Error exporting {log_path}: {e}")
+            return
+        
+        print(f"Exported {count} studies to {csv_path}")
         print(f"Exported study data to {json_path}")
-
-        # Create a simple HTML report
-        html_report = generate_html_report(self.studies_data)
-        html_path = os.path.join(self.output_dir, f"studies_report_{timestamp}.html")
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_report)
         print(f"Generated HTML report at {html_path}")
+    
+    def export_metrics(self, name=None):
+        """Export the network metrics of the run as JSON and as a Prometheus text file.
+        
+        Args:
+            name (str): Optional job name included in the filenames
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if name:
+            timestamp = f"{name}_{timestamp}"
+        
+        json_path = os.path.join(self.output_dir, f"metrics_{timestamp}.json")
+        prom_path = os.path.join(self.output_dir, f"metrics_{timestamp}.prom")
+        try:
+            metrics = self.metrics.export(json_path, prom_path)
+        except OSError as e:
+            print(f"Error exporting network metrics: {e}")
+            return
+        print(f"Exported network metrics to {json_path} and {prom_path}")
+        
+        if metrics['hosts_by_time']:
+            print("\nSlowest hosts (total request time):")
+            for host in metrics['hosts_by_time'][:5]:
+                print(f"  {host['host']}: {host['seconds']:.1f}s over {host['requests']} requests "
+                      f"({host['errors']} failed, {host['bytes'] / 1e6:.1f} MB)")
@@ -5,6 +5,7 @@ Automatically find and download scientific studies from open access repositories
 on any topic in the scientific and medical field.
 """
 
+import os
 import argparse
 from downloader import ScienceStudyScraper
 
@@ -19,18 +20,50 @@ def main():
                         help='Main search query (required if no saved query)')
     parser.add_argument('--terms', '-t', type=str, nargs='+',
                         help='Additional search terms to refine results')
-    parser.add_argument('--delay', '-d', type=int, default=1,
-                        help='Delay between requests in seconds')
+    parser.add_argument('--delay', '-d', type=float, default=1,
+                        help='Initial delay between requests to the same host in seconds (adapts to server responses)')
     parser.add_argument('--databases', type=str, nargs='+', 
                         choices=['pubmed', 'pmc', 'europepmc', 'biorxiv', 'sciencedirect', 'doaj', 'semanticscholar', 'googlescholar', 'all'],
                         default=['all'],
                         help='Databases to search (default: all)')
+    parser.add_argument('--search-workers', type=int, default=None,
+                        help='Maximum number of databases searched at the same time (default: all at once)')
+    parser.add_argument('--download-workers', type=int, default=8,
+                        help='Maximum number of PDF downloads running at the same time (default: 8)')
+    parser.add_argument('--downloads-per-host', type=int, default=2,
+                        help='Maximum number of PDF downloads running at the same time against one host (default: 2)')
+    parser.add_argument('--download-segments', type=int, default=1,
+                        help='Download large PDFs as up to this many parallel byte ranges, within the per-host download limit (default: 1)')
+    parser.add_argument('--fallback-workers', type=int, default=2,
+                        help='Maximum number of failed downloads rebuilt from article pages at the same time (default: 2)')
+    parser.add_argument('--html-parser', type=str, choices=['lxml', 'html.parser'], default=None,
+                        help='HTML parser to use (default: lxml if installed, otherwise html.parser)')
+    parser.add_argument('--pubmed-eutils', action='store_true',
+                        help='Search and fetch PubMed through the NCBI E-utilities API (all hits, batched metadata)')
+    parser.add_argument('--ncbi-api-key', type=str, default=os.environ.get('NCBI_API_KEY'),
+                        help='NCBI API key for the higher E-utilities rate limit (default: $NCBI_API_KEY)')
+    parser.add_argument('--preprint-days', type=int, default=None,
+                        help='Number of days back scanned for bioRxiv/medRxiv preprints (default: 90)')
+    parser.add_argument('--preprint-match-terms', action='store_true',
+                        help='Only keep bioRxiv/medRxiv preprints that also match one of the additional terms')
+    parser.add_argument('--skip-valid', action='store_true',
+                        help='Keep PDFs from earlier runs that are still complete instead of downloading them again')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent HTTP response cache in the output directory')
     parser.add_argument('--test', action='store_true',
                         help='Test mode: only download one study per database')
     parser.add_argument('--save-query', action='store_true',
                         help='Save the current query for future use')
     parser.add_argument('--load-saved', action='store_true',
                         help='Load the previously saved query')
+    parser.add_argument('--new-only', action='store_true',
+                        help='Only fetch studies that are new since the last run of the saved query')
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help='Download studies from every database without asking')
+    parser.add_argument('--export-log', type=str, default=None,
+                        help='Write the CSV, JSON and HTML exports of a studies_*.jsonl log (e.g. after an interrupted run)')
+    parser.add_argument('--batch', type=str, default=None,
+                        help='Run all queries in a JSON job file without prompting')
     
     args = parser.parse_args()
     
@@ -40,12 +73,40 @@ def main():
     else:
         databases = args.databases
     
+    db_options = {}
+    if args.pubmed_eutils:
+        db_options['pubmed'] = {'use_eutils': True, 'api_key': args.ncbi_api_key}
+    if args.preprint_days:
+        db_options.setdefault('biorxiv', {})['days'] = args.preprint_days
+    if args.preprint_match_terms:
+        db_options.setdefault('biorxiv', {})['match_terms'] = True
+    
     scraper = ScienceStudyScraper(
         output_dir=args.output,
         max_results=args.max_results,
-        delay=args.delay
+        delay=args.delay,
+        search_workers=args.search_workers,
+        download_workers=args.download_workers,
+        downloads_per_host=args.downloads_per_host,
+        use_cache=not args.no_cache,
+        download_segments=args.download_segments,
+        db_options=db_options,
+        fallback_workers=args.fallback_workers,
+        html_parser=args.html_parser,
+        skip_valid=args.skip_valid
     )
     
+    if args.export_log:
+        scraper.export_results(log_path=args.export_log)
+        return
+    
+    if args.batch:
+        try:
+            scraper.run_batch(args.batch)
+        except (OSError, ValueError) as e:
+            print(f"Error reading job file {args.batch}: {e}")
+        return
+    
     query = args.query
     additional_terms = args.terms
     
@@ -65,11 +126,13 @@ def main():
         print("Error: No query provided. Please use --query to specify a search term or --load-saved to use a saved query.")
         return
     
-    results = scraper.run(
+    count = scraper.run(
         query=query, 
         additional_terms=additional_terms, 
         databases=databases,
-        test_mode=args.test
+        test_mode=args.test,
+        interactive=not args.yes,
+        incremental=args.new_only
     )
     
     # Save the query if requested
@@ -77,7 +140,7 @@ def main():
         scraper.save_query(query, additional_terms)
         print(f"Saved query for future use: '{query}' with terms: {additional_terms}")
     
-    print(f"\nDownloaded information for {len(results)} studies.")
+    print(f"\nDownloaded information for {count} studies.")
     print(f"Results saved to {args.output} directory.")
 
 if __name__ == "__main__":
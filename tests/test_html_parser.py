@@ -0,0 +1,163 @@
+"""
+Parity of partial and full HTML parsing on saved pages
+
+Every parse_html(..., only=...) strainer used by the modules is checked on
+a fixture page: the module must extract exactly what it extracts when the
+whole page is parsed.
+"""
+
+import os
+import importlib
+
+import pytest
+
+import utils.html_parser as html_parser
+from utils.html_parser import parse_html, available_parsers, set_parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, url, body, content_type='text/html; charset=utf-8'):
+        self.url = url
+        self.status_code = 200
+        self.content = body
+        self.text = body.decode('utf-8')
+        self.headers = {'Content-Type': content_type}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    """Answers requests with saved pages: {url substring: (fixture, content type)}."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        for pattern, (fixture, content_type) in self.pages.items():
+            if pattern in url:
+                return FakeResponse(url, load(fixture) if fixture else b'%PDF-1.7\n', content_type)
+        raise AssertionError(f"Unexpected request to {url}")
+
+    def new_session(self):
+        return self
+
+
+@pytest.fixture(params=available_parsers(), autouse=True)
+def parser(request):
+    set_parser(request.param)
+    yield request.param
+    set_parser(None)
+
+
+def parse_both(module, monkeypatch, extract):
+    """Return what extract() yields with the module's strainers, then with full parses."""
+    partial = extract()
+    monkeypatch.setattr(module, 'parse_html', lambda markup, only=None: html_parser.parse_html(markup))
+    full = extract()
+    return partial, full
+
+
+def test_pubmed_search(monkeypatch):
+    pubmed = importlib.import_module('database.pubmed')
+    client = FakeClient({'pubmed.ncbi.nlm.nih.gov': ('pubmed_search.html', 'text/html')})
+
+    partial, full = parse_both(pubmed, monkeypatch,
+                               lambda: pubmed.search_pubmed('nmn', None, {}, client=client))
+
+    assert partial == full == ['38123456', '37654321', '36999888']
+
+
+def test_pmc_search(monkeypatch):
+    pmc = importlib.import_module('database.pmc')
+    client = FakeClient({'www.ncbi.nlm.nih.gov/pmc': ('pmc_search.html', 'text/html')})
+
+    partial, full = parse_both(pmc, monkeypatch, lambda: pmc.search_pmc('nmn', None, {}, client=client))
+
+    assert partial == full == ['PMC10876543', 'PMC9912345', 'PMC8765432']
+
+
+def test_sciencedirect_search(monkeypatch):
+    sciencedirect = importlib.import_module('database.sciencedirect')
+    client = FakeClient({'www.sciencedirect.com/search': ('sciencedirect_search.html', 'text/html')})
+
+    partial, full = parse_both(sciencedirect, monkeypatch,
+                               lambda: sciencedirect.search_sciencedirect('nmn', None, {}, client=client))
+
+    assert partial == full
+    assert [study['pii'] for study in partial] == ['S1550413122000012', 'S0047637421000987']
+    assert partial[0]['authors'] == ['Jane Doe', 'Kenji Tanaka']
+    assert partial[0]['journal'] == 'Cell Metabolism'
+    assert partial[0]['publication_date'] == 'March 2022'
+
+
+def test_scholar_search(monkeypatch):
+    scholar = importlib.import_module('database.google-scholar-module')
+    monkeypatch.setattr(scholar.time, 'sleep', lambda seconds: None)
+    client = FakeClient({
+        'start=10': ('scholar_search_page2.html', 'text/html'),
+        'scholar.google.com/scholar': ('scholar_search_page1.html', 'text/html'),
+    })
+
+    partial, full = parse_both(scholar, monkeypatch,
+                               lambda: scholar.search_google_scholar('nmn', None, {}, client=client))
+
+    assert partial == full
+    # Both pages are read, so the next page link outside the result blocks is kept
+    assert [study['title'] for study in partial] == [
+        'Nicotinamide mononucleotide increases muscle NAD+',
+        'Safety of long-term NMN intake',
+        'NMN and circadian NAD+ oscillations',
+    ]
+    assert partial[0]['pdf_link'] == 'https://www.nature.com/articles/s41467-023-00001.pdf'
+
+
+@pytest.mark.parametrize('fixture', ['landing_page.html', 'meta_refresh_page.html'])
+def test_scholar_pdf_check(monkeypatch, fixture):
+    scholar = importlib.import_module('database.google-scholar-module')
+    client = FakeClient({
+        '.pdf': (None, 'application/pdf'),
+        '/pdf/': (None, 'application/pdf'),
+        'example.org/article': (fixture, 'text/html'),
+    })
+
+    partial, full = parse_both(scholar, monkeypatch, lambda: scholar.check_pdf_availability(
+        'https://journals.example.org/article/123', {}, client=client))
+
+    assert partial == full
+    assert partial[0] is True
+
+
+@pytest.mark.parametrize('fixture', ['landing_page.html', 'meta_refresh_page.html'])
+def test_link_strainer(fixture):
+    # download_pdf reads every link; the preprints.org handler looks for download buttons
+    markup = load(fixture)
+    partial = parse_html(markup, only='a')
+    full = parse_html(markup)
+
+    assert [str(a) for a in partial.find_all('a')] == [str(a) for a in full.find_all('a')]
+    buttons = 'a.btn, a.button, a.download-button, a[data-target="#downloadPDFModal"]'
+    assert [str(a) for a in partial.select(buttons)] == [str(a) for a in full.select(buttons)]
+
+
+def test_class_strainer_matches_any_listed_class():
+    markup = load('scholar_search_page1.html')
+    soup = parse_html(markup, only={'class_': ['gs_r', 'gs_ico_nav_next']})
+
+    assert len(soup.select('.gs_r.gs_or.gs_scl')) == 3
+    assert soup.select_one('a.gs_ico_nav_next') is not None
+    assert soup.select_one('#gs_hdr') is None
@@ -0,0 +1,224 @@
+"""
+Persistent PMID/PMCID/DOI crosswalk for Science Study Scraper
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import requests
+
+from utils.http_client import get_client
+from utils.identity import normalize_doi, normalize_pmid, normalize_pmcid
+
+ID_CONVERTER_URL = "https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/"
+
+# Largest number of IDs the NCBI ID converter accepts per request
+ID_CONVERTER_BATCH_SIZE = 200
+
+# How long an ID the converter did not know is left alone before asking again
+MISS_TTL = 7 * 86400
+
+NORMALIZERS = {
+    'pmid': normalize_pmid,
+    'pmcid': normalize_pmcid,
+    'doi': normalize_doi,
+}
+
+
+class IdCrosswalk:
+    """SQLite table mapping PMIDs, PMC IDs and DOIs onto each other.
+
+    Rows come from the NCBI ID converter (fetched in batches of 200 IDs) and
+    from identifiers the database modules see anyway. Modules look IDs up
+    here before scraping a page just to find a study's PMCID, PMID or DOI.
+    """
+
+    def __init__(self, db_path, client=None):
+        """Open (or create) the crosswalk database.
+
+        Args:
+            db_path (str): Path of the SQLite file
+            client (HttpClient): Client used for ID converter requests
+        """
+        self.db_path = db_path
+        self.client = client
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ids (pmid TEXT, pmcid TEXT, doi TEXT, updated REAL)"
+            )
+            for column in NORMALIZERS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS ids_{column} ON ids ({column})")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS misses (kind TEXT, value TEXT, checked REAL, PRIMARY KEY (kind, value))"
+            )
+
+    def lookup(self, pmid=None, pmcid=None, doi=None):
+        """Return everything known about a study from any one of its IDs.
+
+        Args:
+            pmid (str): PubMed ID
+            pmcid (str): PMC ID (with or without the PMC prefix)
+            doi (str): DOI (with or without a resolver prefix)
+
+        Returns:
+            dict: {'pmid', 'pmcid', 'doi'} (values may be None), or None if unknown
+        """
+        given = {'pmid': pmid, 'pmcid': pmcid, 'doi': doi}
+        with self._lock:
+            for kind, value in given.items():
+                value = NORMALIZERS[kind](value)
+                if not value:
+                    continue
+                row = self._conn.execute(
+                    f"SELECT pmid, pmcid, doi FROM ids WHERE {kind} = ? "
+                    "ORDER BY (pmid IS NOT NULL) + (pmcid IS NOT NULL) + (doi IS NOT NULL) DESC LIMIT 1",
+                    (value,)
+                ).fetchone()
+                if row:
+                    return {'pmid': row[0], 'pmcid': row[1], 'doi': row[2]}
+        return None
+
+    def lookup_study(self, study):
+        """Return crosswalk IDs for a study dict (reads both pmc_id and pmcid)."""
+        return self.lookup(
+            pmid=study.get('pmid'),
+            pmcid=study.get('pmcid') or study.get('pmc_id'),
+            doi=study.get('doi')
+        )
+
+    def record(self, pmid=None, pmcid=None, doi=None):
+        """Store IDs known to belong to the same study.
+
+        Args:
+            pmid (str): PubMed ID
+            pmcid (str): PMC ID
+            doi (str): DOI
+        """
+        row = {kind: NORMALIZERS[kind](value) for kind, value in (('pmid', pmid), ('pmcid', pmcid), ('doi', doi))}
+        if sum(1 for value in row.values() if value) < 2:
+            return  # A single ID links nothing
+
+        with self._lock, self._conn:
+            self._store(row)
+
+    def record_study(self, study):
+        """Store the IDs of a study dict."""
+        self.record(
+            pmid=study.get('pmid'),
+            pmcid=study.get('pmcid') or study.get('pmc_id'),
+            doi=study.get('doi')
+        )
+
+    def _store(self, row):
+        # Merge with any rows already holding one of these IDs
+        for kind, value in list(row.items()):
+            if not value:
+                continue
+            for existing in self._conn.execute(
+                f"SELECT pmid, pmcid, doi FROM ids WHERE {kind} = ?", (value,)
+            ).fetchall():
+                for other, other_value in zip(('pmid', 'pmcid', 'doi'), existing):
+                    if other_value and not row.get(other):
+                        row[other] = other_value
+
+        for kind, value in row.items():
+            if value:
+                self._conn.execute(f"DELETE FROM ids WHERE {kind} = ?", (value,))
+        self._conn.execute(
+            "INSERT INTO ids (pmid, pmcid, doi, updated) VALUES (?, ?, ?, ?)",
+            (row.get('pmid'), row.get('pmcid'), row.get('doi'), time.time())
+        )
+
+    def resolve(self, kind, values):
+        """Make sure the crosswalk knows the given IDs, asking the NCBI ID converter in batches.
+
+        IDs already in the table, or that the converter recently did not know,
+        are not requested again.
+
+        Args:
+            kind (str): 'pmid', 'pmcid' or 'doi'
+            values (list): IDs of that kind
+
+        Returns:
+            int: Number of IDs sent to the ID converter
+        """
+        normalize = NORMALIZERS[kind]
+        now = time.time()
+        pending = []
+        with self._lock:
+            for value in dict.fromkeys(filter(None, (normalize(value) for value in values))):
+                if self._conn.execute(f"SELECT 1 FROM ids WHERE {kind} = ? LIMIT 1", (value,)).fetchone():
+                    continue
+                miss = self._conn.execute(
+                    "SELECT checked FROM misses WHERE kind = ? AND value = ?", (kind, value)
+                ).fetchone()
+                if miss and now - miss[0] < MISS_TTL:
+                    continue
+                pending.append(value)
+
+        if not pending:
+            return 0
+
+        print(f"Looking up {len(pending)} {kind.upper()}s with the NCBI ID converter")
+        client = get_client(self.client)
+        for start in range(0, len(pending), ID_CONVERTER_BATCH_SIZE):
+            batch = pending[start:start + ID_CONVERTER_BATCH_SIZE]
+            try:
+                response = client.get(
+                    ID_CONVERTER_URL,
+                    params={'ids': ','.join(batch), 'idtype': kind, 'format': 'json',
+                            'tool': 'ScienceStudyScraper'},
+                    timeout=30
+                )
+                response.raise_for_status()
+                records = response.json().get('records', [])
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error converting IDs with the NCBI ID converter: {e}")
+                continue
+
+            found = set()
+            with self._lock, self._conn:
+                for record in records:
+                    row = {name: NORMALIZERS[name](record.get(name)) for name in NORMALIZERS}
+                    if sum(1 for value in row.values() if value) >= 2:
+                        self._store(row)
+                        if row.get(kind):
+                            found.add(row[kind])
+                for value in batch:
+                    if value not in found:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO misses (kind, value, checked) VALUES (?, ?, ?)",
+                            (kind, value, now)
+                        )
+
+        return len(pending)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def find_pmcid(study, client=None):
+    """Return a study's PMC ID from the study itself or the client's crosswalk.
+
+    Args:
+        study (dict): Study with any of 'pmcid', 'pmc_id', 'pmid', 'doi'
+        client (HttpClient): Client whose crosswalk is consulted, if it has one
+
+    Returns:
+        str: PMC ID in the form PMC<digits>, or None if unknown
+    """
+    pmcid = normalize_pmcid(study.get('pmcid') or study.get('pmc_id'))
+    if pmcid:
+        return pmcid
+
+    crosswalk = getattr(get_client(client), 'crosswalk', None)
+    if crosswalk is None:
+        return None
+    known = crosswalk.lookup_study(study)
+    return known.get('pmcid') if known else None
@@ -0,0 +1,187 @@
+"""
+Persistent DOI resolver cache for Science Study Scraper
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from utils.http_client import get_client
+from utils.identity import normalize_doi
+
+# How long a resolved landing page or discovered PDF URL is trusted
+RESOLVED_TTL = 30 * 86400
+
+# How long a failed resolution (or a landing page without a PDF link) is left alone
+FAILURE_TTL = 86400
+
+
+class DoiCache:
+    """SQLite table mapping DOIs to their publisher landing page and PDF URL.
+
+    Following a DOI through doi.org and the publisher's consent pages often
+    takes three to five requests. The final landing URL and any PDF URL
+    found on it are stored here with the time they were checked, so a DOI
+    resolved once (in any run, by any module) is not followed again until
+    its entry expires. Failures are stored too, with a shorter lifetime.
+    """
+
+    def __init__(self, db_path, resolved_ttl=RESOLVED_TTL, failure_ttl=FAILURE_TTL):
+        """Open (or create) the cache database.
+
+        Args:
+            db_path (str): Path of the SQLite file
+            resolved_ttl (float): Seconds a successful entry stays valid
+            failure_ttl (float): Seconds a failed entry stays valid
+        """
+        self.db_path = db_path
+        self.resolved_ttl = resolved_ttl
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dois ("
+                "doi TEXT PRIMARY KEY, "
+                "landing_url TEXT, landing_ok INTEGER, landing_checked REAL, "
+                "pdf_url TEXT, pdf_found INTEGER, pdf_checked REAL, "
+                "error TEXT)"
+            )
+
+    def _fresh(self, ok, checked, now):
+        if checked is None or ok is None:
+            return False
+        return now - checked < (self.resolved_ttl if ok else self.failure_ttl)
+
+    def lookup(self, doi):
+        """Return what is known about a DOI, leaving out expired parts.
+
+        Args:
+            doi (str): DOI (with or without a resolver prefix)
+
+        Returns:
+            dict: {'landing_url', 'landing_ok', 'pdf_url', 'pdf_found', 'error'};
+                landing_ok and pdf_found are None when unknown or expired,
+                or None if the DOI is not in the cache at all
+        """
+        doi = normalize_doi(doi)
+        if not doi:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT landing_url, landing_ok, landing_checked, pdf_url, pdf_found, pdf_checked, error "
+                "FROM dois WHERE doi = ?", (doi,)
+            ).fetchone()
+        if not row:
+            return None
+
+        now = time.time()
+        landing_url, landing_ok, landing_checked, pdf_url, pdf_found, pdf_checked, error = row
+        entry = {'landing_url': None, 'landing_ok': None, 'pdf_url': None, 'pdf_found': None, 'error': error}
+        if self._fresh(landing_ok, landing_checked, now):
+            entry['landing_ok'] = bool(landing_ok)
+            entry['landing_url'] = landing_url if landing_ok else None
+        if self._fresh(pdf_found, pdf_checked, now):
+            entry['pdf_found'] = bool(pdf_found)
+            entry['pdf_url'] = pdf_url if pdf_found else None
+        return entry
+
+    def record_landing(self, doi, url=None, error=None):
+        """Store where a DOI resolved to, or why it could not be resolved.
+
+        Args:
+            doi (str): DOI
+            url (str): Final landing page URL, or None if resolution failed
+            error (str): Failure description (e.g. "HTTP 404")
+        """
+        doi = normalize_doi(doi)
+        if not doi:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO dois (doi) VALUES (?)", (doi,))
+            self._conn.execute(
+                "UPDATE dois SET landing_url = ?, landing_ok = ?, landing_checked = ?, error = ? WHERE doi = ?",
+                (url, 1 if url else 0, time.time(), error, doi)
+            )
+
+    def record_pdf(self, doi, pdf_url=None):
+        """Store the PDF URL found for a DOI, or that none was found.
+
+        Args:
+            doi (str): DOI
+            pdf_url (str): PDF URL, or None if the landing page had no PDF link
+        """
+        doi = normalize_doi(doi)
+        if not doi:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO dois (doi) VALUES (?)", (doi,))
+            self._conn.execute(
+                "UPDATE dois SET pdf_url = ?, pdf_found = ?, pdf_checked = ? WHERE doi = ?",
+                (pdf_url, 1 if pdf_url else 0, time.time(), doi)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_doi_cache(client=None):
+    """Return the DOI cache attached to a client, or None if it has none."""
+    return getattr(get_client(client), 'doi_cache', None)
+
+
+def landing_url(doi, client=None):
+    """Return the URL to fetch for a DOI: its cached landing page, or doi.org.
+
+    Args:
+        doi (str): DOI
+        client (HttpClient): Client whose DOI cache is consulted, if it has one
+
+    Returns:
+        str: Landing page URL if the DOI was resolved before, otherwise the doi.org URL
+    """
+    cache = get_doi_cache(client)
+    entry = cache.lookup(doi) if cache else None
+    if entry and entry['landing_url']:
+        return entry['landing_url']
+    return f"https://doi.org/{doi}"
+
+
+def resolve_doi(doi, headers, client=None, session=None, timeout=20):
+    """Return the publisher landing page URL a DOI redirects to.
+
+    The redirect chain is only followed if the DOI is not in the client's
+    DOI cache; the outcome (including failures) is stored there.
+
+    Args:
+        doi (str): DOI
+        headers (dict): HTTP headers for the request
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+        session (requests.Session): Session to follow the redirects with (default: client)
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        str: Final landing page URL, or None if the DOI could not be resolved
+    """
+    cache = get_doi_cache(client)
+    entry = cache.lookup(doi) if cache else None
+    if entry and entry['landing_ok'] is not None:
+        return entry['landing_url']
+
+    response = (session or get_client(client)).get(
+        f"https://doi.org/{doi}", headers=headers, allow_redirects=True, timeout=timeout
+    )
+    response.close()
+    if response.status_code != 200:
+        if cache:
+            cache.record_landing(doi, error=f"HTTP {response.status_code}")
+        return None
+
+    if cache:
+        cache.record_landing(doi, response.url)
+    return response.url
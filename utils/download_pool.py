@@ -0,0 +1,190 @@
+"""
+Bounded-concurrency PDF download stage for Science Study Scraper
+"""
+
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+
+class DownloadHandle:
+    """Handle for a queued PDF download.
+
+    Behaves like a future: the result is the local path of the PDF (or None
+    if the download failed). When the handle was created for a study, the
+    study's ``local_pdf_path`` is filled in as soon as the download completes.
+    """
+
+    def __init__(self, url, name, study=None):
+        self.url = url
+        self.name = name
+        self.study = study
+        self._future = Future()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._finished = False
+
+    def done(self):
+        """Return True once the download has finished."""
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """Wait for the download and return the local PDF path (or None)."""
+        return self._future.result(timeout)
+
+    def add_done_callback(self, fn):
+        """Call fn(handle) once the download has finished.
+
+        Callbacks run before the handle counts as done, so once
+        DownloadPool.wait() returns every callback has completed.
+        """
+        with self._lock:
+            if not self._finished:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set_result(self, path):
+        if self.study is not None:
+            self.study['local_pdf_path'] = path
+        with self._lock:
+            self._finished = True
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"Error in download callback for {self.name}: {e}")
+        self._future.set_result(path)
+
+
+class DownloadPool:
+    """Worker pool that runs PDF downloads in the background.
+
+    At most ``max_workers`` downloads are in flight overall and at most
+    ``per_host`` against any single host. Downloads beyond the per-host cap
+    wait in a per-host queue instead of occupying a worker, so transfers
+    from other hosts keep flowing.
+    """
+
+    def __init__(self, download_func, max_workers=8, per_host=2):
+        """Initialize the download pool.
+
+        Args:
+            download_func (function): Blocking download function called as
+                download_func(url, name, overwrite) and returning a path, None, or a
+                Future for work deferred to another stage (whose result is the path)
+            max_workers (int): Maximum number of downloads in flight overall
+            per_host (int): Maximum number of downloads in flight per host
+        """
+        self.download_func = download_func
+        self.max_workers = max_workers
+        self.per_host = per_host
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._lock = threading.Lock()
+        self._active = defaultdict(int)
+        self._waiting = defaultdict(deque)
+        self._futures = []
+
+    def submit(self, url, name, overwrite=True, study=None):
+        """Queue a PDF download.
+
+        Args:
+            url (str): URL of the PDF
+            name (str): Identifier used for the filename
+            overwrite (bool): Whether to overwrite existing files
+            study (dict): Study whose local_pdf_path is filled in on completion
+
+        Returns:
+            DownloadHandle: Handle for the queued download
+        """
+        handle = DownloadHandle(url, name, study)
+        host = urlparse(url).netloc.lower()
+
+        with self._lock:
+            self._futures.append(handle._future)
+            if self._active[host] < self.per_host:
+                self._active[host] += 1
+                self._executor.submit(self._run, host, handle, overwrite)
+            else:
+                self._waiting[host].append((handle, overwrite))
+
+        return handle
+
+    def _run(self, host, handle, overwrite):
+        path = None
+        try:
+            path = self.download_func(handle.url, handle.name, overwrite)
+        except Exception as e:
+            print(f"Unexpected error in download worker for {handle.name}: {e}")
+        finally:
+            self._free_slot(host)
+            if isinstance(path, Future):
+                # Deferred (e.g. to the article-content fallback): the slot is free,
+                # the handle completes when the deferred work does
+                path.add_done_callback(lambda deferred: handle._set_result(
+                    None if deferred.cancelled() or deferred.exception() else deferred.result()
+                ))
+            else:
+                handle._set_result(path)
+
+    def _free_slot(self, host):
+        # Hand this host's slot to the next queued download, if any
+        with self._lock:
+            if self._waiting[host]:
+                next_handle, next_overwrite = self._waiting[host].popleft()
+                self._executor.submit(self._run, host, next_handle, next_overwrite)
+            else:
+                self._active[host] -= 1
+
+    def reserve(self, url, count):
+        """Take up to count of a host's free slots for extra connections of a running download.
+
+        Used for the parallel segments of a large PDF, so a download never opens
+        more connections to a host than the per-host cap leaves free.
+
+        Args:
+            url (str): URL whose host the slots are taken from
+            count (int): Number of extra slots wanted
+
+        Returns:
+            int: Number of slots taken (possibly 0); give them back with release()
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            granted = max(0, min(count, self.per_host - self._active[host]))
+            self._active[host] += granted
+        return granted
+
+    def release(self, url, count):
+        """Give back slots taken with reserve().
+
+        Args:
+            url (str): URL passed to reserve()
+            count (int): Number of slots reserve() returned
+        """
+        host = urlparse(url).netloc.lower()
+        for _ in range(count):
+            self._free_slot(host)
+
+    def pending(self):
+        """Return the number of downloads that have not finished yet."""
+        with self._lock:
+            return sum(1 for future in self._futures if not future.done())
+
+    def wait(self):
+        """Block until every queued download has finished."""
+        while True:
+            with self._lock:
+                futures = [future for future in self._futures if not future.done()]
+                if not futures:
+                    self._futures = []
+                    return
+            wait(futures)
+
+    def shutdown(self):
+        """Wait for all downloads and stop the worker threads."""
+        self.wait()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,246 @@
+"""
+Crash-safe incremental study export for Science Study Scraper
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import atexit
+import threading
+
+from utils.html_report import iter_html_report
+
+# Columns of the CSV written while a run is in progress; the final CSV has every column
+LIVE_CSV_COLUMNS = ('database', 'title', 'authors', 'journal', 'publication_date', 'doi', 'pmid',
+                    'pmc_id', 'source_url', 'pdf_link', 'local_pdf_path', 'abstract')
+
+# Studies written per batch, and the longest a study waits in memory before being written
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 2.0
+
+# Fields of a duplicate search result copied to the study it duplicates, if missing there
+ANNOTATED_IDS = ('doi', 'pmid', 'pmcid', 'pmc_id')
+
+_STOP = object()
+
+
+def _csv_value(value):
+    # Same rendering as the DataFrame.to_csv export: missing values empty, lists as their repr
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+class StudyLog:
+    """Append-only JSON Lines log of processed studies, plus a live CSV.
+
+    Studies are serialized when they are appended and written in batches by a
+    background thread, which flushes and fsyncs each batch. A crash loses the
+    studies appended in the last couple of seconds (on Ctrl-C the queue is
+    still written at exit); the rest can be exported from the log with
+    export_log(). The scraper appends a study once its PDF download has
+    finished, so studies whose download was still running are lost as well.
+    """
+
+    def __init__(self, path, csv_path=None):
+        """Open the log (and live CSV) for appending and start the writer thread.
+
+        Args:
+            path (str): Path of the JSONL log
+            csv_path (str): Path of the CSV written alongside it, if any
+        """
+        self.path = path
+        self.csv_path = csv_path
+        self.count = 0  # Studies appended so far
+        self._count_lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._log = open(path, 'a', encoding='utf-8')
+        self._csv = None
+        if csv_path:
+            new_file = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+            self._csv = open(csv_path, 'a', encoding='utf-8', newline='')
+            self._csv_writer = csv.writer(self._csv)
+            if new_file:
+                self._csv_writer.writerow(LIVE_CSV_COLUMNS)
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="export-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, study, ref=None):
+        """Queue a finished study for writing.
+
+        Args:
+            study (dict): Study data; it is serialized right away, so later changes are not logged
+            ref (int): Reference under which annotate() adds to the study later
+        """
+        record = study if ref is None else {**study, '_ref': ref}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        row = [_csv_value(study.get(column)) for column in LIVE_CSV_COLUMNS] if self._csv else None
+        with self._count_lock:
+            self.count += 1
+        self._queue.put((line, row))
+
+    def annotate(self, ref, database, ids=None):
+        """Queue a note that another database also found a study.
+
+        The note is a line of its own, so it can be written whether or not the
+        study itself is in the log yet; export_log() merges it into the study
+        as 'also_found_in', plus any identifiers the study lacks.
+
+        Args:
+            ref (int): Reference the study was (or will be) appended with
+            database (str): Database whose search result duplicated the study
+            ids (dict): Identifiers of that search result ('doi', 'pmid', ...)
+        """
+        note = {'_also_found': ref, 'database': database}
+        note.update({field: value for field, value in (ids or {}).items() if field in ANNOTATED_IDS and value})
+        self._queue.put((json.dumps(note, ensure_ascii=False, default=str), None))
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            try:
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= BATCH_SIZE:
+                        break
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self._log.write(''.join(f"{line}\n" for line, _ in batch))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            if self._csv:
+                self._csv_writer.writerows(row for _, row in batch if row is not None)
+                self._csv.flush()
+        except OSError as e:
+            print(f"Error writing {len(batch)} studies to the export log: {e}")
+
+    def close(self):
+        """Write everything still queued and close the files."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._log.close()
+        if self._csv:
+            self._csv.close()
+
+
+def iter_log(path):
+    """Yield the studies in an export log, skipping a line cut off by a crash.
+
+    Args:
+        path (str): Path of the JSONL log
+
+    Yields:
+        dict: Study data
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable line {number} of {path}")
+
+
+def _merge_notes(study, notes):
+    """Apply the also-found notes of a logged study and drop its log reference."""
+    ref = study.pop('_ref', None)
+    for note in notes.get(ref, ()):
+        found_in = study.setdefault('also_found_in', [])
+        if note['database'] not in found_in:
+            found_in.append(note['database'])
+        for field in ANNOTATED_IDS:
+            if note.get(field) and not study.get(field):
+                study[field] = note[field]
+    return study
+
+
+def export_log(path, csv_path, json_path, html_path):
+    """Write the CSV, JSON and HTML exports of an export log.
+
+    The log is read twice: once for the column names, per-database counts
+    and the notes of studies also found in other databases, then once more
+    while the three files are written side by side. Only one study (and the
+    notes) is held in memory at a time. Each file is written under a
+    temporary name and moved into place when complete.
+
+    Args:
+        path (str): Path of the JSONL log
+        csv_path (str): Path of the CSV export
+        json_path (str): Path of the JSON export
+        html_path (str): Path of the HTML report
+
+    Returns:
+        int: Number of studies exported
+    """
+    notes = {}
+    columns = {}
+    db_counts = {}
+    total = 0
+    for study in iter_log(path):
+        if '_also_found' in study:
+            notes.setdefault(study.pop('_also_found'), []).append(study)
+            continue
+        study.pop('_ref', None)
+        total += 1
+        columns.update(dict.fromkeys(study))
+        db = study.get('database', 'Unknown')
+        db_counts[db] = db_counts.get(db, 0) + 1
+    if notes:
+        columns['also_found_in'] = None
+        columns.update(dict.fromkeys(field for field in ANNOTATED_IDS
+                                     if any(field in note for found in notes.values() for note in found)))
+    columns = list(columns)
+
+    tmp_paths = [f"{target}.{os.getpid()}.tmp" for target in (csv_path, json_path, html_path)]
+    with open(tmp_paths[0], 'w', encoding='utf-8', newline='') as csv_file, \
+            open(tmp_paths[1], 'w', encoding='utf-8') as json_file, \
+            open(tmp_paths[2], 'w', encoding='utf-8') as html_file:
+        writer = csv.writer(csv_file)
+        if columns:
+            writer.writerow(columns)
+
+        def studies():
+            # Written in the layout json.dump(studies, f, indent=4) produces
+            json_file.write('[')
+            index = 0
+            for study in iter_log(path):
+                if '_also_found' in study:
+                    continue
+                study = _merge_notes(study, notes)
+                writer.writerow([_csv_value(study.get(column)) for column in columns])
+                item = json.dumps(study, ensure_ascii=False, indent=4, default=str)
+                json_file.write(('\n' if index == 0 else ',\n') + '    ' + item.replace('\n', '\n    '))
+                index += 1
+                yield study
+            json_file.write('\n]' if total else ']')
+
+        for part in iter_html_report(studies(), db_counts, total):
+            html_file.write(part)
+
+    for tmp, target in zip(tmp_paths, (csv_path, json_path, html_path)):
+        os.replace(tmp, target)
+    return total
@@ -0,0 +1,131 @@
+"""
+Deferred stage that builds PDFs from article pages when a download fails
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class FallbackQueue:
+    """Worker pool for the article-content fallback of failed PDF downloads.
+
+    Scraping article pages and rendering them with ReportLab takes seconds
+    per study. Running it inside a download worker held that worker (and its
+    per-host slot) the whole time; instead, failed downloads are queued here
+    and handled by a separate, smaller pool while other downloads continue.
+    Each job fetches its candidate article pages at the same time through
+    race().
+    """
+
+    def __init__(self, fallback_func, max_workers=2, sources_per_job=3):
+        """Initialize the fallback queue.
+
+        Args:
+            fallback_func (function): Blocking function called as fallback_func(name)
+                and returning a path or None
+            max_workers (int): Maximum number of fallback jobs running at once
+            sources_per_job (int): Maximum number of article pages fetched at once per job
+        """
+        self.fallback_func = fallback_func
+        self.max_workers = max_workers
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fallback")
+        self._source_executor = ThreadPoolExecutor(
+            max_workers=max_workers * sources_per_job, thread_name_prefix="fallback-source"
+        )
+        self._lock = threading.Lock()
+        self._futures = []
+
+    def submit(self, name):
+        """Queue the fallback for a study whose PDF could not be downloaded.
+
+        Args:
+            name (str): Identifier used for the filename
+
+        Returns:
+            Future: Future whose result is the path to the generated PDF or None
+        """
+        print(f"Queued article-content fallback for {name}")
+        future = self._executor.submit(self._run, name)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def _run(self, name):
+        try:
+            return self.fallback_func(name)
+        except Exception as e:
+            print(f"Unexpected error in fallback worker for {name}: {e}")
+            return None
+
+    def race(self, candidates, fetch, enough):
+        """Fetch several candidate sources at once and return the best result.
+
+        Candidates are ranked by their given order. The result of the first
+        candidate that is ``enough`` is returned as soon as every candidate
+        ranked above it has failed; sources still running are ignored. If no
+        result is enough, the first non-empty one is returned.
+
+        Args:
+            candidates (list): Source arguments in order of preference (None entries are skipped)
+            fetch (function): Called as fetch(candidate); returns a result or None
+            enough (function): Called as enough(result); True if no better source is needed
+
+        Returns:
+            object: Best result, or None if every source came back empty
+        """
+        candidates = [candidate for candidate in candidates if candidate]
+        if not candidates:
+            return None
+
+        def attempt(candidate):
+            try:
+                return fetch(candidate)
+            except Exception as e:
+                print(f"Fallback source {candidate} failed: {e}")
+                return None
+
+        futures = [self._source_executor.submit(attempt, candidate) for candidate in candidates]
+        results = [None] * len(futures)
+        finished = [False] * len(futures)
+        running = set(futures)
+        try:
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.index(future)
+                    results[index] = future.result()
+                    finished[index] = True
+
+                # The best possible answer is known once every higher-ranked source has failed
+                for index, result in enumerate(results):
+                    if not finished[index]:
+                        break
+                    if result and enough(result):
+                        return result
+        finally:
+            for future in running:
+                future.cancel()
+
+        return next((result for result in results if result), None)
+
+    def pending(self):
+        """Return the number of fallback jobs that have not finished yet."""
+        with self._lock:
+            return sum(1 for future in self._futures if not future.done())
+
+    def wait(self):
+        """Block until every queued fallback job has finished."""
+        while True:
+            with self._lock:
+                futures = [future for future in self._futures if not future.done()]
+                if not futures:
+                    self._futures = []
+                    return
+            wait(futures)
+
+    def shutdown(self):
+        """Wait for all fallback jobs and stop the worker threads."""
+        self.wait()
+        self._executor.shutdown(wait=True)
+        self._source_executor.shutdown(wait=True)
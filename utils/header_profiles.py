@@ -0,0 +1,89 @@
+"""
+Per-host memory of the request header profile that gets PDFs through
+"""
+
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+from utils.json_state import write_json
+
+# Successful downloads with a remembered profile before the default order is tried again
+REPROBE_EVERY = 50
+
+# Age after which a remembered profile is re-probed regardless of use
+REPROBE_AGE = 7 * 86400
+
+
+class HeaderProfiles:
+    """Remembers which header profile worked for each host.
+
+    download_pdf has several header profiles (plain, Accept: application/pdf,
+    Accept: */*, full browser headers with Referer). Hosts that reject the
+    first profiles used to cost up to three failed GETs per PDF; with this
+    table the profile that worked last time is tried first. Every
+    REPROBE_EVERY uses, or after REPROBE_AGE, the default order is tried
+    again so a host that has started accepting the plain profile is noticed.
+    Stored as JSON in ``<output>/.cache/header_profiles.json``.
+    """
+
+    def __init__(self, path):
+        """Load the profile file if it exists.
+
+        Args:
+            path (str): Path of the JSON file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.hosts = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.hosts = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read header profiles, starting over: {e}")
+
+    def order(self, url, names):
+        """Return the profile names in the order to try them for a URL.
+
+        Args:
+            url (str): URL about to be requested
+            names (list): Profile names in the default order
+
+        Returns:
+            list: The remembered profile first, unless it is due for a re-probe
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            entry = self.hosts.get(host)
+        if not entry or entry['profile'] not in names:
+            return list(names)
+        if entry['uses'] >= REPROBE_EVERY or time.time() - entry['probed'] > REPROBE_AGE:
+            return list(names)
+        return [entry['profile']] + [name for name in names if name != entry['profile']]
+
+    def record(self, url, name):
+        """Remember the profile that got a response for a URL.
+
+        Args:
+            url (str): URL that was requested
+            name (str): Profile that worked
+        """
+        host = urlparse(url).netloc.lower()
+        now = time.time()
+        with self._lock:
+            entry = self.hosts.get(host)
+            if entry and entry['profile'] == name and entry['uses'] < REPROBE_EVERY \
+                    and now - entry['probed'] <= REPROBE_AGE:
+                entry['uses'] += 1
+            else:
+                # A new host, a different profile, or a re-probe that confirmed the profile
+                self.hosts[host] = {'profile': name, 'uses': 1, 'probed': now}
+
+    def save(self):
+        """Write the profile file."""
+        with self._lock:
+            data = json.dumps(self.hosts)
+        write_json(self.path, data)
@@ -0,0 +1,81 @@
+"""
+HTML parsing backend for Science Study Scraper
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+# Tree builders in order of preference: lxml (C, optional) is several times
+# faster than the pure-Python html.parser that ships with Python
+PARSERS = ('lxml', 'html.parser')
+
+_parser = None
+
+
+def available_parsers():
+    """Return the supported tree builders that are installed, fastest first."""
+    return [name for name in PARSERS if builder_registry.lookup(name) is not None]
+
+
+def set_parser(name=None):
+    """Select the tree builder used by parse_html.
+
+    Args:
+        name (str): 'lxml' or 'html.parser', or None for the fastest installed one
+
+    Raises:
+        ValueError: If the parser is unknown or not installed
+    """
+    global _parser
+    if name is not None and name not in available_parsers():
+        raise ValueError(f"HTML parser {name!r} is not available (installed: {', '.join(available_parsers())})")
+    _parser = name
+
+
+def get_parser():
+    """Return the name of the tree builder parse_html uses."""
+    return _parser or available_parsers()[0]
+
+
+def _has_class(names):
+    # The strainer sees the raw class attribute ("gs_r gs_or gs_scl") on current
+    # bs4 versions and single class values on older ones; both are split here
+    def match(value):
+        if not value:
+            return False
+        values = value.split() if isinstance(value, str) else value
+        return any(name in values for name in names)
+    return match
+
+
+def parse_html(markup, only=None):
+    """Parse an HTML page, optionally keeping only the parts that are needed.
+
+    Search result pages only need their result blocks and landing pages often
+    only their links; building the rest of the tree is most of the parsing
+    cost. With ``only``, elements that do not match are skipped while parsing
+    (matching elements keep their whole subtree), so selectors that work on
+    the full page keep working on the result as long as they stay inside the
+    kept elements.
+
+    Args:
+        markup (str or bytes): HTML page
+        only: Parts to keep: a tag name or list of tag names (e.g. ['a', 'meta']),
+            or a dict of SoupStrainer arguments (e.g. {'class_': 'docsum-content'}, where
+            class_ matches a CSS class as a selector would, or any of a list of classes);
+            None parses the whole page
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    parse_only = None
+    if isinstance(only, dict):
+        only = dict(only)
+        if isinstance(only.get('class_'), str):
+            only['class_'] = _has_class([only['class_']])
+        elif isinstance(only.get('class_'), (list, tuple)):
+            only['class_'] = _has_class(only['class_'])
+        parse_only = SoupStrainer(**only)
+    elif only is not None:
+        parse_only = SoupStrainer(only)
+    return BeautifulSoup(markup, get_parser(), parse_only=parse_only)
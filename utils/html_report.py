@@ -28,7 +28,25 @@ def generate_html_report(studies_data):
         if len(words) >= 2:
             query_topic = ' '.join(words[:2])
     
-    html = """
+    return ''.join(iter_html_report(studies_data, db_counts, len(studies_data)))
+
+
+def iter_html_report(studies, db_counts, total):
+    """Generate the HTML report piece by piece.
+    
+    Lets a report over more studies than fit in memory be written while
+    streaming them (e.g. from the export log): only the per-database counts
+    have to be known up front.
+    
+    Args:
+        studies (iterable): Study data dictionaries, read once
+        db_counts (dict): Number of studies per database name, in display order
+        total (int): Total number of studies
+    
+    Yields:
+        str: Consecutive parts of the HTML report
+    """
+    yield """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -76,7 +94,7 @@ def generate_html_report(studies_data):
             <div class="header">
                 <h1>Science Study Scraper Report</h1>
                 <p>Generated on: """ + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + """</p>
-                <p>Total studies found: """ + str(len(studies_data)) + """</p>
+                <p>Total studies found: """ + str(total) + """</p>
             </div>
             
             <div class="summary">
@@ -86,14 +104,14 @@ def generate_html_report(studies_data):
     
     # Add summary boxes for each database
     for db, count in db_counts.items():
-        html += f"""
+        yield f"""
                     <div class="summary-item">
                         <div class="database-label">{db}</div>
                         <div class="count-label">{count} studies</div>
                     </div>
         """
     
-    html += """
+    yield """
                 </div>
             </div>
             
@@ -108,17 +126,17 @@ def generate_html_report(studies_data):
     # Add filter buttons for each database
     for db in db_counts.keys():
         db_class = db.lower().replace(' ', '')
-        html += f"""
+        yield f"""
                 <button class="filter-button" data-filter="{db_class}">{db}</button>
         """
     
-    html += """
+    yield """
             </div>
             
             <div id="studies-container">
     """
     
-    for study in studies_data:
+    for study in studies:
         # Get database and create CSS class
         db = study.get('database', 'Unknown')
         db_class = db.lower().replace(' ', '')
@@ -143,10 +161,11 @@ def generate_html_report(studies_data):
         # Create local PDF link
         pdf_link = ''
         if study.get('local_pdf_path'):
-            filename = os.path.basename(study['local_pdf_path'])
+            # Path relative to the pdfs directory (PDFs may live in its content-addressed store)
+            filename = study['local_pdf_path'].split(os.sep + 'pdfs' + os.sep, 1)[-1].replace(os.sep, '/')
             pdf_link = f'<a href="pdfs/{filename}" target="_blank">Download PDF</a>'
         
-        html += f"""
+        yield f"""
             <div class="study" data-source="{db_class}">
                 <div class="study-title">
                     <span class="database-tag tag-{db_class}">{db}</span>
@@ -170,7 +189,7 @@ def generate_html_report(studies_data):
             </div>
         """
     
-    html += """
+    yield """
             <div class="no-results" style="display: none;">
                 No studies found matching the selected filter or search term.
             </div>
@@ -231,5 +250,3 @@ def generate_html_report(studies_data):
     </body>
     </html>
     """
-    
-    return html
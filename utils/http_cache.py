@@ -0,0 +1,314 @@
+"""
+Persistent HTTP response cache for Science Study Scraper
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.json_state import write_json
+
+# Request headers that change the representation a server sends back
+KEY_HEADERS = ('Accept', 'Accept-Language')
+
+# Response headers that describe the transfer rather than the stored body
+SKIP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')
+
+
+def _parse_cache_control(value):
+    """Parse a Cache-Control header into a {directive: value} dict."""
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') or True
+    return directives
+
+
+def _parse_http_date(value):
+    """Parse an HTTP date header into a Unix timestamp, or None."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class HttpCache:
+    """On-disk cache of GET responses with conditional revalidation.
+
+    Entries are keyed by method, URL and the request headers that affect the
+    response (Accept, Accept-Language). Freshness follows Cache-Control and
+    Expires. Responses that only carry Last-Modified get a heuristic lifetime
+    (capped at ``default_ttl``) unless their URL has a query string, since
+    search and API results change between runs and some (E-utilities
+    WebEnv) are only valid for one session. Responses without any of these
+    headers are not stored. Stale entries that carry an ETag or Last-Modified
+    are revalidated with a conditional request, so an unchanged page costs a
+    304 instead of a full transfer.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, max_age=30 * 86400, default_ttl=86400):
+        """Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory holding the cache entries
+            max_bytes (int): Total size of cached bodies kept after pruning
+            max_age (int): Entries older than this many seconds are evicted when pruning
+            default_ttl (int): Longest heuristic freshness lifetime in seconds for responses with only Last-Modified
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, method, url, headers):
+        """Return the cache key for a request.
+
+        Args:
+            method (str): HTTP method
+            url (str): Full request URL, including the query string
+            headers (dict): Request headers
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        headers = CaseInsensitiveDict(headers or {})
+        parts = [method.upper(), url] + [headers.get(name, '') for name in KEY_HEADERS]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def lookup(self, key):
+        """Return the cached entry for a key, or None.
+
+        Args:
+            key (str): Cache key from key()
+
+        Returns:
+            dict: Entry metadata (with the body path under 'body_path') or None
+        """
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not os.path.exists(body_path):
+            return None
+
+        entry['key'] = key
+        entry['body_path'] = body_path
+        return entry
+
+    def is_fresh(self, entry):
+        """Return True if the entry can be served without contacting the server."""
+        return entry.get('expires', 0) > time.time()
+
+    def validators(self, entry):
+        """Return conditional request headers for revalidating an entry.
+
+        Args:
+            entry (dict): Cached entry
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (empty if the entry has no validators)
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _expires(self, url, response_headers, now):
+        """Compute when a response stops being fresh, or None if it must not be stored."""
+        cache_control = _parse_cache_control(response_headers.get('Cache-Control'))
+        if 'no-store' in cache_control:
+            return None
+        if 'no-cache' in cache_control:
+            return now
+
+        max_age = cache_control.get('max-age')
+        if max_age not in (None, True):
+            try:
+                return now + max(0, int(max_age))
+            except ValueError:
+                pass
+
+        expires = _parse_http_date(response_headers.get('Expires'))
+        if expires is not None:
+            return expires
+
+        # Heuristic freshness: 10% of the time since the last modification,
+        # capped at the default TTL (RFC 9111 section 4.2.2). Query URLs are
+        # search and API results, which get no heuristic lifetime
+        last_modified = _parse_http_date(response_headers.get('Last-Modified'))
+        if last_modified is not None and not urlparse(url or '').query:
+            return now + min(self.default_ttl, max(0, (now - last_modified) / 10))
+
+        # Without explicit freshness the response can only be kept if it can be revalidated
+        if response_headers.get('ETag') or last_modified is not None:
+            return now
+        return None
+
+    def store(self, key, response):
+        """Store a response body and its metadata.
+
+        Args:
+            key (str): Cache key from key()
+            response (requests.Response): Fully read response with status 200
+
+        Returns:
+            bool: True if the response was stored
+        """
+        if response.status_code != 200:
+            return False
+
+        now = time.time()
+        expires = self._expires(response.url, response.headers, now)
+        if expires is None:
+            return False
+
+        entry = {
+            'url': response.url,
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in SKIP_HEADERS
+            },
+            'encoding': response.encoding,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored': now,
+            'expires': expires,
+            'size': len(response.content),
+        }
+
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        # Write the body first and the metadata last, each atomically, so a
+        # crash never leaves metadata pointing at a partial body
+        with open(body_path + suffix, 'wb') as f:
+            f.write(response.content)
+        os.replace(body_path + suffix, body_path)
+        write_json(meta_path, entry)
+        return True
+
+    def refresh(self, entry, response):
+        """Update an entry's freshness after a 304 Not Modified response.
+
+        Args:
+            entry (dict): Cached entry that was revalidated
+            response (requests.Response): The 304 response
+        """
+        now = time.time()
+        headers = CaseInsensitiveDict(entry.get('headers', {}))
+        for name, value in response.headers.items():
+            if name.lower() not in SKIP_HEADERS:
+                headers[name] = value
+
+        expires = self._expires(entry.get('url'), headers, now)
+        entry['headers'] = dict(headers)
+        entry['etag'] = headers.get('ETag')
+        entry['last_modified'] = headers.get('Last-Modified')
+        entry['stored'] = now
+        entry['expires'] = now if expires is None else expires
+
+        meta_path, _ = self._paths(entry['key'])
+        write_json(meta_path, {name: value for name, value in entry.items() if name not in ('key', 'body_path')})
+
+    def build_response(self, entry, request=None):
+        """Rebuild a requests.Response from a cached entry.
+
+        Args:
+            entry (dict): Cached entry
+            request (requests.PreparedRequest): Request the response answers, if known
+
+        Returns:
+            requests.Response: Response served from the cache (response.from_cache is True)
+        """
+        with open(entry['body_path'], 'rb') as f:
+            body = f.read()
+
+        # Touch the body so pruning evicts the least recently used entries first
+        try:
+            os.utime(entry['body_path'])
+        except OSError:
+            pass
+
+        response = requests.Response()
+        response.status_code = entry.get('status_code', 200)
+        response.reason = entry.get('reason') or 'OK'
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = entry.get('encoding')
+        response.url = entry.get('url')
+        response.request = request
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def prune(self):
+        """Evict expired entries and the least recently used ones above the size limit.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            now = time.time()
+            entries = []
+            removed = 0
+
+            for root, _dirs, files in os.walk(self.cache_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.endswith('.tmp'):
+                        # Leftover from an interrupted write
+                        try:
+                            if now - os.path.getmtime(path) > 3600:
+                                os.remove(path)
+                        except OSError:
+                            pass
+                        continue
+                    if not name.endswith('.body'):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _mtime, size, _path in entries)
+            entries.sort()
+
+            for mtime, size, path in entries:
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    continue
+                for stale in (path, path[:-len('.body')] + '.json'):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+
+            return removed
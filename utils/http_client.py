@@ -0,0 +1,319 @@
+"""
+Shared HTTP client for Science Study Scraper
+"""
+
+import time
+import threading
+import requests
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from utils.metrics import current_stage
+
+# Hosts we talk to for nearly every study get larger keep-alive pools
+DEFAULT_HOST_POOL_SIZES = {
+    'pubmed.ncbi.nlm.nih.gov': 20,
+    'www.ncbi.nlm.nih.gov': 20,
+    'eutils.ncbi.nlm.nih.gov': 20,
+    'europepmc.org': 20,
+    'www.ebi.ac.uk': 20,
+    'doi.org': 20,
+}
+
+_cancel_context = threading.local()
+
+
+class RequestCancelled(requests.exceptions.RequestException):
+    """Raised instead of sending a request whose result is no longer wanted."""
+
+
+@contextmanager
+def cancel_on(event):
+    """Make requests of the current thread fail fast once an event is set.
+
+    Requests started inside the block after `event` is set (including the
+    redirect hops and retries of a request already under way) raise
+    RequestCancelled instead of waiting for a rate limiter slot and the
+    server. Code that handles request errors then gives up quickly.
+
+    Args:
+        event (threading.Event): Set when the work is abandoned
+    """
+    previous = getattr(_cancel_context, 'event', None)
+    _cancel_context.event = event
+    try:
+        yield
+    finally:
+        _cancel_context.event = previous
+
+
+def _check_cancelled(url):
+    event = getattr(_cancel_context, 'event', None)
+    if event is not None and event.is_set():
+        raise RequestCancelled(f"Request to {url} cancelled")
+
+
+class _ClientAdapter(HTTPAdapter):
+    """HTTPAdapter that paces every request (including each redirect hop)
+    through the client's rate limiter."""
+
+    def __init__(self, client, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        _check_cancelled(request.url)
+        rate_limiter = self.client.rate_limiter
+        if rate_limiter is None:
+            return super().send(request, **kwargs)
+
+        rate_limiter.acquire(request.url)
+        _check_cancelled(request.url)
+        start = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.exceptions.RequestException:
+            rate_limiter.record(request.url, latency=time.monotonic() - start, error=True)
+            raise
+
+        rate_limiter.record(
+            request.url,
+            status_code=response.status_code,
+            latency=time.monotonic() - start,
+            retry_after=response.headers.get('Retry-After')
+        )
+        return response
+
+
+class _ClientSession(requests.Session):
+    """Session bound to an HttpClient.
+
+    IMPORTANT: ONLY GET REQUESTS ARE SENT. HEAD requests are converted to GET,
+    since several publishers answer HEAD with errors or bot checks.
+
+    When the client has a response cache, non-streamed GET requests are served
+    from it while fresh and revalidated with conditional requests once stale.
+
+    When the client has request metrics, every request is recorded with its
+    stage, status, bytes, timings, retries and cache outcome; streamed
+    responses are recorded once their body was read or they are closed.
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def request(self, method, url, **kwargs):
+        _check_cancelled(url)
+        if method.upper() == 'HEAD':
+            print(f"HEAD request to {url} intercepted and converted to GET")
+            method = 'GET'
+            if 'allow_redirects' not in kwargs:
+                kwargs['allow_redirects'] = True
+        
+        metrics = self.client.metrics
+        if metrics is None:
+            return self._request(method, url, **kwargs)[0]
+        
+        stage_name = current_stage()
+        start = time.monotonic()
+        try:
+            response, cache_result = self._request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            metrics.record(url, stage_name, status=type(e).__name__, total=time.monotonic() - start)
+            raise
+        
+        hops = list(response.history) + [response]
+        # Cached responses carry no timing of their own
+        ttfb = sum(hop.elapsed.total_seconds() for hop in hops) if cache_result != 'hit' else None
+        retries = sum(len(getattr(getattr(hop.raw, 'retries', None), 'history', None) or ()) for hop in hops)
+        
+        def record(nbytes):
+            metrics.record(url, stage_name, status=response.status_code, nbytes=nbytes, ttfb=ttfb,
+                           total=time.monotonic() - start, retries=retries, cache=cache_result)
+        
+        if not kwargs.get('stream'):
+            record(len(response.content) if cache_result in ('miss', 'none') else 0)
+            return response
+        
+        # Streamed bodies are read by the caller; record them once the body has been
+        # read to the end or the response is closed, whichever comes first
+        close = response.close
+        iter_content = response.iter_content
+        recorded = []
+        
+        def finish():
+            if not recorded:
+                recorded.append(True)
+                try:
+                    nbytes = response.raw.tell()
+                except Exception:
+                    nbytes = 0
+                record(nbytes)
+        
+        def iter_content_and_record(*args, **kwargs):
+            yield from iter_content(*args, **kwargs)
+            finish()
+        
+        def close_and_record():
+            finish()
+            close()
+        
+        response.iter_content = iter_content_and_record
+        response.close = close_and_record
+        return response
+
+    def _request(self, method, url, **kwargs):
+        """Send a request, through the response cache when it applies.
+
+        Returns:
+            tuple: (response, cache outcome: 'hit', 'revalidated', 'miss' or 'none')
+        """
+        cache = self.client.cache
+        if cache is None or method.upper() != 'GET' or kwargs.get('stream'):
+            return super().request(method, url, **kwargs), 'none'
+        return self._cached_request(cache, method, url, **kwargs)
+
+    def _cached_request(self, cache, method, url, **kwargs):
+        headers = CaseInsensitiveDict(self.headers)
+        headers.update(kwargs.get('headers') or {})
+        full_url = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+        key = cache.key(method, full_url, headers)
+
+        # A request asking for no-cache may still be answered with a 304
+        request_cache_control = headers.get('Cache-Control', '') + headers.get('Pragma', '')
+        entry = cache.lookup(key)
+        if entry and 'no-cache' not in request_cache_control and cache.is_fresh(entry):
+            return cache.build_response(entry), 'hit'
+
+        if entry:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **cache.validators(entry)}
+
+        response = super().request(method, url, **kwargs)
+
+        if entry and response.status_code == 304:
+            cache.refresh(entry, response)
+            cached = cache.build_response(entry, response.request)
+            cached.elapsed = response.elapsed
+            return cached, 'revalidated'
+
+        try:
+            cache.store(key, response)
+        except OSError as e:
+            print(f"Could not write HTTP cache entry for {full_url}: {e}")
+        return response, 'miss'
+
+    def close(self):
+        # The adapters are shared by every session of the client, so closing
+        # one session must not drop the pooled connections of the others
+        pass
+
+
+class HttpClient:
+    """Registry of pooled HTTP connections shared by all database modules.
+
+    All sessions created by the client share the same connection pools, so
+    TCP/TLS connections to a host are kept alive and reused across studies,
+    databases and sessions. Every request gets the same retry policy, is
+    paced by the optional per-host rate limiter and, for plain (non-streamed)
+    GETs, goes through the optional persistent response cache.
+    """
+
+    def __init__(self, rate_limiter=None, pool_connections=100, pool_maxsize=10,
+                 host_pool_sizes=None, retries=None, cache=None, metrics=None):
+        """Initialize the HTTP client.
+
+        Args:
+            rate_limiter (HostRateLimiter): Optional per-host rate limiter
+            pool_connections (int): Number of per-host pools kept open at once
+            pool_maxsize (int): Keep-alive connections kept per host by default
+            host_pool_sizes (dict): Optional {host: pool size} overrides
+            retries (Retry): Retry policy (default: 3 retries on 429/5xx for GET only)
+            cache (HttpCache): Optional persistent response cache
+            metrics (RequestMetrics): Optional per-request metrics
+        """
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics
+        self.retries = retries or Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504, 429],
+            allowed_methods=["GET"]  # ONLY GET, NO HEAD
+        )
+
+        self._adapter = _ClientAdapter(
+            self,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=self.retries
+        )
+
+        host_pool_sizes = DEFAULT_HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes
+        self._host_adapters = {}
+        for host, size in host_pool_sizes.items():
+            self._host_adapters[host] = _ClientAdapter(
+                self,
+                pool_connections=1,
+                pool_maxsize=size,
+                max_retries=self.retries
+            )
+
+        self.session = self.new_session()
+
+    def new_session(self):
+        """Create a session with its own cookies that shares the client's connection pools.
+
+        Returns:
+            requests.Session: Session bound to this client
+        """
+        session = _ClientSession(self)
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        for host, adapter in self._host_adapters.items():
+            session.mount(f'http://{host}/', adapter)
+            session.mount(f'https://{host}/', adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        """Send a GET request through the shared session.
+
+        Args:
+            url (str): URL to request
+            **kwargs: Keyword arguments passed to requests.Session.get
+
+        Returns:
+            requests.Response: The response
+        """
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        self._adapter.close()
+        for adapter in self._host_adapters.values():
+            adapter.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client(client=None):
+    """Return the given client, or a process-wide default client if None.
+
+    Args:
+        client (HttpClient): Client passed in by the caller, if any
+
+    Returns:
+        HttpClient: Client to use for requests
+    """
+    global _default_client
+    if client is not None:
+        return client
+
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,280 @@
+"""
+Cross-source study identity resolution for Science Study Scraper
+"""
+
+import re
+import threading
+
+# Kind of identifier carried by databases whose search returns bare ID strings
+SEARCH_ID_KINDS = {
+    'pubmed': 'pmid',
+    'pmc': 'pmcid',
+}
+
+
+def normalize_doi(value):
+    """Return a DOI in lower case without resolver prefixes, or None."""
+    if not value or not isinstance(value, str):
+        return None
+    doi = value.strip().lower()
+    doi = re.sub(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', '', doi)
+    return doi if doi.startswith('10.') and '/' in doi else None
+
+
+def normalize_pmid(value):
+    """Return a PMID as a plain digit string, or None."""
+    if value is None:
+        return None
+    digits = ''.join(filter(str.isdigit, str(value)))
+    return digits.lstrip('0') or None
+
+
+def normalize_pmcid(value):
+    """Return a PMC ID in the form PMC<digits>, or None."""
+    if value is None:
+        return None
+    match = re.search(r'(?:PMC)?(\d+)', str(value).strip(), re.IGNORECASE)
+    return f"PMC{match.group(1).lstrip('0')}" if match and match.group(1).strip('0') else None
+
+
+def study_identifiers(study, db_name=None):
+    """Return the normalized identifiers of a search result or processed study.
+
+    Both the 'pmc_id' key (PubMed, PMC) and the 'pmcid' key (Europe PMC) are
+    read, so the same PMC article is recognized whichever module produced it.
+
+    Args:
+        study (dict or str): Study dictionary, or a bare ID string as returned
+            by the PubMed and PMC searches
+        db_name (str): Database the result came from (needed for bare IDs)
+
+    Returns:
+        list: Identifier keys such as 'doi:10.1000/xyz', 'pmid:123', 'pmcid:PMC456'
+    """
+    if isinstance(study, str):
+        kind = SEARCH_ID_KINDS.get(db_name)
+        study = {kind: study} if kind else {}
+
+    if not isinstance(study, dict):
+        return []
+
+    keys = []
+    doi = normalize_doi(study.get('doi'))
+    if doi:
+        keys.append(f"doi:{doi}")
+    pmid = normalize_pmid(study.get('pmid'))
+    if pmid:
+        keys.append(f"pmid:{pmid}")
+    for field in ('pmcid', 'pmc_id'):
+        pmcid = normalize_pmcid(study.get(field))
+        if pmcid and f"pmcid:{pmcid}" not in keys:
+            keys.append(f"pmcid:{pmcid}")
+    return keys
+
+
+class IdentityIndex:
+    """Union-find over DOI, PMID and PMCID identifiers.
+
+    Every identifier of a study is joined into one set, so a paper seen as a
+    PMID in PubMed, as a PMCID in PMC and as a DOI in DOAJ ends up as a single
+    set as soon as any result links two of those identifiers. Each set is
+    owned by the first processed study registered for it, kept as a short
+    reference (its number in the export log) rather than the study itself,
+    so the index holds identifiers only.
+
+    Search results only claim their set provisionally. The claim becomes
+    final once the processed study is added; claims of results that were
+    never processed (declined, cut by test mode, details not found) are
+    dropped by release(), so the paper can still come from another database.
+    """
+
+    def __init__(self):
+        self._parent = {}
+        self._owner = {}
+        self._provisional = set()
+        self._lock = threading.Lock()
+
+    def _find(self, key):
+        parent = self._parent.setdefault(key, key)
+        while parent != key:
+            # Path halving keeps the trees flat
+            self._parent[key] = self._parent[parent]
+            key, parent = parent, self._parent[parent]
+        return key
+
+    def _union(self, keys):
+        roots = {self._find(key) for key in keys}
+        owners = [self._owner[root] for root in roots if root in self._owner]
+        provisional = any(root in self._provisional for root in roots)
+        root = roots.pop()
+        for other in roots:
+            self._parent[other] = root
+            self._owner.pop(other, None)
+            self._provisional.discard(other)
+        return root, owners, provisional
+
+    def lookup(self, keys):
+        """Return the reference of the processed study owning any of the given identifiers, or None."""
+        with self._lock:
+            for key in keys:
+                if key in self._parent:
+                    owner = self._owner.get(self._find(key))
+                    if owner is not None:
+                        return owner
+        return None
+
+    def claim(self, keys):
+        """Provisionally register a search result unless one of its identifiers is already known.
+
+        Args:
+            keys (list): Identifiers from study_identifiers()
+
+        Returns:
+            bool: True if the result was registered as new, False if it duplicates
+                a processed study or another result of this run
+        """
+        if not keys:
+            return True
+
+        with self._lock:
+            root, owners, provisional = self._union(keys)
+            if owners:
+                self._owner[root] = owners[0]
+                self._provisional.discard(root)
+                return False
+            self._provisional.add(root)
+            return not provisional
+
+    def add(self, keys, ref):
+        """Join all identifiers of a processed study and make it the final owner of their set.
+
+        Called with the full identifiers of a processed study, which often
+        knows more (e.g. the DOI of a PubMed article) than its search result.
+
+        Args:
+            keys (list): Identifiers from study_identifiers()
+            ref (int): Reference to the processed study (its number in the export log)
+        """
+        if not keys:
+            return
+
+        with self._lock:
+            root, owners, _ = self._union(keys)
+            # A processed study replaces provisional claims (its own search result),
+            # but never takes over a set already owned by a different processed study
+            self._owner[root] = owners[0] if owners else ref
+            self._provisional.discard(root)
+
+    def release(self):
+        """Drop the provisional claims of search results that were not processed.
+
+        Returns:
+            int: Number of claims dropped
+        """
+        with self._lock:
+            released = len(self._provisional)
+            self._provisional = set()
+            return released
+
+
+class StudyRegistry:
+    """Constant-time lookup of studies by any of their IDs or file names.
+
+    The article-content fallback only knows the name a PDF was queued under
+    (e.g. 'pubmed_123', 'europmc_PPR456', 'biorxiv_10.1101_xyz'). Studies
+    are indexed by that name when their download is queued, and by their
+    pmid, unique_id, processed_id and normalized DOI/PMID/PMCID. Every
+    underscore-separated suffix of those values is indexed too, so a name
+    built as '<source>_<id>' and a bare ID of a study known by its file
+    name both resolve with a few dictionary lookups.
+
+    Only studies still being processed or downloaded are needed: once a
+    study is written to the export log, release() drops it again.
+    """
+
+    FIELDS = ('pmid', 'unique_id', 'processed_id')
+
+    def __init__(self):
+        self._exact = {}
+        self._suffixes = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _suffix_keys(value):
+        parts = value.split('_')
+        return ['_'.join(parts[i:]) for i in range(1, len(parts))]
+
+    def register(self, study, name=None):
+        """Index a study, including one that is still being processed.
+
+        Registering the same study again (e.g. once its processed_id or DOI
+        is known) adds the new keys; keys of other studies are never taken over.
+
+        Args:
+            study (dict): The study
+            name (str): Name its PDF is queued under, if any
+        """
+        if not isinstance(study, dict):
+            return
+
+        values = [str(study[field]) for field in self.FIELDS if study.get(field)]
+        doi = study.get('doi')
+        if doi and isinstance(doi, str):
+            values.append(doi.replace('/', '_'))
+        if name:
+            values.append(str(name))
+
+        with self._lock:
+            keys = self._keys.setdefault(id(study), set())
+            for key in [str(name)] if name else []:
+                self._exact[key] = study
+                keys.add(key)
+            for key in values + study_identifiers(study):
+                if self._exact.setdefault(key, study) is study:
+                    keys.add(key)
+            for value in values:
+                for key in self._suffix_keys(value):
+                    if self._suffixes.setdefault(key, study) is study:
+                        keys.add(key)
+
+    def release(self, study):
+        """Forget a study that no longer has to be looked up.
+
+        Args:
+            study (dict): A registered study
+        """
+        with self._lock:
+            for key in self._keys.pop(id(study), ()):
+                if self._exact.get(key) is study:
+                    del self._exact[key]
+                if self._suffixes.get(key) is study:
+                    del self._suffixes[key]
+
+    def lookup(self, name):
+        """Return the study registered under a name or ID, or None.
+
+        Args:
+            name (str): Queued file name, raw ID, or 'doi:'/'pmid:'/'pmcid:' key
+
+        Returns:
+            dict: The study, or None if it is not registered
+        """
+        name = str(name)
+        with self._lock:
+            study = self._exact.get(name)
+            if study is not None:
+                return study
+
+            # A name derived from an ID by adding '<source>_' prefixes
+            for key in self._suffix_keys(name):
+                study = self._exact.get(key)
+                if study is not None:
+                    return study
+
+            # A bare ID of a study registered under a derived name
+            return self._suffixes.get(name)
+
+    def __len__(self):
+        with self._lock:
+            return len({id(study) for study in self._exact.values()})
@@ -0,0 +1,82 @@
+"""
+Atomic and batched writes of JSON state files for Science Study Scraper
+"""
+
+import os
+import json
+import time
+import threading
+
+# Seconds between writes of a state file while it keeps changing; save() writes the rest
+SAVE_INTERVAL = 30
+
+
+def write_json(path, data):
+    """Write a JSON file atomically.
+
+    The data goes to a temporary file next to the target, which then replaces
+    it, so readers (and a later run after a crash) see either the old or the
+    new file, never a half-written one.
+
+    Args:
+        path (str): Path of the JSON file
+        data (str or object): JSON text, or an object to serialize
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class BatchedSave:
+    """Mixin for JSON state written at most every SAVE_INTERVAL seconds while it changes.
+
+    The class using it holds its state under ``self._lock``, calls
+    ``_init_saving()`` in its constructor, marks changes with
+    ``self._dirty = True`` while holding the lock and then calls
+    ``_save_if_due()``. It provides ``_state()`` (the JSON-serializable state,
+    called with the lock held), and sets ``_state_path`` and a ``_state_name``
+    for error messages. save() writes any remaining changes, e.g. at the end
+    of a run.
+    """
+
+    _state_name = 'state file'
+
+    def _init_saving(self):
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved = time.monotonic()
+
+    def _state(self):
+        raise NotImplementedError
+
+    def _save_if_due(self):
+        if self._dirty and time.monotonic() - self._saved >= SAVE_INTERVAL:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Could not write {self._state_name}: {e}")
+
+    def save(self):
+        """Write the file if it changed since it was last written."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self._state())
+                self._dirty = False
+                self._saved = time.monotonic()
+            try:
+                write_json(self._state_path, data)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                raise
@@ -0,0 +1,170 @@
+"""
+Download integrity manifest for Science Study Scraper
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from utils.json_state import BatchedSave
+
+# Bytes at the start and end of a PDF read for the structural check
+HEAD_SIZE = 1024
+TAIL_SIZE = 2048
+
+# Age after which a kept PDF is revalidated against its URL (ETag/Last-Modified)
+REVALIDATE_AGE = 7 * 86400
+
+
+def check_pdf_structure(path):
+    """Check that a file starts like a PDF and ends with a PDF trailer.
+
+    A download cut off part way through still starts with %PDF but has no
+    %%EOF marker or startxref pointer near its end.
+
+    Args:
+        path (str): File to check
+
+    Returns:
+        bool: True if the file has a PDF header and trailer
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_SIZE)
+            f.seek(max(0, size - TAIL_SIZE))
+            tail = f.read()
+    except OSError:
+        return False
+    return b'%PDF' in head and (b'%%EOF' in tail or b'startxref' in tail)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadManifest(BatchedSave):
+    """Record of every downloaded PDF, used to skip valid files on reruns.
+
+    For each study name the manifest keeps the source URL, the size and
+    SHA-256 of the stored file, the ETag and Last-Modified the server sent,
+    and whether the file passed the structural check. Stored as JSON in
+    ``<output>/pdfs/manifest.json``; writes are batched (see BatchedSave), so
+    an interrupted run keeps the record of what it downloaded.
+    """
+
+    _state_name = 'download manifest'
+
+    def __init__(self, path):
+        """Load the manifest if it exists.
+
+        Args:
+            path (str): Path of the JSON file
+        """
+        self.path = path
+        self._state_path = path
+        self._lock = threading.Lock()
+        self._init_saving()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read download manifest, starting a new one: {e}")
+
+    def record(self, name, url, path, sha256, response=None, origin=None):
+        """Remember a stored PDF.
+
+        Args:
+            name (str): Study name used for the filename
+            url (str): URL the PDF was downloaded from
+            path (str): Path of the study's PDF
+            sha256 (str): Hex SHA-256 of the file
+            response (requests.Response): Response the PDF came from, for its validators
+            origin (str): Link the study's download started from, if the PDF was
+                found through it (e.g. a PMC fallback or a link on an HTML page)
+        """
+        headers = response.headers if response is not None else {}
+        entry = {
+            'url': url,
+            'origin': origin or url,
+            'path': path,
+            'size': os.path.getsize(path),
+            'mtime': os.path.getmtime(path),
+            'sha256': sha256,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'structure_ok': check_pdf_structure(path),
+            'checked': time.time()
+        }
+        with self._lock:
+            self.entries[name] = entry
+            self._dirty = True
+        self._save_if_due()
+
+    def valid(self, name):
+        """Return a study's manifest entry if its file is still intact, else None.
+
+        The file must exist with the recorded size and pass the structural
+        check. Its hash is only recomputed when its modification time changed.
+
+        Args:
+            name (str): Study name
+
+        Returns:
+            dict: The manifest entry, or None if the file is missing, truncated or changed
+        """
+        with self._lock:
+            entry = self.entries.get(name)
+        if not entry or not entry.get('structure_ok'):
+            return None
+
+        path = entry['path']
+        try:
+            if os.path.getsize(path) != entry['size']:
+                return None
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        if not check_pdf_structure(path):
+            return None
+        if mtime != entry['mtime']:
+            if _sha256(path) != entry['sha256']:
+                return None
+            with self._lock:
+                entry['mtime'] = mtime
+                self._dirty = True
+        return entry
+
+    def needs_revalidation(self, entry):
+        """Return True if an entry is old enough to be checked against its URL."""
+        return bool(entry.get('etag') or entry.get('last_modified')) and \
+            time.time() - entry.get('checked', 0) > REVALIDATE_AGE
+
+    def validators(self, entry):
+        """Return conditional request headers for an entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, name):
+        """Mark an entry as confirmed unchanged upstream."""
+        with self._lock:
+            if name in self.entries:
+                self.entries[name]['checked'] = time.time()
+                self._dirty = True
+        self._save_if_due()
+
+    def _state(self):
+        return self.entries
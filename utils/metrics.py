@@ -0,0 +1,252 @@
+"""
+Per-request network metrics for Science Study Scraper
+"""
+
+import sys
+import copy
+import json
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Modules skipped when looking for the code that issued a request
+_INTERNAL_MODULES = ('utils.http_client', 'utils.metrics', 'requests', 'urllib3', 'contextlib', 'http', 'socket', 'ssl')
+
+_context = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """Label the requests made by the current thread inside the block.
+
+    Args:
+        name (str): Stage name, e.g. 'pubmed.search' or 'download'
+    """
+    previous = getattr(_context, 'stage', None)
+    _context.stage = name
+    try:
+        yield
+    finally:
+        _context.stage = previous
+
+
+def current_stage():
+    """Return the stage of the current thread, or the module that is issuing the request.
+
+    Threads started by helper pools (strategy races, page prefetching) have no
+    stage of their own and are labelled with the calling module instead.
+    """
+    name = getattr(_context, 'stage', None)
+    if name:
+        return name
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_INTERNAL_MODULES):
+            return module
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _labels(**values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values.values())
+    return ','.join(f'{key}="{value}"' for key, value in zip(values, escaped))
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        buckets = []
+        for bound, count in zip(BUCKETS + ('+Inf',), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'buckets': {str(bound): count for bound, count in self.cumulative()}
+        }
+
+
+class _Series:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes = 0
+        self.retries = 0
+        self.cache = {}
+        self.ttfb = _Histogram()
+        self.total = _Histogram()
+
+
+class RequestMetrics:
+    """Counters and latency histograms of every HTTP request, per host and stage.
+
+    The HTTP client records each request with its host, the stage that issued
+    it (see stage()), its status, the bytes received, the time to the first
+    byte, the total time, the retries urllib3 made and whether it was served
+    from the response cache. export() writes the aggregates as JSON and in the
+    Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far (e.g. at the start of a run)."""
+        with self._lock:
+            self.series = {}
+            self.started = time.time()
+
+    def record(self, url, stage_name, status=None, nbytes=0, ttfb=None, total=0.0, retries=0, cache='none'):
+        """Record one request.
+
+        Args:
+            url (str): Requested URL
+            stage_name (str): Stage or module that issued the request
+            status (int or str): HTTP status, or the exception name for failed requests
+            nbytes (int): Body bytes received
+            ttfb (float): Seconds until the response headers arrived (None if none did)
+            total (float): Seconds until the body was read or the request failed
+            retries (int): Retries made for the request
+            cache (str): 'hit', 'revalidated', 'miss' or 'none' (cache not used)
+        """
+        host = urlparse(url).netloc.lower() or 'unknown'
+        with self._lock:
+            series = self.series.get((host, stage_name))
+            if series is None:
+                series = self.series[(host, stage_name)] = _Series()
+            series.requests += 1
+            if not isinstance(status, int) or status >= 400:
+                series.errors += 1
+            status = str(status)
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.bytes += nbytes or 0
+            series.retries += retries or 0
+            series.cache[cache] = series.cache.get(cache, 0) + 1
+            if ttfb is not None:
+                series.ttfb.observe(ttfb)
+            series.total.observe(total)
+
+    def to_dict(self):
+        """Return the aggregated metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            items = copy.deepcopy(sorted(self.series.items()))
+            started = self.started
+
+        hosts = {}
+        series = []
+        for (host, stage_name), data in items:
+            series.append({
+                'host': host,
+                'stage': stage_name,
+                'requests': data.requests,
+                'errors': data.errors,
+                'statuses': data.statuses,
+                'bytes': data.bytes,
+                'retries': data.retries,
+                'cache': data.cache,
+                'ttfb_seconds': data.ttfb.to_dict(),
+                'total_seconds': data.total.to_dict()
+            })
+            host_totals = hosts.setdefault(host, {'requests': 0, 'seconds': 0.0, 'bytes': 0, 'errors': 0})
+            host_totals['requests'] += data.requests
+            host_totals['seconds'] += data.total.sum
+            host_totals['bytes'] += data.bytes
+            host_totals['errors'] += data.errors
+
+        slowest = sorted(hosts.items(), key=lambda item: -item[1]['seconds'])
+        return {
+            'started': started,
+            'finished': time.time(),
+            'requests': sum(item['requests'] for item in series),
+            'bytes': sum(item['bytes'] for item in series),
+            'hosts_by_time': [{'host': host, **{k: round(v, 3) if isinstance(v, float) else v
+                                                for k, v in totals.items()}}
+                              for host, totals in slowest],
+            'series': series
+        }
+
+    def to_prometheus(self):
+        """Return the aggregated metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = copy.deepcopy(sorted(self.series.items()))
+
+        lines = [
+            '# HELP scraper_http_requests_total HTTP requests by host, stage and status.',
+            '# TYPE scraper_http_requests_total counter'
+        ]
+        for (host, stage_name), data in items:
+            for status, count in sorted(data.statuses.items()):
+                lines.append(f'scraper_http_requests_total{{{_labels(host=host, stage=stage_name, status=status)}}} {count}')
+
+        lines += ['# HELP scraper_http_response_bytes_total Response body bytes received.',
+                  '# TYPE scraper_http_response_bytes_total counter']
+        for (host, stage_name), data in items:
+            lines.append(f'scraper_http_response_bytes_total{{{_labels(host=host, stage=stage_name)}}} {data.bytes}')
+
+        lines += ['# HELP scraper_http_retries_total Retries made by the HTTP client.',
+                  '# TYPE scraper_http_retries_total counter']
+        for (host, stage_name), data in items:
+            lines.append(f'scraper_http_retries_total{{{_labels(host=host, stage=stage_name)}}} {data.retries}')
+
+        lines += ['# HELP scraper_http_cache_total Requests by response cache outcome.',
+                  '# TYPE scraper_http_cache_total counter']
+        for (host, stage_name), data in items:
+            for result, count in sorted(data.cache.items()):
+                lines.append(f'scraper_http_cache_total{{{_labels(host=host, stage=stage_name, result=result)}}} {count}')
+
+        for metric, attribute, help_text in (
+            ('scraper_http_ttfb_seconds', 'ttfb', 'Time until the response headers arrived.'),
+            ('scraper_http_request_duration_seconds', 'total', 'Time until the response body was read.'),
+        ):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+            for (host, stage_name), data in items:
+                histogram = getattr(data, attribute)
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{{_labels(host=host, stage=stage_name, le=bound)}}} {count}')
+                lines.append(f'{metric}_sum{{{_labels(host=host, stage=stage_name)}}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{{_labels(host=host, stage=stage_name)}}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, json_path, prom_path):
+        """Write the metrics as JSON and as a Prometheus text file.
+
+        Args:
+            json_path (str): Path of the JSON file
+            prom_path (str): Path of the Prometheus text file
+
+        Returns:
+            dict: The exported metrics
+        """
+        data = self.to_dict()
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return data
@@ -0,0 +1,148 @@
+"""
+Persistent negative cache for dead or paywalled PDF URLs
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlparse
+
+from utils.http_client import get_client
+
+# First lifetime of a failure entry per failure class; it doubles with every repeat
+BASE_TTL = {
+    'connection': 3600,   # Timeouts and refused connections are often temporary
+    'http_5xx': 3600,
+    'http_4xx': 6 * 3600,  # 401/403 paywalls, 404 dead links
+    'not_pdf': 6 * 3600,   # HTML landing or login page without a PDF link
+    'tiny_file': 6 * 3600,
+    'truncated': 6 * 3600,  # Complete transfer of a PDF without its trailer
+}
+
+# Longest a failure is remembered before the URL is tried again
+MAX_TTL = 30 * 86400
+
+# Consecutive failing URLs after which a whole host is skipped
+HOST_STREAK = 5
+
+
+def failure_class(status_code=None, failure=None):
+    """Return the failure class used for TTLs and reporting.
+
+    Args:
+        status_code (int): HTTP status of the failed response, if any
+        failure (str): 'connection', 'not_pdf', 'tiny_file' or 'truncated' for other failures
+
+    Returns:
+        str: e.g. 'http_403', 'not_pdf'
+    """
+    return f"http_{status_code}" if status_code else failure
+
+
+def _ttl(failure, count):
+    if failure.startswith('http_'):
+        base = BASE_TTL['http_5xx'] if failure.startswith('http_5') else BASE_TTL['http_4xx']
+    else:
+        base = BASE_TTL.get(failure, BASE_TTL['not_pdf'])
+    return min(base * 2 ** (count - 1), MAX_TTL)
+
+
+class NegativeCache:
+    """SQLite table of PDF URLs that failed, and of hosts that keep failing.
+
+    Each failure is stored with its class (HTTP status, non-PDF content,
+    tiny file, connection error) and expires after a TTL that doubles every
+    time the same URL fails again. A host whose last few distinct URLs all
+    failed is skipped as a whole until its own entry expires; after that its
+    streak starts over. Any success clears the URL and resets the host.
+    Only real download attempts are recorded, not link checks.
+    """
+
+    def __init__(self, db_path):
+        """Open (or create) the cache database.
+
+        Args:
+            db_path (str): Path of the SQLite file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "url TEXT PRIMARY KEY, host TEXT, failure TEXT, count INTEGER, checked REAL, expires REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hosts ("
+                "host TEXT PRIMARY KEY, failure TEXT, streak INTEGER, checked REAL, expires REAL)"
+            )
+
+    def check(self, url):
+        """Return why a URL is known not to yield a PDF, or None if it should be tried.
+
+        Args:
+            url (str): URL about to be requested
+
+        Returns:
+            str: Failure class (e.g. 'http_403', or 'host http_403' for a failing
+                host), or None if the URL is not known to be dead
+        """
+        host = urlparse(url).netloc.lower()
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT failure, expires FROM urls WHERE url = ?", (url,)).fetchone()
+            if row and row[1] > now:
+                return row[0]
+            row = self._conn.execute(
+                "SELECT failure, streak, expires FROM hosts WHERE host = ?", (host,)
+            ).fetchone()
+            if row and row[1] >= HOST_STREAK and row[2] > now:
+                return f"host {row[0]}"
+        return None
+
+    def record_failure(self, url, failure):
+        """Remember that a URL did not yield a PDF.
+
+        Args:
+            url (str): URL that failed
+            failure (str): Failure class from failure_class()
+        """
+        host = urlparse(url).netloc.lower()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT count FROM urls WHERE url = ?", (url,)).fetchone()
+            count = (row[0] if row else 0) + 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, host, failure, count, checked, expires) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, host, failure, count, now, now + _ttl(failure, count))
+            )
+
+            # Only a new URL failing extends the host's streak; once the host's
+            # entry has expired, the streak starts over
+            row = self._conn.execute("SELECT streak, expires FROM hosts WHERE host = ?", (host,)).fetchone()
+            streak = row[0] if row and row[1] > now else 0
+            streak += 1 if count == 1 else 0
+            expires = now + _ttl(failure, max(1, streak - HOST_STREAK + 1))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hosts (host, failure, streak, checked, expires) VALUES (?, ?, ?, ?, ?)",
+                (host, failure, streak, now, expires)
+            )
+
+    def record_success(self, url):
+        """Forget a URL's failures and reset its host's failure streak."""
+        host = urlparse(url).netloc.lower()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM urls WHERE url = ?", (url,))
+            self._conn.execute("DELETE FROM hosts WHERE host = ?", (host,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_negative_cache(client=None):
+    """Return the negative cache attached to a client, or None if it has none."""
+    return getattr(get_client(client), 'negative_cache', None)
@@ -0,0 +1,74 @@
+"""
+Lazy, prefetching result streams for paginated search APIs
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by all result streams; each stream has at most one page in flight
+_prefetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+
+
+class PagedResults:
+    """Iterator over the results of a paginated search API.
+
+    ``fetch_page(state)`` returns ``(items, next_state)`` for one page, with
+    ``next_state`` None after the last page. The first page is fetched when
+    the stream is created, so request errors surface in the search call.
+    While the items of one page are being consumed, the next page is already
+    being fetched in the background. Iteration stops after ``max_results``
+    items, and only one page is held in memory at a time.
+    """
+
+    def __init__(self, fetch_page, initial_state, max_results=None, name="results"):
+        """Create the stream and fetch the first page.
+
+        Args:
+            fetch_page (function): Called as fetch_page(state), returns (items, next_state)
+            initial_state: State passed to the first fetch_page call
+            max_results (int): Maximum number of items to yield (None for all)
+            name (str): Name used in log messages
+        """
+        self.fetch_page = fetch_page
+        self.max_results = max_results
+        self.name = name
+        self.total = None  # Total number of hits, if the API reports it
+        self.count = 0  # Number of items yielded so far
+
+        self._lock = threading.Lock()
+        page, self._next_state = fetch_page(initial_state)
+        self._page = deque(page)
+        self._next = None
+        self._prefetch()
+
+    def _prefetch(self):
+        if self._next_state is not None and not self._limit_reached(len(self._page)):
+            self._next = _prefetch_executor.submit(self.fetch_page, self._next_state)
+        else:
+            self._next = None
+
+    def _limit_reached(self, pending=0):
+        return self.max_results is not None and self.count + pending >= self.max_results
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            while True:
+                if self._limit_reached():
+                    raise StopIteration
+                if self._page:
+                    self.count += 1
+                    return self._page.popleft()
+                if self._next is None:
+                    raise StopIteration
+                try:
+                    page, self._next_state = self._next.result()
+                except Exception as e:
+                    print(f"Error fetching the next page of {self.name}: {e}")
+                    self._next = None
+                    raise StopIteration
+                self._page = deque(page)
+                self._prefetch()
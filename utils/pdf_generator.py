@@ -2,21 +2,23 @@
 PDF generation utilities for Science Study Scraper
 """
 
-import requests
-from bs4 import BeautifulSoup
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 
-def extract_article_content(url, study_data, headers):
+from utils.http_client import get_client
+from utils.html_parser import parse_html
+
+def extract_article_content(url, study_data, headers, client=None):
     """Extract full article content from the web page.
     
     Args:
         url (str): URL of the article page
         study_data (dict): Study data dictionary
         headers (dict): HTTP headers for requests
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         dict: Article content with sections
@@ -36,22 +38,22 @@ def extract_article_content(url, study_data, headers):
         'references': []
     }
     
+    client = get_client(client)
+    
     try:
-        # Create a session with retry capabilities
-        session = requests.Session()
-        response = session.get(url, headers=headers, timeout=30, allow_redirects=True)
+        response = client.get(url, headers=headers, timeout=30, allow_redirects=True)
         response.raise_for_status()
         
         # Detect source and use appropriate extraction method
         if 'pubmed.ncbi.nlm.nih.gov' in url:
-            return _extract_from_pubmed(response.text, study_data)
+            return _extract_from_pubmed(response.text, study_data, client=client)
         elif 'ncbi.nlm.nih.gov/pmc' in url:
             return _extract_from_pmc(response.text, study_data)
         elif 'europepmc.org' in url:
             return _extract_from_europepmc(response.text, study_data)
         else:
             # Generic content extraction
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = parse_html(response.text)
             
             # Try to find the main article content
             article_elem = soup.select_one('article, .article, .content, main, #content, #main')
@@ -98,17 +100,18 @@ def extract_article_content(url, study_data, headers):
         print(f"Error extracting article content: {e}")
         return None
 
-def _extract_from_pubmed(html, study_data):
+def _extract_from_pubmed(html, study_data, client=None):
     """Extract article content from PubMed page.
     
     Args:
         html (str): HTML content of the page
         study_data (dict): Study data dictionary
+        client (HttpClient): Shared HTTP client (default: process-wide client)
     
     Returns:
         dict: Article content
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = parse_html(html)
     
     article_content = {
         'title': study_data.get('title', 'Unknown Title'),
@@ -143,7 +146,7 @@ def _extract_from_pubmed(html, study_data):
     # If PMC link found, try to extract content from there
     if pmc_link:
         try:
-            response = requests.get(pmc_link, headers={'User-Agent': 'Mozilla/5.0'})
+            response = get_client(client).get(pmc_link, headers={'User-Agent': 'Mozilla/5.0'})
             response.raise_for_status()
             return _extract_from_pmc(response.text, study_data)
         except Exception as e:
@@ -161,7 +164,7 @@ def _extract_from_pmc(html, study_data):
     Returns:
         dict: Article content
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = parse_html(html)
     
     article_content = {
         'title': study_data.get('title', 'Unknown Title'),
@@ -266,7 +269,7 @@ def _extract_from_europepmc(html, study_data):
     Returns:
         dict: Article content
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = parse_html(html)
     
     article_content = {
         'title': study_data.get('title', 'Unknown Title'),
@@ -0,0 +1,154 @@
+"""
+Content-addressed PDF store for Science Study Scraper
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from utils.json_state import BatchedSave
+
+
+class PdfStore(BatchedSave):
+    """Stores each distinct PDF once, keyed by its SHA-256.
+
+    Blobs live under ``<pdf_dir>/store/<first two hex digits>/<sha256>.pdf``.
+    The per-study names (``<pdf_dir>/<name>.pdf``) are hardlinks to the blob,
+    so the same paper found in PubMed, PMC and Europe PMC takes up disk space
+    once. If the file system does not support hardlinks, the name only exists
+    as an entry in the index and the blob path is used directly.
+
+    The index (``<pdf_dir>/index.json``) maps study names and source URLs to
+    blob hashes, so a URL that was already stored can be linked without
+    fetching it again. Its writes are batched (see BatchedSave).
+    """
+
+    _state_name = 'PDF store index'
+
+    def __init__(self, pdf_dir):
+        """Initialize the store.
+
+        Args:
+            pdf_dir (str): Directory holding the per-study PDFs
+        """
+        self.pdf_dir = pdf_dir
+        self.store_dir = os.path.join(pdf_dir, "store")
+        self.index_file = os.path.join(pdf_dir, "index.json")
+        self._state_path = self.index_file
+        self._lock = threading.Lock()
+        self._init_saving()
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.index = {'names': {}, 'urls': {}}
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.index.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Could not read PDF store index, starting a new one: {e}")
+
+    def blob_path(self, sha256):
+        """Return the path of the blob for a hash."""
+        return os.path.join(self.store_dir, sha256[:2], f"{sha256}.pdf")
+
+    def name_path(self, name):
+        """Return the per-study path for a name."""
+        return os.path.join(self.pdf_dir, f"{name}.pdf")
+
+    def lookup_url(self, url, since=None):
+        """Return the path of the stored PDF previously fetched from a URL, or None.
+
+        Args:
+            url (str): Source URL
+            since (float): Only accept entries stored at or after this Unix time
+
+        Returns:
+            str: Blob path, or None if the URL is unknown or its blob is gone
+        """
+        with self._lock:
+            entry = self.index['urls'].get(url)
+        if not entry or (since is not None and entry.get('stored', 0) < since):
+            return None
+        path = self.blob_path(entry['sha256'])
+        return path if os.path.exists(path) else None
+
+    def add(self, path, sha256, name, url=None):
+        """Move a finished download into the store and link the study name to it.
+
+        Args:
+            path (str): Completed file (e.g. a .part file); it is moved or deleted
+            sha256 (str): Hex SHA-256 of the file
+            name (str): Study name used for the per-study filename
+            url (str): Source URL, remembered so it need not be fetched again
+
+        Returns:
+            str: Path to use for the study's PDF
+        """
+        blob = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+        with self._lock:
+            # A blob whose size no longer matches was damaged on disk (e.g. truncated
+            # through one of its hardlinks) and is replaced by the new download
+            if os.path.exists(blob) and os.path.getsize(blob) == os.path.getsize(path):
+                # Already stored from another source; drop the duplicate
+                os.remove(path)
+                print(f"PDF for {name} is identical to a stored PDF (sha256 {sha256[:12]})")
+            else:
+                os.replace(path, blob)
+
+            if url:
+                self.index['urls'][url] = {'sha256': sha256, 'stored': time.time()}
+                self._dirty = True
+
+        return self.link(blob, name)
+
+    def add_file(self, path, name, url=None):
+        """Hash an existing file and add it to the store.
+
+        Args:
+            path (str): File to add; it is moved or deleted
+            name (str): Study name used for the per-study filename
+            url (str): Source URL, if any
+
+        Returns:
+            str: Path to use for the study's PDF
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(block)
+        return self.add(path, digest.hexdigest(), name, url)
+
+    def link(self, blob, name):
+        """Point the per-study filename at a blob.
+
+        Args:
+            blob (str): Blob path
+            name (str): Study name
+
+        Returns:
+            str: The per-study path, or the blob path if hardlinks are not supported
+        """
+        target = self.name_path(name)
+        with self._lock:
+            if self.index['names'].get(name) != os.path.basename(blob)[:-len('.pdf')]:
+                self.index['names'][name] = os.path.basename(blob)[:-len('.pdf')]
+                self._dirty = True
+        self._save_if_due()
+
+        try:
+            if os.path.exists(target) and os.path.samefile(target, blob):
+                return target
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            os.link(blob, tmp)
+            os.replace(tmp, target)
+            return target
+        except OSError as e:
+            print(f"Could not link {target} to the PDF store, using {blob}: {e}")
+            return blob
+
+    def _state(self):
+        return self.index
@@ -0,0 +1,375 @@
+"""
+Resumable and multi-segment PDF transfers using HTTP Range requests
+"""
+
+import os
+import re
+import json
+import hashlib
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Errors raised by requests while a streamed body is being read
+STREAM_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+CHUNK_SIZE = 8192
+
+# Smallest file worth splitting into parallel segments
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+
+
+class PartFile:
+    """A .part file that hashes and counts every byte written to it.
+
+    Memory use is bounded by the chunk size no matter how large the file
+    grows. When an existing .part file is resumed, its bytes are hashed once
+    from disk so the final SHA-256 covers the whole file.
+    """
+
+    def __init__(self, path, resume=False):
+        """Open a .part file for writing.
+
+        Args:
+            path (str): Path of the .part file
+            resume (bool): Append to an existing file instead of truncating it
+        """
+        self.path = path
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+        if resume and os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(64 * 1024), b''):
+                    self._hash.update(block)
+                    self.size += len(block)
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def append_file(self, path):
+        """Append the contents of another file."""
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                self.write(block)
+
+    def restart(self):
+        """Discard everything written so far."""
+        self._file.close()
+        self._file = open(self.path, 'wb')
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def sha256(self):
+        """Return the hex SHA-256 of the bytes written so far."""
+        return self._hash.hexdigest()
+
+    def close(self):
+        self._file.close()
+
+
+def resume_validator(headers):
+    """Return the If-Range value for a response, or None if it has no usable validator.
+
+    A strong ETag is preferred; weak ETags cannot be used with If-Range, so
+    Last-Modified is used instead when that is all the server sent.
+
+    Args:
+        headers (dict): Response headers
+
+    Returns:
+        str: Value for an If-Range header, or None
+    """
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def save_resume_validator(part_path, url, response):
+    """Store the validator of the response a .part file is written from next to it.
+
+    A later run only resumes the .part file with an If-Range request carrying
+    this validator, so bytes of a changed file are never appended to old ones.
+    If the response has no validator, any stale sidecar is removed and the
+    .part file will not be resumed.
+
+    Args:
+        part_path (str): Path of the .part file
+        url (str): URL being downloaded
+        response (requests.Response): Response the .part file starts from
+
+    Returns:
+        str: The stored If-Range value, or None
+    """
+    validator = resume_validator(response.headers)
+    sidecar = f"{part_path}.json"
+    if not validator:
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+        return None
+
+    with open(sidecar, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'if_range': validator}, f)
+    return validator
+
+
+def load_resume_validator(part_path, url):
+    """Return the If-Range value stored for a .part file, or None.
+
+    Args:
+        part_path (str): Path of the .part file
+        url (str): URL being downloaded; a .part file from another URL is not resumed
+
+    Returns:
+        str: Value for an If-Range header, or None if the .part file cannot be resumed safely
+    """
+    try:
+        with open(f"{part_path}.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data.get('if_range') if data.get('url') == url else None
+
+
+def discard_part(part_path):
+    """Delete a .part file and its resume validator."""
+    for path in (part_path, f"{part_path}.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def accepts_ranges(response):
+    """Return True if the server advertises byte range support for a response."""
+    return (response.status_code == 206 or
+            response.headers.get('Accept-Ranges', '').strip().lower() == 'bytes')
+
+
+def total_size(response):
+    """Return the full size of the resource behind a 200 or 206 response, or None.
+
+    Args:
+        response (requests.Response): Response to a (possibly ranged) GET
+
+    Returns:
+        int: Size of the whole resource in bytes, or None if unknown
+    """
+    if response.status_code == 206:
+        match = re.search(r'/(\d+)\s*$', response.headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit() and not response.headers.get('Content-Encoding'):
+        return int(length)
+    return None
+
+
+def peek(chunks, size=1024):
+    """Read the first `size` bytes (or the whole body, if shorter) from a chunk iterator.
+
+    Args:
+        chunks (iterator): Iterator from response.iter_content()
+        size (int): Number of bytes wanted
+
+    Returns:
+        bytes: The bytes read; the iterator continues right after them
+    """
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= size:
+            break
+    return head
+
+
+def stream_to_part(client, url, headers, response, part, head=b'', chunks=None, resume_attempts=3):
+    """Stream a response body into a .part file, resuming if the transfer breaks.
+
+    If the connection drops or times out mid-transfer and the server supports
+    byte ranges, the rest of the file is requested with a Range header and
+    appended to what is already on disk. Pass an If-Range header in `headers`
+    so a file that changed in the meantime is sent whole instead.
+
+    Args:
+        client (HttpClient): Client used for resume requests
+        url (str): URL being downloaded
+        headers (dict): Request headers used for the original request
+        response (requests.Response): Streamed 200/206 response continuing at part.size
+        part (PartFile): Open .part file
+        head (bytes): Bytes already read from the response (see peek())
+        chunks (iterator): The response's chunk iterator, if reading has started
+        resume_attempts (int): How many times an interrupted transfer is resumed
+
+    Returns:
+        bool: True if the whole body was written, False if the transfer failed.
+            On failure the .part file is kept when the server supports ranges,
+            so a later attempt can resume it.
+    """
+    ranges = accepts_ranges(response)
+    if chunks is None:
+        chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+    if head:
+        part.write(head)
+
+    for attempt in range(resume_attempts + 1):
+        try:
+            for chunk in chunks:
+                if chunk:  # Filter out keep-alive new chunks
+                    part.write(chunk)
+            return True
+        except STREAM_ERRORS as e:
+            response.close()
+            if not ranges:
+                print(f"Transfer of {url} interrupted and the server does not support resuming: {e}")
+                break
+            if attempt == resume_attempts:
+                print(f"Transfer of {url} interrupted, keeping partial file for a later resume: {e}")
+                return False
+
+            print(f"Transfer of {url} interrupted at byte {part.size}, resuming: {e}")
+            try:
+                response = client.get(
+                    url,
+                    headers={**headers, 'Range': f'bytes={part.size}-'},
+                    stream=True,
+                    timeout=30,
+                    allow_redirects=True
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"Resume request failed: {e}")
+                return False
+
+            if response.status_code == 200:
+                # The server ignored the range this time; start over
+                part.restart()
+            elif response.status_code != 206:
+                print(f"Resume request failed with status {response.status_code}")
+                response.close()
+                return False
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+
+    part.close()
+    discard_part(part.path)
+    return False
+
+
+def _fetch_segment(client, url, headers, segment_path, start, end, resume_attempts):
+    """Download bytes start..end (inclusive) of a resource into segment_path."""
+    expected = end - start + 1
+    for _ in range(resume_attempts + 1):
+        have = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+        if have >= expected:
+            return True
+
+        try:
+            response = client.get(
+                url,
+                headers={**headers, 'Range': f'bytes={start + have}-{end}'},
+                stream=True,
+                timeout=30,
+                allow_redirects=True
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Segment request for bytes {start + have}-{end} failed: {e}")
+            continue
+
+        if response.status_code != 206:
+            print(f"Segment request for bytes {start + have}-{end} returned status {response.status_code}")
+            response.close()
+            return False
+
+        try:
+            with open(segment_path, 'ab') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+        except STREAM_ERRORS as e:
+            print(f"Segment transfer for bytes {start + have}-{end} interrupted: {e}")
+            response.close()
+
+    return os.path.exists(segment_path) and os.path.getsize(segment_path) >= expected
+
+
+def download_segments(client, url, headers, response, part, size, segments,
+                      head=b'', chunks=None, resume_attempts=3):
+    """Fetch a large resource as several parallel byte ranges and reassemble it.
+
+    The already open response supplies the first segment; the remaining
+    segments are requested concurrently with Range headers and appended to
+    the .part file in order once they have all arrived.
+
+    Args:
+        client (HttpClient): Client used for the segment requests
+        url (str): URL being downloaded
+        headers (dict): Request headers used for the original request
+        response (requests.Response): Streamed 200 response for the whole resource
+        part (PartFile): Empty .part file receiving the reassembled body
+        size (int): Total size of the resource in bytes
+        segments (int): Number of parallel segments
+        head (bytes): Bytes already read from the response (see peek())
+        chunks (iterator): The response's chunk iterator, if reading has started
+        resume_attempts (int): How many times each interrupted segment is resumed
+
+    Returns:
+        bool: True if every segment was fetched and the .part file is complete
+    """
+    segment_size = max(-(-size // segments), len(head))  # Ceiling division
+    bounds = [(start, min(start + segment_size, size) - 1) for start in range(0, size, segment_size)]
+    first_size = bounds[0][1] + 1
+    # seg0 only receives the tail of the first segment if the response breaks off early
+    segment_paths = [f"{part.path}.seg{i}" for i in range(len(bounds))]
+    print(f"Downloading {size} bytes in {len(bounds)} parallel segments")
+
+    if chunks is None:
+        chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(bounds) - 1), thread_name_prefix="segment") as executor:
+            futures = [
+                executor.submit(_fetch_segment, client, url, headers, path, start, end, resume_attempts)
+                for path, (start, end) in zip(segment_paths[1:], bounds[1:])
+            ]
+
+            # Write the first segment straight from the response we already have
+            try:
+                if head:
+                    part.write(head)
+                for chunk in chunks:
+                    if part.size >= first_size:
+                        break
+                    if chunk:
+                        part.write(chunk[:first_size - part.size])
+            except STREAM_ERRORS as e:
+                print(f"First segment interrupted at byte {part.size}: {e}")
+            finally:
+                response.close()
+
+            first_ok = True
+            if part.size < first_size:
+                first_ok = _fetch_segment(client, url, headers, segment_paths[0],
+                                          part.size, first_size - 1, resume_attempts)
+                if first_ok:
+                    part.append_file(segment_paths[0])
+
+            results = [first_ok] + [future.result() for future in futures]
+
+        if not all(results):
+            print("One or more segments failed")
+            return False
+
+        for path in segment_paths[1:]:
+            part.append_file(path)
+
+        return part.size == size
+    finally:
+        for path in segment_paths:
+            if os.path.exists(path):
+                os.remove(path)
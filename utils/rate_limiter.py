@@ -0,0 +1,155 @@
+"""
+Per-host adaptive rate limiting for Science Study Scraper
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+
+# Status codes that mean the server wants us to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class _HostBucket:
+    """Token bucket state for a single host."""
+
+    def __init__(self, rate, max_rate, burst):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        """Add the tokens earned since the last update."""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+
+class HostRateLimiter:
+    """Grant request slots per host using a token bucket with AIMD rate control.
+
+    Every host gets its own bucket, so requests to different servers never wait
+    on each other. The refill rate of a bucket grows additively after each
+    healthy response and shrinks multiplicatively when the host answers with
+    429/503, fails, or responds slower than ``slow_latency``.
+    """
+
+    def __init__(self, initial_rate=1.0, min_rate=0.05, max_rate=10.0, burst=2,
+                 increase=0.1, decrease=0.5, slow_latency=10.0, host_rates=None):
+        """Initialize the rate limiter.
+
+        Args:
+            initial_rate (float): Starting number of requests per second for a new host
+            min_rate (float): Lowest rate a host can be throttled down to
+            max_rate (float): Highest rate a host can ramp up to
+            burst (int): Number of requests a host may receive back to back
+            increase (float): Requests per second added after each healthy response
+            decrease (float): Factor the rate is multiplied by on congestion
+            slow_latency (float): Response time in seconds treated as a congestion signal
+            host_rates (dict): Optional {host: (initial_rate, max_rate)} overrides
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.host_rates = dict(host_rates or {})
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_for(url):
+        """Return the host part of a URL used as the bucket key."""
+        return urlparse(url).netloc.lower()
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, max_rate = self.host_rates.get(host, (self.initial_rate, self.max_rate))
+                bucket = _HostBucket(rate, max_rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url):
+        """Block until a request slot for the URL's host is available.
+
+        Args:
+            url (str): URL about to be requested
+
+        Returns:
+            float: Time in seconds spent waiting for the slot
+        """
+        host = self.host_for(url)
+        if not host:
+            return 0.0
+
+        bucket = self._bucket(host)
+        with bucket.lock:
+            now = time.monotonic()
+            bucket.refill(now)
+            # Reserve the token now and sleep outside the lock, so waiting
+            # threads queue up in order instead of busy-polling the bucket
+            bucket.tokens -= 1
+            wait = 0.0
+            if bucket.tokens < 0:
+                wait = -bucket.tokens / bucket.rate
+            wait = max(wait, bucket.blocked_until - now)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url, status_code=None, latency=None, retry_after=None, error=False):
+        """Feed the outcome of a request back into the host's rate.
+
+        Args:
+            url (str): URL that was requested
+            status_code (int): HTTP status code of the response, if any
+            latency (float): Time in seconds the request took
+            retry_after (str): Value of the Retry-After response header, if any
+            error (bool): Whether the request failed without a response
+        """
+        host = self.host_for(url)
+        if not host:
+            return
+
+        bucket = self._bucket(host)
+        with bucket.lock:
+            throttled = error or status_code in THROTTLE_STATUS_CODES
+            slow = latency is not None and latency > self.slow_latency
+
+            if throttled or slow:
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                # Drop the saved-up burst so the slower rate applies immediately
+                bucket.tokens = min(bucket.tokens, 0)
+            else:
+                bucket.rate = min(bucket.max_rate, bucket.rate + self.increase)
+
+            if retry_after and status_code in THROTTLE_STATUS_CODES:
+                try:
+                    pause = float(retry_after)
+                except (TypeError, ValueError):
+                    pause = None
+                if pause:
+                    bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + pause)
+
+    def current_rate(self, url_or_host):
+        """Return the current requests-per-second rate for a host.
+
+        Args:
+            url_or_host (str): URL or bare host name
+
+        Returns:
+            float: Current rate of the host
+        """
+        host = self.host_for(url_or_host) if '://' in url_or_host else url_or_host.lower()
+        return self._bucket(host).rate
@@ -0,0 +1,252 @@
+"""
+PDF link strategy racing with learned per-publisher statistics for Science Study Scraper
+"""
+
+import os
+import json
+import time
+import threading
+import requests
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.http_client import get_client, cancel_on
+from utils.identity import normalize_doi
+from utils.range_download import CHUNK_SIZE, peek
+from utils.negative_cache import get_negative_cache
+from utils.json_state import write_json
+
+# Number of strategies run at the same time for one study
+RACE_WIDTH = 3
+
+# Attempts a publisher needs before its own statistics replace the global ones
+MIN_SAMPLES = 3
+
+# Bytes of a candidate link read to check that it is a PDF
+PEEK_SIZE = 1024
+
+# Shared by all races; each race keeps at most RACE_WIDTH strategies in flight
+_strategy_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="strategy")
+
+
+def publisher_key(study=None, doi=None, url=None):
+    """Return the key under which strategy statistics are kept for a study.
+
+    The DOI registrant prefix (e.g. "10.1038" for Nature) identifies the
+    publisher without any request; without a DOI, the host of the study's
+    URL is used.
+
+    Args:
+        study (dict): Study with 'doi' and/or 'source_url'
+        doi (str): DOI, if no study is given
+        url (str): Source URL, if no study is given
+
+    Returns:
+        str: Publisher key such as 'doi:10.1038' or 'host:www.nature.com'
+    """
+    if study:
+        doi = doi or study.get('doi')
+        url = url or study.get('source_url')
+    doi = normalize_doi(doi)
+    if doi:
+        return f"doi:{doi.split('/', 1)[0]}"
+    host = urlparse(url).netloc.lower() if url else ''
+    return f"host:{host}" if host else 'unknown'
+
+
+class StrategyStats:
+    """Hit counts and latencies of PDF link strategies, per publisher.
+
+    Stored as JSON (``<output>/.cache/strategy_stats.json``) so each run
+    starts with what earlier runs learned about which strategy finds PDFs
+    for which publisher, and how quickly.
+    """
+
+    def __init__(self, path):
+        """Load the statistics file if it exists.
+
+        Args:
+            path (str): Path of the JSON file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read strategy statistics, starting over: {e}")
+
+    def record(self, key, name, success, elapsed):
+        """Record one attempt of a strategy.
+
+        Args:
+            key (str): Publisher key from publisher_key()
+            name (str): Strategy name
+            success (bool): Whether the strategy produced a verified PDF
+            elapsed (float): Seconds the attempt took
+        """
+        with self._lock:
+            for bucket in (key, '*'):
+                entry = self.stats.setdefault(bucket, {}).setdefault(name, {'tries': 0, 'hits': 0, 'time': 0.0})
+                entry['tries'] += 1
+                entry['hits'] += 1 if success else 0
+                entry['time'] += elapsed
+
+    def score(self, key, name):
+        """Return the expected verified PDFs per second of a strategy for a publisher."""
+        with self._lock:
+            entry = self.stats.get(key, {}).get(name)
+            if not entry or entry['tries'] < MIN_SAMPLES:
+                entry = self.stats.get('*', {}).get(name)
+            if not entry:
+                return 0.5  # Untried: a coin flip taking one second
+            # Smoothed so a single early failure does not bury a strategy
+            hit_rate = (entry['hits'] + 1) / (entry['tries'] + 2)
+            latency = (entry['time'] + 1.0) / (entry['tries'] + 1)
+            return hit_rate / max(latency, 0.05)
+
+    def order(self, key, names):
+        """Return strategy names sorted best first (ties keep the given order)."""
+        return sorted(names, key=lambda name: -self.score(key, name))
+
+    def save(self):
+        """Write the statistics file."""
+        with self._lock:
+            data = json.dumps(self.stats)
+        write_json(self.path, data)
+
+
+def is_pdf_url(url, headers, client=None):
+    """Check whether a URL serves a PDF by reading the first bytes of its body.
+
+    Only the first kilobyte is asked for with a Range request, so checking a
+    link costs one small round trip on a kept-alive connection rather than a
+    second full transfer of the PDF that download_pdf fetches afterwards.
+    URLs in the client's negative cache are rejected without a request. A
+    failed check is not recorded there: it used a single set of headers,
+    and download_pdf may still get the PDF with another header profile.
+
+    Args:
+        url (str): URL to check
+        headers (dict): HTTP headers for the request
+        client (HttpClient): Shared HTTP client (default: process-wide client)
+
+    Returns:
+        bool: True if the response is a 200 or 206 with a PDF body
+    """
+    client = get_client(client)
+    negative_cache = get_negative_cache(client)
+    if negative_cache and negative_cache.check(url):
+        return False
+
+    try:
+        response = client.get(url, headers={**headers, 'Range': f'bytes=0-{PEEK_SIZE - 1}'},
+                              stream=True, timeout=15, allow_redirects=True)
+    except requests.exceptions.RequestException:
+        return False
+
+    try:
+        if response.status_code not in (200, 206):
+            ok = False
+        else:
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            head = peek(chunks, PEEK_SIZE)
+            content_type = response.headers.get('Content-Type', '').lower()
+            looks_like_html = head.lstrip()[:15].lower().startswith((b'<!doctype html', b'<html'))
+            ok = b'%PDF' in head or ('pdf' in content_type and not looks_like_html)
+            if response.status_code == 206 and len(head) <= PEEK_SIZE:
+                # Read the (empty) rest of the range so the connection goes back to the pool
+                for _ in chunks:
+                    pass
+    except requests.exceptions.RequestException:
+        return False
+    finally:
+        response.close()
+    return ok
+
+
+def race_strategies(strategies, key, headers=None, client=None, verify=True, width=RACE_WIDTH):
+    """Find a PDF link by running several strategies at once, best first.
+
+    Strategies are ordered by their learned score for the publisher. The best
+    ``width`` are started together; whenever one finishes without a verified
+    PDF, the next one is started. As soon as one yields a verified PDF the
+    strategies not yet started are cancelled; the ones still running are
+    ignored, and any request they make from then on fails at once, so they
+    do not hold on to the shared strategy workers.
+
+    If no strategy yields a verified PDF, the first link any of them found
+    is returned in the strategies' given order, as the fixed cascade did, so
+    download_pdf's own fallbacks still get a chance.
+
+    Args:
+        strategies (list): (name, function) pairs in fallback order; each
+            function takes no arguments and returns a PDF URL or None
+        key (str): Publisher key from publisher_key()
+        headers (dict): HTTP headers used to verify links
+        client (HttpClient): Shared HTTP client; its strategy_stats are used if set
+        verify (bool): Check that a returned link serves a PDF; pass False for
+            strategies that already verify their links
+        width (int): Number of strategies run at the same time
+
+    Returns:
+        str: PDF URL or None
+    """
+    if not strategies:
+        return None
+
+    client = get_client(client)
+    stats = getattr(client, 'strategy_stats', None)
+    functions = dict(strategies)
+    names = [name for name, _ in strategies]
+    ordered = stats.order(key, names) if stats else names
+    stop = threading.Event()
+
+    def attempt(name):
+        start = time.time()
+        url = None
+        ok = False
+        with cancel_on(stop):
+            try:
+                url = functions[name]()
+            except Exception as e:
+                if not stop.is_set():
+                    print(f"PDF strategy {name} failed: {e}")
+            if url and not stop.is_set():
+                ok = not verify or is_pdf_url(url, headers or {}, client)
+        if stats and not stop.is_set():
+            stats.record(key, name, ok, time.time() - start)
+        return url, ok
+
+    found = {}
+    pending = list(ordered)
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < width:
+                name = pending.pop(0)
+                running[_strategy_executor.submit(attempt, name)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                url, ok = future.result()
+                found[name] = url
+                if ok:
+                    print(f"PDF strategy {name} found {url}")
+                    return url
+    finally:
+        stop.set()
+        for future in running:
+            future.cancel()
+
+    # Nothing verified: fall back to the first candidate in the original order
+    # that is not known to be dead
+    negative_cache = get_negative_cache(client)
+    for name in names:
+        url = found.get(name)
+        if url and not (negative_cache and negative_cache.check(url)):
+            return url
+    return None